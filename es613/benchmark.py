@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains benchmarks for the es613.index module
+
+Functions:
+    suite
+    compare
+    churn
+    engines
+    morton
+
+Dependencies:
+    numpy
+    pandas
+    shapely
+
+Usage:
+    python -m es613.benchmark suite --output results.jsonl
+    python -m es613.benchmark compare old.jsonl new.jsonl
+
+Todo:
+
+"""
+import sys
+import json
+import time
+import argparse
+import functools
+import platform
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import shapely
+import shapely.geometry as sg
+
+from es613 import index
+
+# the GeoJSON fixtures of the unittests, used by the "gemeinden" dataset
+_TEST_DATA_DIRECTORY = Path(__file__).absolute().parent.parent / "test_data"
+
+# the fields identifying a suite result, results with equal fields are compared by compare
+_KEYS = ("benchmark", "dataset", "engine", "n_items", "capacity", "seed")
+
+# the measurements of a suite result compared by compare, lower values are better
+_METRICS = ("build_s", "peak_mb", "bytes_per_item", "query_ms", "candidates_ms", "refine_ms", "batch_query_ms")
+
+
+def _timed(function:object, *args, **kwargs) -> tuple:
+    """
+    Returns:
+        tuple(float, object): the runtime of function(*args, **kwargs) in seconds and its return value
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _query_boxes(n:int, extent:float, size:float, rng:np.random.Generator) -> np.ndarray:
+    """
+    Returns:
+        numpy.ndarray: @n square query boxes with edge length @size inside [0, @extent]
+    """
+    x, y = rng.uniform(0.0, extent - size, n), rng.uniform(0.0, extent - size, n)
+    return shapely.box(x, y, x + size, y + size)
+
+
+def _dataset(kind:str, n_items:int, rng:np.random.Generator) -> tuple:
+    """
+    Args:
+        kind (str): "uniform" points, "clustered" points around 50 normally distributed centers or "polygons",
+            boxes of mixed size. "gemeinden" reads the GeoJSON fixtures of the unittests and ignores @n_items.
+        n_items (int): the number of geometries
+        rng (numpy.random.Generator): the random number generator
+        
+    Returns:
+        tuple(pandas.DataFrame, shapely.geometry.box, numpy.ndarray): the dataframe with a "geometry" column,
+            the extent of the index and the query geometries
+            
+    Raises:
+        ValueError: if @kind is unknown
+    """
+    if kind == "gemeinden":
+        with open(_TEST_DATA_DIRECTORY / "gemeinden_bayern_selection.geojson") as features_json:
+            features = json.load(features_json)
+        with open(_TEST_DATA_DIRECTORY / "gemeinden_query.geojson") as query_json:
+            queries = [sg.shape(f["geometry"]) for f in json.load(query_json)["features"]]
+        df = pd.DataFrame({"geometry": [sg.shape(f["geometry"]) for f in features["features"]]})
+        return df, sg.box(*features["bbox"]), np.array(queries, dtype=object)
+    
+    extent = 1000.0
+    if kind == "uniform":
+        geometries = shapely.points(rng.uniform(0.0, extent, n_items), rng.uniform(0.0, extent, n_items))
+    elif kind == "clustered":
+        centers = rng.uniform(0.1 * extent, 0.9 * extent, (50, 2))
+        xy = np.clip(centers[rng.integers(0, 50, n_items)] + rng.normal(0.0, extent / 100, (n_items, 2)), 0.0, extent)
+        geometries = shapely.points(xy)
+    elif kind == "polygons":
+        x, y = rng.uniform(0.0, extent, n_items), rng.uniform(0.0, extent, n_items)
+        size = rng.pareto(2.0, n_items) * extent / 400
+        geometries = shapely.box(x, y, np.minimum(x + size, extent), np.minimum(y + size, extent))
+    else:
+        raise ValueError("unknown dataset '{}'".format(kind))
+    return pd.DataFrame({"geometry": geometries}), sg.box(0.0, 0.0, extent, extent), _query_boxes(500, extent, 20.0, rng)
+
+
+def _environment() -> dict:
+    """
+    Returns:
+        dict: the versions of python and the dependencies, so that results of different machines can be told apart
+    """
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "shapely": shapely.__version__, "machine": platform.machine()}
+
+
+def suite(datasets:List[str]=("uniform", "clustered", "polygons", "gemeinden"), sizes:List[int]=(10**4, 10**5, 10**6),
+          capacities:List[int]=(4, 8, 16, 32), engine:str="quadtree", seed:int=0) -> List[dict]:
+    """ This benchmark builds a PandasQuadtree for every dataset, size and capacity and measures the build,
+    the memory and the range queries. The datasets are generated from @seed, so that runs are reproducible.
+    
+    Args:
+        datasets (List[str]): the datasets (see benchmark._dataset)
+        sizes (List[int]): the numbers of geometries of the synthetic datasets
+        capacities (List[int]): the capacities of the index
+        engine (str): the engine of the index
+        seed (int): the seed of the random number generator
+        
+    Returns:
+        List[dict]: per dataset, size and capacity the build time, the peak memory allocated by a separate traced build,
+            the memory usage of the index, the latency of single range queries split into candidate search
+            and refinement and the latency of batch range queries per query geometry
+    """
+    results = []
+    for kind in datasets:
+        for n_items in (sizes if kind != "gemeinden" else [None]):
+            df, bbox, queries = _dataset(kind, n_items, np.random.default_rng(seed))
+            n_queries = len(queries)
+            for capacity in capacities:
+                build_time, qdt = _timed(index.PandasQuadtree, df, "geometry", bbox, capacity, engine=engine)
+                
+                # the peak memory is measured by a second build, tracemalloc slows down the traced build
+                tracemalloc.start()
+                index.PandasQuadtree(df, "geometry", bbox, capacity, engine=engine)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                
+                candidates_time, candidates = _timed(lambda: [qdt.range_query_candidates(q) for q in queries])
+                query_time, hits = _timed(lambda: [qdt.range_query(q) for q in queries])
+                batch_time = _timed(qdt.range_query_many, queries)[0]
+                n_candidates = sum(len(c) for c in candidates)
+                results.append({
+                    "benchmark": "suite", "dataset": kind, "engine": engine, "n_items": len(df), "capacity": capacity,
+                    "seed": seed,
+                    "build_s": build_time,
+                    "peak_mb": peak / 2**20,
+                    "bytes_per_item": qdt.memory_usage() / len(df),
+                    "query_ms": query_time / n_queries * 1000,
+                    "candidates_ms": candidates_time / n_queries * 1000,
+                    "refine_ms": max(query_time - candidates_time, 0.0) / n_queries * 1000,
+                    "batch_query_ms": batch_time / n_queries * 1000,
+                    "candidates_per_query": n_candidates / n_queries,
+                    "hit_rate": sum(len(h) for h in hits) / n_candidates if n_candidates else 1.0,
+                    **_environment(),
+                })
+    return results
+
+
+def compare(old_results:List[dict], new_results:List[dict], threshold:float=1.1) -> List[dict]:
+    """ This function matches two lists of suite results by benchmark, dataset, engine, size, capacity and seed and
+    compares their measurements.
+    
+    Args:
+        old_results (List[dict]): the results of the baseline
+        new_results (List[dict]): the results to compare with the baseline
+        threshold (float): the ratio new / old above which a measurement is flagged as regression. DEFAULT=1.1
+        
+    Returns:
+        List[dict]: per matched result and measurement the old and new value, their ratio and the regression flag
+    """
+    def key(result:dict) -> tuple:
+        return tuple(result.get(k) for k in _KEYS)
+    
+    old_by_key = {key(r): r for r in old_results}
+    comparison = []
+    for new in new_results:
+        old = old_by_key.get(key(new))
+        if old is None:
+            continue
+        for metric in _METRICS:
+            if metric not in old or metric not in new:
+                continue
+            ratio = new[metric] / old[metric] if old[metric] else float("inf") if new[metric] else 1.0
+            comparison.append({**dict(zip(_KEYS, key(new))),
+                               "metric": metric, "old": old[metric], "new": new[metric], "ratio": ratio,
+                               "regression": ratio > threshold})
+    return comparison
+
+
+def _read_results(path:str) -> List[dict]:
+    """
+    Returns:
+        List[dict]: the results written by the command line, one JSON object per line
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def churn(n_items:int=100000, n_ticks:int=10, moves_per_tick:int=5000, capacity:int=8, engine:str="quadtree", seed:int=0) -> dict:
+    """ This benchmark moves points around and keeps a PandasQuadtree up to date, either by updating
+    the moved rows or by rebuilding the whole index after every tick.
+
+    Args:
+        n_items (int): the number of points
+        n_ticks (int): the number of ticks
+        moves_per_tick (int): the number of points moved per tick
+        capacity (int): the capacity of the index
+        engine (str): the engine of the index
+        seed (int): the seed of the random number generator
+
+    Returns:
+        dict: seconds per tick for updates and rebuilds and the range query latency of the updated
+            and a freshly built index after all ticks
+    """
+    rng = np.random.default_rng(seed)
+    extent = 1000.0
+    bbox = sg.box(0.0, 0.0, extent, extent)
+    df = pd.DataFrame({"geometry": shapely.points(rng.uniform(0.0, extent, n_items), rng.uniform(0.0, extent, n_items))})
+    qdt = index.PandasQuadtree(df, "geometry", bbox, capacity, engine=engine)
+
+    update_time, rebuild_time = 0.0, 0.0
+    for _ in range(n_ticks):
+        moved = rng.choice(n_items, moves_per_tick, replace=False)
+        geometries = shapely.points(rng.uniform(0.0, extent, moves_per_tick), rng.uniform(0.0, extent, moves_per_tick))
+        df.loc[moved, "geometry"] = geometries
+
+        start = time.perf_counter()
+        for i, geom in zip(moved.tolist(), geometries):
+            qdt.update(i, geom)
+        update_time += time.perf_counter() - start
+
+        rebuild_time += _timed(index.PandasQuadtree, df, "geometry", bbox, capacity, engine=engine)[0]
+
+    fresh_qdt = index.PandasQuadtree(df, "geometry", bbox, capacity, engine=engine)
+    queries = _query_boxes(500, extent, 20.0, rng)
+    return {
+        "benchmark": "churn", "engine": engine, "n_items": n_items, "moves_per_tick": moves_per_tick, "capacity": capacity,
+        "update_s_per_tick": update_time / n_ticks,
+        "rebuild_s_per_tick": rebuild_time / n_ticks,
+        "query_ms_after_churn": _timed(lambda: [qdt.range_query_candidates(q) for q in queries])[0] / len(queries) * 1000,
+        "query_ms_fresh_build": _timed(lambda: [fresh_qdt.range_query_candidates(q) for q in queries])[0] / len(queries) * 1000,
+    }
+
+
+def engines(n_items:int=100000, n_queries:int=500, capacity:int=8, data:str="points", seed:int=0) -> List[dict]:
+    """ This benchmark compares the quadtree engines of PandasQuadtree on points or polygons of mixed size.
+    
+    Args:
+        n_items (int): the number of geometries
+        n_queries (int): the number of range queries
+        capacity (int): the capacity of the index
+        data (str): "points" or "polygons", the polygons are boxes with edge lengths up to 5% of the extent
+        seed (int): the seed of the random number generator
+        
+    Returns:
+        List[dict]: per engine the build time, the memory usage of the index and the latency of range queries
+            and inserts
+    
+    Note:
+        Measured with the defaults (100000 items, capacity 8) on one cpu, build / bytes per item / query / insert:
+                          points                            polygons
+            quadtree      0.23-0.27 s  211 B  0.26-0.32 ms  28-31 us   0.25-0.27 s  242 B  0.33 ms       27-28 us
+            compact       0.14-0.17 s   62 B  0.17-0.27 ms  18-20 us   0.16 s        73 B  0.17-0.18 ms  16-19 us
+            leaves        0.28-0.29 s  216 B  0.10-0.12 ms  25-26 us   0.77-0.78 s  846 B  0.68-0.80 ms  35-42 us
+            loose         0.49-0.55 s  295 B  0.44-0.45 ms  19-21 us   0.48-0.52 s  290 B  0.19-0.23 ms  19-21 us
+        "leaves" answers point queries fastest, but references large polygons by every leaf they overlap, so its size
+        and query time grow with the overlap of the polygons. "loose" builds slowest, but stores every polygon once in a
+        node fitting its size and answers polygon queries almost as fast as "compact". "compact" builds fastest and uses
+        a third of the memory of the object trees, "quadtree" keeps large polygons in inner nodes, which every query tests.
+    """
+    df, bbox, queries = _engines_dataset(n_items, n_queries, data, seed)
+    geometries = df["geometry"].values
+    
+    results = []
+    for engine in index._ENGINES:
+        if engine == "points" and data != "points":
+            continue
+        build_time, qdt = _timed(index.PandasQuadtree, df, "geometry", bbox, capacity, engine=engine)
+        query_time = _timed(lambda: [qdt.range_query_candidates(q) for q in queries])[0]
+        empty_qdt = index.PandasQuadtree(df.iloc[:0], "geometry", bbox, capacity, engine=engine)
+        insert_time = _timed(lambda: [empty_qdt.insert(g, i) for i, g in enumerate(geometries[:20000])])[0]
+        results.append({
+            "benchmark": "engines", "engine": engine, "data": data, "n_items": n_items, "capacity": capacity,
+            "build_s": build_time,
+            "bytes_per_item": qdt.memory_usage() / n_items,
+            "query_ms": query_time / n_queries * 1000,
+            "insert_us": insert_time / min(n_items, 20000) * 1e6,
+        })
+    return results
+
+
+def morton(n_items:int=100000, n_queries:int=500, capacity:int=8, data:str="points", seed:int=0) -> List[dict]:
+    """ This benchmark compares the static index.MortonIndex with the engines of PandasQuadtree,
+    which answer range queries with arrays, on the data of the engines benchmark.
+    
+    Args:
+        n_items (int): the number of geometries
+        n_queries (int): the number of range queries
+        capacity (int): the capacity of the PandasQuadtree
+        data (str): "points" or "polygons" (see engines)
+        seed (int): the seed of the random number generator
+        
+    Returns:
+        List[dict]: per index the build time, the memory usage and the latency of candidate and exact range queries
+    
+    Note:
+        Measured with the defaults (100000 items, capacity 8) on one cpu, build / bytes per item / candidates / exact:
+                          points                                 polygons
+            morton        0.02-0.03 s   48 B  0.17-0.19 ms  0.22-0.29 ms   0.03 s        48 B  0.18-0.19 ms  0.26-0.28 ms
+            quadtree      0.18-0.25 s  211 B  0.22-0.28 ms  0.20-0.23 ms   0.23-0.28 s  242 B  0.31 ms       0.22-0.23 ms
+            compact       0.13 s        62 B  0.16 ms       0.49-0.52 ms   0.15-0.16 s   73 B  0.16-0.18 ms  0.46-0.51 ms
+            points        0.10-0.11 s   65 B  0.18-0.19 ms  0.18-0.19 ms
+        index.MortonIndex builds 5-10 times faster than the quadtree engines and uses the least memory, its candidate
+        queries are as fast as those of "compact", as splitting the query extent into ranges of Morton codes has a fixed
+        cost. Its exact queries are on par with "quadtree", "compact" answers exact queries slowest.
+    """
+    df, bbox, queries = _engines_dataset(n_items, n_queries, data, seed)
+    
+    builders = {"morton": lambda: index.MortonIndex(df, "geometry", bbox)}
+    for engine in ("quadtree", "compact", "points") if data == "points" else ("quadtree", "compact"):
+        builders[engine] = functools.partial(index.PandasQuadtree, df, "geometry", bbox, capacity, engine=engine)
+        
+    results = []
+    for name, builder in builders.items():
+        build_time, spatial_index = _timed(builder)
+        candidates_time = _timed(lambda: [spatial_index.range_query_candidates(q) for q in queries])[0]
+        query_time = _timed(lambda: [spatial_index.range_query(q) for q in queries])[0]
+        results.append({
+            "benchmark": "morton", "engine": name, "data": data, "n_items": n_items, "capacity": capacity,
+            "build_s": build_time,
+            "bytes_per_item": spatial_index.memory_usage() / n_items,
+            "candidates_ms": candidates_time / n_queries * 1000,
+            "query_ms": query_time / n_queries * 1000,
+        })
+    return results
+
+
+def _engines_dataset(n_items:int, n_queries:int, data:str, seed:int) -> tuple:
+    """
+    Returns:
+        tuple(pandas.DataFrame, shapely.geometry.box, numpy.ndarray): uniformly distributed "points" or "polygons",
+            the extent of the index and the query boxes of the engines benchmark
+    """
+    rng = np.random.default_rng(seed)
+    extent = 1000.0
+    x, y = rng.uniform(0.0, extent, n_items), rng.uniform(0.0, extent, n_items)
+    if data == "points":
+        geometries = shapely.points(x, y)
+    else:
+        size = rng.pareto(2.0, n_items) * extent / 400
+        geometries = shapely.box(x, y, np.minimum(x + size, extent), np.minimum(y + size, extent))
+    return pd.DataFrame({"geometry": geometries}), sg.box(0.0, 0.0, extent, extent), _query_boxes(n_queries, extent, 20.0, rng)
+
+
+def main(argv:List[str]=None) -> int:
+    """ This function runs the benchmarks from the command line. Results are written as one JSON object per line
+    to --output or stdout, compare exits with 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(prog="python -m es613.benchmark", description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    suite_parser = subparsers.add_parser("suite", help="build and query benchmarks across datasets, sizes and capacities")
+    suite_parser.add_argument("--datasets", nargs="+", default=["uniform", "clustered", "polygons", "gemeinden"])
+    suite_parser.add_argument("--sizes", nargs="+", type=int, default=[10**4, 10**5, 10**6])
+    suite_parser.add_argument("--capacities", nargs="+", type=int, default=[4, 8, 16, 32])
+    suite_parser.add_argument("--engine", default="quadtree")
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--output")
+    
+    for name in ("churn", "engines", "morton"):
+        other_parser = subparsers.add_parser(name, help="the {} benchmark".format(name))
+        other_parser.add_argument("--output")
+    
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.1)
+    compare_parser.add_argument("--output")
+    
+    args = parser.parse_args(argv)
+    if args.command == "suite":
+        results = suite(args.datasets, args.sizes, args.capacities, args.engine, args.seed)
+    elif args.command == "churn":
+        results = [churn(engine=engine) for engine in ("quadtree", "compact")]
+    elif args.command == "engines":
+        results = [result for data in ("points", "polygons") for result in engines(data=data)]
+    elif args.command == "morton":
+        results = [result for data in ("points", "polygons") for result in morton(data=data)]
+    else:
+        results = compare(_read_results(args.old), _read_results(args.new), args.threshold)
+        
+    lines = "".join(json.dumps(result) + "\n" for result in results)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+    return int(args.command == "compare" and any(result["regression"] for result in results))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
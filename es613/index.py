@@ -9,11 +9,19 @@ This module contains classes for indexing data
 Classes:
     SpatialIndex
     PandasQuadtree
+    MortonIndex
     _SecondaryQuadtree1
+    _SecondaryQuadtree2
+    _LooseQuadtree
+    _CompactQuadtree
+    _PointQuadtree
+    _QueryCache
+    _ReadWriteLock
     Rectangle
     QuadtreeDivison
     
 Dependencies:
+    numpy
     pandas
     shapely
 
@@ -21,10 +29,24 @@ Todo:
     
 """
 
+import os
+import sys
+import json
+import time
+import heapq
+import asyncio
+import hashlib
+import functools
+import itertools
+import threading
 from typing import List
+from collections import OrderedDict
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
+import shapely
 import shapely.geometry as sg
 
 class SpatialIndex(ABC):
@@ -42,10 +64,100 @@ class SpatialIndex(ABC):
         pass
     
     @abstractmethod
-    def remove(self):
+    def remove(self, row_index:object):
         pass
     
     
+class _ReadWriteLock(object):
+    """
+    This class provides a lock, which can be held by many readers or a single writer at once. Waiting writers are
+    preferred over new readers, so that a steady stream of queries does not starve inserts. The lock is reentrant,
+    a thread holding it can acquire it again for reading and a writer can acquire it again for reading and writing.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers:int = 0
+        self._waiting_writers:int = 0
+        self._writer:int = None
+        self._local = threading.local()
+        
+    def __reduce__(self) -> tuple:
+        """ A copy of the lock is a new, released lock, so that an index can be passed to other processes """
+        return type(self), ()
+    
+    def _depth(self) -> int:
+        """
+        Returns:
+            int: the number of times the current thread holds the lock
+        """
+        return getattr(self._local, "depth", 0)
+        
+    def acquire_read(self) -> None:
+        if self._depth() == 0:
+            with self._condition:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+                self._readers += 1
+        self._local.depth = self._depth() + 1
+        
+    def release_read(self) -> None:
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+                    
+    def acquire_write(self) -> None:
+        if self._writer != threading.get_ident():
+            if self._depth():
+                raise RuntimeError("a reader can not acquire the lock for writing")
+            with self._condition:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._waiting_writers -= 1
+                self._writer = threading.get_ident()
+        self._local.depth = self._depth() + 1
+        
+    def release_write(self) -> None:
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+                
+                
+def _reads(method:object) -> object:
+    """ This decorator holds the lock of a PandasQuadtree for reading while @method runs, if the index is concurrent """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+    return wrapper
+
+
+def _writes(method:object) -> object:
+    """ This decorator holds the lock of a PandasQuadtree for writing while @method runs, if the index is concurrent """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+    return wrapper
+
+
 class PandasQuadtree(SpatialIndex):
     """This class provides a quadtree index for shapely.geometry objects stored in the column of a pandas.DataFrame object
     
@@ -54,40 +166,169 @@ class PandasQuadtree(SpatialIndex):
         geometry_column (str): the name of the geometry column in @df
         bbox (shapely.geometry.box): The extent for which the index will be created
         capacity (int): the maximum number of geometries, a node in the index can reference. DEFAULT=8  
+        engine (str): the name of the quadtree implementation used by the index. DEFAULT="quadtree"
+        query_hook (callable): if not None, range queries are instrumented and the hook is called with a dict
+            of the recorded measurements after every query (see PandasQuadtree.range_query). DEFAULT=None
+        cache_size (int): the maximum number of range query results kept in the cache, 0 disables the cache. DEFAULT=0
+        concurrent (bool): if True, the index can be shared by threads. DEFAULT=False
+        n_jobs (int): the number of processes used to build the index. DEFAULT=1
+        
+    Note:
+        Without @concurrent, many threads can query the index at once, as long as no thread changes it.
+        With @concurrent, the index is guarded by an index._ReadWriteLock: queries run at once and are
+        only blocked by PandasQuadtree.insert, PandasQuadtree.remove and PandasQuadtree.update, which run alone.
+        The refinement of shapely 2 releases the GIL, so that queries from a thread pool run in parallel
+        (see PandasQuadtree.range_query_async). PandasQuadtree.df is not guarded, rows have to be added before
+        and removed after they are changed in the index.
     
     """
     
-    def __init__(self, df:pd.DataFrame, geometry_column:object, bbox:sg.box=None, capacity=8):
+    def __init__(self, df:pd.DataFrame, geometry_column:object, bbox:sg.box=None, capacity=8, engine="quadtree", cache_size=0,
+                 concurrent=False, n_jobs=1):
         """
         Args:
             df (pandas.DataFrame): the dataframe for which the index will be greater
             geometry_column (str): the name of the geometry column in @df
             bbox (shapely.geometry.box, optional): The extent for which the index will be created.
-                If no extent is passed. the extend will be calculated which will increase the instantiation time
+                If no extent is passed, the extent of the geometries in @df is used. If geometries exceed the
+                extent, it is grown by doubling it, just like PandasQuadtree.insert does.
             capacity (int): the maximum number of geometries, a node in the index can reference. DEFAULT=8
+            engine (str): the quadtree implementation used by the index. DEFAULT="quadtree"
+                "quadtree": a tree of index._SecondaryQuadtree1 objects, which supports fast inserts
+                "compact": an index._CompactQuadtree, which stores the tree in flat arrays and uses less memory
+                "leaves": a tree of index._SecondaryQuadtree2 objects, which stores items in the leafs only, fast queries
+                    for points, polygons are referenced by every leaf they overlap
+                "loose": a tree of index._LooseQuadtree objects, which stores every item once, fast queries for polygons
+                "points": an index._PointQuadtree, which only indexes points and answers queries by their coordinates
+            cache_size (int): the maximum number of range query results kept in an LRU cache (see index._QueryCache).
+                The results of PandasQuadtree.range_query_candidates are cached by the extent of the query geometry,
+                the results of PandasQuadtree.range_query by its WKB. 0 disables the cache. DEFAULT=0
+            concurrent (bool): if True, the index can be changed while other threads query it. DEFAULT=False
+            n_jobs (int): the number of processes used to distribute the items over the nodes, -1 uses all cpus.
+                The items are partitioned by the quadrants of the upper levels and the subtrees of the quadrants
+                are partitioned in a process pool (see index._parallel_partition). The node objects of the "quadtree",
+                "leaves" and "loose" engines are created by the calling process afterwards, so only the partition
+                is sped up. DEFAULT=1
+                
+        Raises:
+            ValueError: if @engine is unknown
             
         """
+        if engine not in _ENGINES:
+            raise ValueError("unknown engine '{}', use one of {}".format(engine, list(_ENGINES)))
+        
+        bounds = _geometry_bounds(df[geometry_column].values)
+        extent = _extent(bounds)
+        if bbox is None:
+            root_bbox = extent if extent is not None else Rectangle(0.0, 0.0, 0.0, 0.0)
+        else:
+            root_bbox = Rectangle(*bbox.bounds)
+            while extent is not None and not root_bbox.contains(extent):
+                root_bbox = _grow_step(root_bbox, extent)[0]
+        
         self.df = df
         self.geometry_column = geometry_column
-        self.bbox = bbox
+        self.bbox = bbox if bbox is not None else sg.box(*root_bbox.bounds)
         self.capacity = capacity
-        self._qdt = _SecondaryQuadtree1(Rectangle(*bbox.bounds), capacity)
-        
-        for i, row in self.df.iterrows():
-            self._qdt.insert(row[self.geometry_column], i)
+        self.engine = engine
+        self.query_hook = None
+        self.cache_size = cache_size
+        self._cache = _QueryCache(cache_size) if cache_size > 0 else None
+        self._lock = _ReadWriteLock() if concurrent else None
+        # the rows of every label of a non-unique index of @df (see PandasQuadtree._label_rows)
+        self._label_positions:tuple = None
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self._qdt = _ENGINES[engine].bulk_load(root_bbox, capacity, bounds, self.df.index, n_jobs)
             
+    @_writes
     def insert(self, geometry:object, row_index:object):
-        """ This method inserts a geometry object into the tree
+        """ This method inserts a geometry object into the tree.
+        If the geometry exceeds the extent of the tree, a new root is added until the extent covers the geometry,
+        PandasQuadtree.bbox is set to the extent of the tree. Empty geometries are not inserted.
+        Cached results, whose query extent is not disjoint with the extent of @geometry, are dropped.
         
         Args:
             geometry (shapely.geometry): The geometry object
             row_index (object): The index of the corresponding row in the PandasQuadtree.df dataframe
         """
-        self._qdt.insert(geometry, row_index)
+        if self._cache is not None:
+            self._cache.invalidate(Rectangle(*geometry.bounds))
+        if self._qdt.insert(geometry, row_index):
+            self.bbox = sg.box(*self._qdt._cell().bounds)
     
-    def remove(self):
-        pass
+    @_writes
+    def insert_many(self, geometries:object, row_indices:object) -> int:
+        """ This method inserts many geometry objects into the tree at once. The tree is grown once to cover
+        all geometries, which exceed its extent, and PandasQuadtree.bbox is set to the grown extent.
+        Cached results, whose query extent is not disjoint with the extent of all @geometries, are dropped.
+        
+        Args:
+            geometries (Sequence[shapely.geometry]): The geometry objects
+            row_indices (Sequence[object]): The indices of the corresponding rows in the PandasQuadtree.df dataframe
+            
+        Returns:
+            int: the number of inserted geometries, empty or missing geometries are not inserted
+        """
+        bounds = _geometry_bounds(geometries)
+        extent = _extent(bounds)
+        if extent is None:
+            return 0
+        if self._cache is not None:
+            self._cache.invalidate(extent)
+        n_inserted = self._qdt.insert_many(bounds, list(row_indices))
+        self.bbox = sg.box(*self._qdt._cell().bounds)
+        return n_inserted
+    
+    @_writes
+    def flush(self) -> None:
+        """ This method merges buffered inserts and removals into the tree, so that queries do not have to test them
+        one by one. Only the "compact" and "points" engines buffer changes (see _CompactQuadtree.insert).
+        """
+        self._qdt.flush()
     
+    @_writes
+    def remove(self, row_index:object) -> bool:
+        """ This method removes a row from the tree. Cached results holding the row are dropped.
+        
+        Args:
+            row_index (object): The index of the row in the PandasQuadtree.df dataframe
+            
+        Returns:
+            bool: Returns True if the row was referenced by the tree, else returns False
+        """
+        if self._cache is not None:
+            self._cache.invalidate_row(row_index)
+        return self._qdt.remove(row_index)
+    
+    @_writes
+    def update(self, row_index:object, geometry:object) -> bool:
+        """ This method replaces the geometry of a row in the tree.
+        The geometry column of PandasQuadtree.df has to be updated by the caller.
+        
+        Args:
+            row_index (object): The index of the row in the PandasQuadtree.df dataframe
+            geometry (shapely.geometry): The new geometry of the row
+            
+        Returns:
+            bool: Returns True if the row was referenced by the tree, else returns False
+        """
+        removed = self.remove(row_index)
+        self.insert(geometry, row_index)
+        return removed
+    
+    def cache_info(self) -> dict:
+        """
+        Returns:
+            dict: the counters of the cache (see index._QueryCache.info), None if the cache is disabled
+        """
+        return self._cache.info() if self._cache is not None else None
+    
+    def cache_clear(self) -> None:
+        """ This method drops all cached results and resets the counters of the cache """
+        if self._cache is not None:
+            self._cache.clear()
+    
+    @_reads
     def range_query_candidates(self, geometry:object):
         """
         Args:
@@ -99,134 +340,2192 @@ class PandasQuadtree(SpatialIndex):
                 The method only returns candidates. To only receive ids of rows for which the
                 topological predicate 'disjoint' is False, use the PandasQuadtree.range_query method.
         """
-        return self._qdt.range_query(geometry)
+        if self._cache is not None:
+            key = ("candidates", geometry.bounds)
+            candidates = self._cache.get(key)
+            if candidates is not None:
+                return list(candidates)
+            
+        if self.query_hook is None:
+            candidates = self._qdt.range_query(geometry)
+        else:
+            candidates, stats = self._instrumented_candidates(geometry)
+            self.query_hook(stats)
+            
+        if self._cache is not None:
+            self._cache.put(key, Rectangle(*geometry.bounds), list(candidates))
+        return candidates
     
-    def range_query(self, geometry:object):
+    @_reads
+    def range_query(self, geometry:object, predicate:str="intersects"):
         """
         Args:
             geometry (shapely.geometry): The query geometry
+            predicate (str): the topological predicate, which has to be True for the geometry of a row and @geometry:
+                "intersects", "contains", "within", "touches", "overlaps", "crosses", "covers" or "covered_by".
+                "intersects" returns the rows, for which the predicate 'disjoint' is False. DEFAULT="intersects"
             
         Returns:
             List[object]: returns List with ids of rows in the PandasQuadtree.df dataframe,
-                for which the topological predicate with the @geometry argument is False.
+                for which @predicate with the @geometry argument is True.
+                
+        Raises:
+            ValueError: if @predicate is not supported
+                
+        Note:
+            A copy of @geometry is prepared once (see index._prepared), the geometries of all candidates are tested at once.
+            For the predicates "intersects", "covered_by" and "within" and a polygonal @geometry, the extents of the
+            nodes within the query extent are tested against @geometry. The rows, whose extent lies within the extent
+            of a node covered by @geometry, are returned without testing their geometries (see PandasQuadtree._candidates).
+            If PandasQuadtree.query_hook is set, it is called with the measurements of the query:
+                "query" (str): the name of the method
+                "nodes_visited" (int): the number of nodes, whose items were tested
+                "bbox_tests" (int): the number of extents of items and nodes tested against the query extent
+                "candidates" (int): the number of candidates
+                "accepted" (int): the number of candidates returned without testing their geometries,
+                    None for PandasQuadtree.range_query_candidates
+                "hits" (int): the number of returned rows, None for PandasQuadtree.range_query_candidates
+                "false_positives" (int): the number of candidates, which were dropped by the refinement
+                "candidates_s" (float): the seconds spent searching the tree
+                "refine_s" (float): the seconds spent testing the geometries of the candidates
+            Cached results are returned without calling PandasQuadtree.query_hook.
+        """
+        if predicate not in _CONVERSE_PREDICATES:
+            raise ValueError("unsupported predicate '{}', use one of {}".format(predicate, list(_CONVERSE_PREDICATES)))
+        
+        if self._cache is not None:
+            key = ("exact", predicate, shapely.to_wkb(geometry))
+            hits = self._cache.get(key)
+            if hits is not None:
+                return list(hits)
+            
+        if self.query_hook is None and predicate == "intersects" and isinstance(self._qdt, _PointQuadtree):
+            hits = self._qdt.range_query_exact(geometry)
+        elif self.query_hook is None:
+            prepared = _prepared(geometry)
+            accepted, candidates = self._candidates(prepared, predicate)
+            hits = accepted + self._refine(prepared, candidates, predicate)
+        else:
+            stats = {"query": "range_query", "nodes_visited": 0, "bbox_tests": 0}
+            start = time.perf_counter()
+            prepared = _prepared(geometry)
+            accepted, candidates = self._candidates(prepared, predicate, stats)
+            refine_start = time.perf_counter()
+            hits = accepted + self._refine(prepared, candidates, predicate)
+            n_candidates = len(accepted) + len(candidates)
+            stats.update(candidates=n_candidates, accepted=len(accepted), hits=len(hits), false_positives=n_candidates - len(hits),
+                         candidates_s=refine_start - start, refine_s=time.perf_counter() - refine_start)
+            self.query_hook(stats)
+            
+        if self._cache is not None:
+            self._cache.put(key, Rectangle(*geometry.bounds), list(hits))
+        return hits
+    
+    def _candidates(self, geometry:object, predicate:str, stats:dict=None) -> tuple:
+        """
+        Args:
+            geometry (shapely.geometry): The prepared query geometry (see index._prepared)
+            predicate (str): the topological predicate (see PandasQuadtree.range_query)
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Returns:
+            tuple(List[object], List[object]): the ids of rows, for which @predicate is True without testing their geometries,
+                and the ids of the remaining candidates. The rows of the first list lie within the extent of a node,
+                which is covered by @geometry ("intersects", "covered_by") or by its interior ("within").
+        """
+        subtree_predicate = _SUBTREE_PREDICATES.get(predicate)
+        if subtree_predicate is None or geometry.geom_type not in ("Polygon", "MultiPolygon"):
+            return [], self._qdt.range_query(geometry, stats)
+        
+        test = getattr(shapely, subtree_predicate)
+        covered = lambda bounds: test(geometry, shapely.box(bounds[:, 0], bounds[:, 1], bounds[:, 2], bounds[:, 3]))
+        return self._qdt.range_query_covered(geometry, covered, stats)
+    
+    def _refine(self, geometry:object, candidates:List[object], predicate:str="intersects") -> List[object]:
+        """
+        Args:
+            geometry (shapely.geometry): The prepared query geometry (see index._prepared)
+            candidates (List[object]): ids of rows in the PandasQuadtree.df dataframe
+            predicate (str): the topological predicate (see PandasQuadtree.range_query). DEFAULT="intersects"
+            
+        Returns:
+            List[object]: the @candidates, for which @predicate with @geometry is True (see PandasQuadtree.range_query)
         """
-        candidates = self.range_query_candidates(geometry)
-        return [pl for pl in candidates if not self.df.loc[pl][self.geometry_column].disjoint(geometry)]
+        if not candidates:
+            return []
+        if predicate == "intersects" and isinstance(self._qdt, _PointQuadtree) and _is_rectangle(geometry):
+            # the extent of a point is not disjoint with a rectangle, if and only if the point is not
+            return list(candidates)
         
+        geometries, owners = self._geometries_of(candidates)
+        hits = _any_of(getattr(shapely, _CONVERSE_PREDICATES[predicate])(geometry, geometries), owners, len(candidates))
+        return [pl for pl, hit in zip(candidates, hits.tolist()) if hit]
+    
+    def iter_range_query(self, geometry:object, limit:int=None) -> object:
+        """ This method returns the rows of PandasQuadtree.range_query lazily. The tree is traversed depth-first
+        and the candidates are refined in small batches, which grow while the iteration goes on,
+        so that the first rows are returned without searching the whole tree.
         
-class _SecondaryQuadtree1(object):
-    """
-    This class provides a quadtree index using the extent of the indexed geometries.
-    The items are stored in the nodes as well as the leaves of the tree.
-    This implies faster build and insert times with slower query times.
+        Args:
+            geometry (shapely.geometry): The query geometry
+            limit (int, optional): the maximum number of returned rows
+            
+        Yields:
+            object: the ids of rows in the PandasQuadtree.df dataframe, for which the topological predicate 'disjoint'
+                with the @geometry argument is False, every id is yielded once
+                
+        Note:
+            PandasQuadtree.query_hook is not called. Cached results of PandasQuadtree.range_query are used,
+            but the results of a lazy query are not cached.
+            The index must not be changed during the iteration. With @concurrent, the lock is held for reading
+            until the iteration is finished or the generator is closed, so the generator has to be consumed
+            by the thread which started it.
+        """
+        if limit is not None and limit <= 0:
+            return
+        
+        lock = self._lock
+        if lock is not None:
+            lock.acquire_read()
+        try:
+            yield from itertools.islice(self._iter_hits(geometry), limit)
+        finally:
+            if lock is not None:
+                lock.release_read()
+    
+    @_reads
+    def count(self, geometry:object) -> int:
+        """
+        Args:
+            geometry (shapely.geometry): The query geometry
+            
+        Returns:
+            int: the number of rows returned by PandasQuadtree.range_query, counted without collecting them
+        """
+        if isinstance(self._qdt, _PointQuadtree):
+            return len(self._qdt.range_query_exact(geometry))
+        return sum(1 for _ in self._iter_hits(geometry))
+    
+    @_reads
+    def any(self, geometry:object) -> bool:
+        """
+        Args:
+            geometry (shapely.geometry): The query geometry
+            
+        Returns:
+            bool: True if the geometry of a row in the PandasQuadtree.df dataframe is not disjoint with @geometry.
+                The search stops at the first such row.
+        """
+        hits = self._iter_hits(geometry)
+        try:
+            for _ in hits:
+                return True
+            return False
+        finally:
+            hits.close()
+            
+    def _iter_hits(self, geometry:object) -> object:
+        """
+        Yields:
+            object: the ids of rows, for which the topological predicate 'disjoint' with @geometry is False
+                (see PandasQuadtree.iter_range_query)
+        """
+        if self._cache is not None:
+            hits = self._cache.get(("exact", "intersects", shapely.to_wkb(geometry)))
+            if hits is not None:
+                yield from list(hits)
+                return
+            
+        prepared = None
+        batch, batchsize = [], _MIN_REFINE_BATCH
+        for pl in self._qdt.iter_range_query(geometry):
+            batch.append(pl)
+            if len(batch) == batchsize:
+                prepared = prepared if prepared is not None else _prepared(geometry)
+                yield from self._refine(prepared, batch)
+                batch, batchsize = [], min(2 * batchsize, _MAX_REFINE_BATCH)
+        if batch:
+            yield from self._refine(prepared if prepared is not None else _prepared(geometry), batch)
+    
+    def _instrumented_candidates(self, geometry:object) -> tuple:
+        """
+        Returns:
+            tuple(List[object], dict): the candidates of @geometry (see PandasQuadtree.range_query_candidates)
+                and the measurements of the search (see PandasQuadtree.range_query)
+        """
+        stats = {"query": "range_query_candidates", "nodes_visited": 0, "bbox_tests": 0}
+        start = time.perf_counter()
+        candidates = self._qdt.range_query(geometry, stats)
+        stats.update(candidates=len(candidates), accepted=None, hits=None, false_positives=None,
+                     candidates_s=time.perf_counter() - start, refine_s=0.0)
+        return candidates, stats
+    
+    @_reads
+    def tree_stats(self) -> dict:
+        """
+        Returns:
+            dict: the shape of the tree
+                "depth" (int): the number of levels below the root
+                "n_nodes" (int): the number of nodes
+                "n_leaves" (int): the number of nodes, which are not divided
+                "n_references" (int): the number of items referenced by the nodes, an item can be referenced more than once
+                "n_pending" (int): the number of buffered items, which are not yet referenced by a node
+                "fill" (List[int]): the number of nodes referencing i items at position i
+                "nodes_per_level" (List[int]): the number of nodes at depth i at position i
+                "items_per_level" (List[int]): the number of items referenced by the nodes at depth i at position i
+                "overfull_nodes" (int): the number of nodes referencing more items than the capacity,
+                    because their items could not be distributed to the leafs, e.g. if the extent of the items is equal
+        """
+        return self._qdt.tree_stats()
+    
+    @_reads
+    def range_query_candidates_many(self, geometries:object) -> tuple:
+        """
+        Args:
+            geometries (Sequence[shapely.geometry]): The query geometries
+            
+        Returns:
+            tuple(numpy.ndarray): offsets of shape (len(@geometries) + 1,) and ids of rows in the PandasQuadtree.df dataframe.
+                The candidates for the i-th query geometry are ids[offsets[i]:offsets[i + 1]],
+                see PandasQuadtree.range_query_candidates. The tree is traversed only once for all query geometries.
+        """
+        offsets, placeholders = self._qdt.range_query_many(_geometry_bounds(geometries))
+        return offsets, _label_array(placeholders)
+    
+    @_reads
+    def range_query_many(self, geometries:object) -> tuple:
+        """
+        Args:
+            geometries (Sequence[shapely.geometry]): The query geometries
+            
+        Returns:
+            tuple(numpy.ndarray): offsets of shape (len(@geometries) + 1,) and ids of rows in the PandasQuadtree.df dataframe.
+                The rows, for which the topological predicate 'disjoint' with the i-th query geometry is False,
+                are ids[offsets[i]:offsets[i + 1]]
+                
+        Raises:
+            KeyError: if a candidate is not a row of PandasQuadtree.df
+        """
+        geometries = np.asarray(geometries, dtype=object).ravel()
+        offsets, ids = self.range_query_candidates_many(geometries)
+        query_ids = np.repeat(np.arange(len(geometries)), np.diff(offsets))
+        row_geometries, owners = self._geometries_of(ids)
+        pairs = query_ids if owners is None else query_ids[owners]
+        hits = _any_of(~shapely.disjoint(_prepared(geometries)[pairs], row_geometries), owners, len(ids))
+        offsets = np.searchsorted(query_ids[hits], np.arange(len(geometries) + 1))
+        return offsets, ids[hits]
+    
+    @_reads
+    def sjoin(self, other_df:pd.DataFrame, other_geometry_column:object, predicate:str="intersects", n_jobs:int=1) -> tuple:
+        """ This method joins the rows of PandasQuadtree.df with the rows of @other_df by the topological
+        relation of their geometries. @other_df is split into chunks, which are queried against the index.
+        
+        Args:
+            other_df (pandas.DataFrame): the dataframe joined with PandasQuadtree.df
+            other_geometry_column (str): the name of the geometry column in @other_df
+            predicate (str): the topological predicate, which has to be True for the geometry of a row in PandasQuadtree.df
+                and the geometry of a row in @other_df:
+                "intersects", "contains", "within", "touches", "overlaps", "crosses", "covers" or "covered_by". DEFAULT="intersects"
+            n_jobs (int): the number of processes used for the join, -1 uses all cpus.
+                The index and @other_df are passed once to every process, not for every chunk. DEFAULT=1
+                
+        Returns:
+            tuple(numpy.ndarray): ids of rows in the PandasQuadtree.df dataframe and ids of the matching rows in @other_df
+            
+        Raises:
+            ValueError: if @predicate is not supported
+        """
+        if predicate not in _CONVERSE_PREDICATES:
+            raise ValueError("unsupported predicate '{}', use one of {}".format(predicate, list(_CONVERSE_PREDICATES)))
+        
+        geometries = np.asarray(other_df[other_geometry_column].values, dtype=object)
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        
+        if n_jobs <= 1 or len(geometries) < 2:
+            other_positions, ids = self._sjoin_chunk(geometries, predicate)
+        else:
+            chunksize = -(-len(geometries) // (4 * n_jobs))
+            starts = range(0, len(geometries), chunksize)
+            with ProcessPoolExecutor(n_jobs, initializer=_init_sjoin_worker, initargs=(self, geometries, predicate)) as pool:
+                results = list(pool.map(_sjoin_worker, starts, [start + chunksize for start in starts]))
+            other_positions = np.concatenate([start + positions for start, (positions, _) in zip(starts, results)])
+            ids = np.concatenate([ids for _, ids in results])
+            
+        return ids, other_df.index.values[other_positions]
+    
+    def _sjoin_chunk(self, geometries:np.ndarray, predicate:str) -> tuple:
+        """
+        Args:
+            geometries (numpy.ndarray): The query geometries
+            predicate (str): the topological predicate (see PandasQuadtree.sjoin)
+            
+        Returns:
+            tuple(numpy.ndarray): positions in @geometries and the ids of the matching rows in the PandasQuadtree.df dataframe
+        """
+        offsets, ids = self.range_query_candidates_many(geometries)
+        positions = np.repeat(np.arange(len(geometries)), np.diff(offsets))
+        row_geometries, owners = self._geometries_of(ids)
+        pairs = positions if owners is None else positions[owners]
+        hits = getattr(shapely, _CONVERSE_PREDICATES[predicate])(_prepared(geometries)[pairs], row_geometries)
+        hits = _any_of(hits, owners, len(ids))
+        return positions[hits], ids[hits]
+    
+    def _geometries_of(self, ids:object) -> tuple:
+        """
+        Args:
+            ids (Sequence[object]): ids of rows in the PandasQuadtree.df dataframe
+            
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): the geometries of the rows with @ids and the positions of their ids in @ids.
+                If the index of PandasQuadtree.df is unique, the geometries are ordered like @ids and the positions are None.
+                Else an id has a geometry for every row with its label (see index._any_of).
+            
+        Raises:
+            KeyError: if an id is not a row of PandasQuadtree.df
+        """
+        positions, owners = self._rows_of(ids)
+        return self.df[self.geometry_column].values[positions], owners
+    
+    def _rows_of(self, ids:object) -> tuple:
+        """
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): the positions in PandasQuadtree.df of the rows with @ids and the positions
+                of their ids in @ids, None if the index of PandasQuadtree.df is unique (see PandasQuadtree._geometries_of)
+            
+        Raises:
+            KeyError: if an id is not a row of PandasQuadtree.df
+        """
+        index = self.df.index
+        if index.is_unique:
+            positions = index.get_indexer(ids)
+            missing = positions < 0
+            owners = None
+        else:
+            labels, order, offsets = self._label_rows()
+            codes = labels.get_indexer(ids)
+            missing = codes < 0
+            if not missing.any():
+                starts, ends = offsets[codes], offsets[codes + 1]
+                positions = order[_ranges(starts, ends)]
+                owners = np.repeat(np.arange(len(codes)), ends - starts)
+                
+        if missing.any():
+            raise KeyError([i for i, m in zip(ids, missing.tolist()) if m])
+        return positions, owners
+    
+    def _label_rows(self) -> tuple:
+        """
+        Returns:
+            tuple(pandas.Index, numpy.ndarray, numpy.ndarray): the unique labels of the index of PandasQuadtree.df,
+                the positions of the rows ordered by label and the offsets of the labels in the positions.
+                The arrays are kept until the index of PandasQuadtree.df is replaced.
+        """
+        index = self.df.index
+        if self._label_positions is None or self._label_positions[0] is not index:
+            codes, labels = index.factorize(use_na_sentinel=False)
+            offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(codes, minlength=len(labels)), out=offsets[1:])
+            self._label_positions = (index, labels, np.argsort(codes, kind="stable"), offsets)
+        return self._label_positions[1:]
+    
+    @_reads
+    def nearest(self, geometry:object, k:int=1, max_distance:float=None) -> List[object]:
+        """ This method returns the rows nearest to @geometry. The tree is traversed best-first by the distance
+        between the query extent and the extents of nodes and items, exact distances are only computed for
+        items, which could be closer than the k-th nearest row found so far.
+        
+        Args:
+            geometry (shapely.geometry): The query geometry
+            k (int): the number of rows to return. DEFAULT=1
+            max_distance (float, optional): rows with a greater distance to @geometry are not returned
+            
+        Returns:
+            List[object]: returns List with ids of up to @k rows in the PandasQuadtree.df dataframe,
+                ordered by the distance of their geometry to @geometry
+                
+        Note:
+            Items are expected to lie within the extent of the index. 
+        """
+        geometries = self.df[self.geometry_column].values
+        rows_of = self.df.index.get_loc if self.df.index.is_unique else (lambda pl: self._rows_of([pl])[0])
+        prepared = _prepared(geometry)
+        
+        nearest = []
+        seen = set()
+        for bound, pl in self._qdt.nearest_candidates(Rectangle(*geometry.bounds)):
+            if max_distance is not None and bound > max_distance:
+                break
+            if len(nearest) == k and bound > -nearest[0][0]:
+                break
+            if pl in seen:
+                continue
+            seen.add(pl)
+            
+            distance = float(np.min(shapely.distance(prepared, geometries[rows_of(pl)])))
+            if max_distance is not None and distance > max_distance:
+                continue
+            if len(nearest) < k:
+                heapq.heappush(nearest, (-distance, -len(seen), pl))
+            elif distance < -nearest[0][0]:
+                heapq.heapreplace(nearest, (-distance, -len(seen), pl))
+                
+        return [pl for _, _, pl in sorted(nearest, reverse=True)]
+    
+    @_writes
+    def save(self, path:str) -> None:
+        """ This method writes the index to a file, which can be opened with PandasQuadtree.load.
+        The file starts with a versioned header, followed by the node and item arrays of the tree.
+        The items reference the rows of PandasQuadtree.df by position.
+        
+        Args:
+            path (str): the path of the file
+            
+        Raises:
+            KeyError: if an item of the tree is not a row of PandasQuadtree.df
+        """
+        node_bounds, children, item_offsets, item_bounds, item_ids, placeholders = self._qdt.flatten()
+        referenced, item_ids = np.unique(item_ids, return_inverse=True)
+        positions, owners = self._rows_of([placeholders[i] for i in referenced.tolist()])
+        if owners is not None:
+            # an item with a duplicate label references the first row of the label, queries test all rows of the label
+            positions = positions[np.searchsorted(owners, np.arange(len(referenced)))]
+        
+        arrays = {"node_bounds": node_bounds, "children": children, "item_offsets": item_offsets,
+                  "item_bounds": item_bounds, "item_rows": positions[item_ids].astype(np.int64)}
+        header = {"engine": "points" if isinstance(self._qdt, _PointQuadtree) else "compact",
+                  "capacity": self.capacity, "bbox": list(self._qdt._bbox.bounds), "geometry_column": self.geometry_column,
+                  "n_rows": len(self.df), "index_hash": _index_hash(self.df.index), "arrays": []}
+        
+        offset = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            header["arrays"].append({"name": name, "dtype": array.dtype.str, "shape": array.shape, "offset": offset})
+            offset += -(-array.nbytes // _FILE_ALIGNMENT) * _FILE_ALIGNMENT
+            
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_offset = -(-(len(_FILE_MAGIC) + 8 + len(header_bytes)) // _FILE_ALIGNMENT) * _FILE_ALIGNMENT
+        
+        with open(path, "wb") as f:
+            f.write(_FILE_MAGIC)
+            f.write(np.array([_FILE_VERSION, len(header_bytes)], dtype="<u4").tobytes())
+            f.write(header_bytes)
+            for array, info in zip(arrays.values(), header["arrays"]):
+                f.seek(data_offset + info["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_offset + offset)
+    
+    @classmethod
+    def load(cls, path:str, df:pd.DataFrame, mmap:bool=True) -> "PandasQuadtree":
+        """ This method opens an index written by PandasQuadtree.save. The opened index uses the "points" engine,
+        if it was saved from an index using the "points" engine, else it uses the "compact" engine.
+        
+        Args:
+            path (str): the path of the file
+            df (pandas.DataFrame): the dataframe, for which the index was created
+            mmap (bool): if True, the arrays are memory-mapped read-only instead of being read into memory,
+                so that processes opening the same file share its pages. DEFAULT=True
+                
+        Returns:
+            index.PandasQuadtree: the index
+            
+        Raises:
+            ValueError: if the file is no index file, has an unsupported version or does not match the rows of @df
+        """
+        with open(path, "rb") as f:
+            magic = f.read(len(_FILE_MAGIC))
+            version, header_length = np.frombuffer(f.read(8), dtype="<u4")
+            if magic != _FILE_MAGIC:
+                raise ValueError("{} is no index file".format(path))
+            if version != _FILE_VERSION:
+                raise ValueError("unsupported index file version {}".format(version))
+            header = json.loads(f.read(int(header_length)).decode("utf-8"))
+            data_offset = -(-(len(_FILE_MAGIC) + 8 + int(header_length)) // _FILE_ALIGNMENT) * _FILE_ALIGNMENT
+            
+            if header["n_rows"] != len(df) or header["index_hash"] != _index_hash(df.index):
+                raise ValueError("the index file {} does not match the rows of the dataframe".format(path))
+            
+            if mmap:
+                buffer = np.memmap(f, dtype=np.uint8, mode="r")
+            else:
+                f.seek(0)
+                buffer = np.frombuffer(f.read(), dtype=np.uint8)
+                
+        arrays = {}
+        for info in header["arrays"]:
+            dtype, shape = np.dtype(info["dtype"]), tuple(info["shape"])
+            start = data_offset + info["offset"]
+            arrays[info["name"]] = buffer[start:start + dtype.itemsize * int(np.prod(shape))].view(dtype).reshape(shape)
+            
+        qdt = cls.__new__(cls)
+        qdt.df = df
+        qdt.geometry_column = header["geometry_column"]
+        qdt.bbox = sg.box(*header["bbox"])
+        qdt.capacity = header["capacity"]
+        qdt.engine = header.get("engine", "compact")
+        qdt.query_hook = None
+        qdt.cache_size = 0
+        qdt._cache = None
+        qdt._lock = None
+        qdt._label_positions = None
+        qdt._qdt = _ENGINES[qdt.engine].from_arrays(Rectangle(*header["bbox"]), header["capacity"], arrays["node_bounds"],
+                                                    arrays["children"], arrays["item_offsets"], arrays["item_bounds"],
+                                                    arrays["item_rows"], df.index.tolist())
+        return qdt
+    
+    async def range_query_async(self, geometry:object, executor:object=None, predicate:str="intersects") -> List[object]:
+        """ This method runs PandasQuadtree.range_query in @executor, so that the event loop is not blocked
+        
+        Args:
+            geometry (shapely.geometry): The query geometry
+            executor (concurrent.futures.Executor, optional): the executor, the default executor of the loop if None
+            predicate (str): the topological predicate (see PandasQuadtree.range_query). DEFAULT="intersects"
+            
+        Returns:
+            List[object]: see PandasQuadtree.range_query
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, self.range_query, geometry, predicate)
+    
+    async def range_query_many_async(self, geometries:object, executor:object=None) -> tuple:
+        """ This method runs PandasQuadtree.range_query_many in @executor, so that the event loop is not blocked
+        
+        Args:
+            geometries (Sequence[shapely.geometry]): The query geometries
+            executor (concurrent.futures.Executor, optional): the executor, the default executor of the loop if None
+            
+        Returns:
+            tuple(numpy.ndarray): see PandasQuadtree.range_query_many
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, self.range_query_many, geometries)
+    
+    async def nearest_async(self, geometry:object, k:int=1, max_distance:float=None, executor:object=None) -> List[object]:
+        """ This method runs PandasQuadtree.nearest in @executor, so that the event loop is not blocked
+        
+        Args:
+            geometry (shapely.geometry): The query geometry
+            k (int): the number of rows to return. DEFAULT=1
+            max_distance (float, optional): rows with a greater distance to @geometry are not returned
+            executor (concurrent.futures.Executor, optional): the executor, the default executor of the loop if None
+            
+        Returns:
+            List[object]: see PandasQuadtree.nearest
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(self.nearest, geometry, k, max_distance))
+    
+    @_reads
+    def memory_usage(self) -> int:
+        """
+        Returns:
+            int: the number of bytes used by the index structure, not counting PandasQuadtree.df
+        """
+        return self._qdt.memory_usage()
+        
+        
+class MortonIndex(SpatialIndex):
+    """This class provides a static index for shapely.geometry objects stored in the column of a pandas.DataFrame object.
+    The extents of the geometries are stored in arrays sorted by the Morton (Z-order) codes of their centers.
+    A range query decomposes the query extent into ranges of Morton codes, which are looked up by binary search.
+    
+    Attributes:
+        df (pandas.DataFrame): the dataframe for which the index will be created
+        geometry_column (str): the name of the geometry column in @df
+        bbox (shapely.geometry.box): The extent in which the centers of the geometries are ordered
+        bits (int): the number of bits per axis of the Morton codes. DEFAULT=16
+        
+    Note:
+        The index can not be changed, a new index has to be created for changed rows.
+        A query extent is enlarged by half of the largest width and height of the indexed geometries,
+        so that the extents of all geometries, whose center lies outside the query extent, are reached.
+        The largest 1% of the geometries are not ordered, but tested by every query, so that few very large
+        geometries do not enlarge all queries.
     """
-    def __init__(self, bbox:"Rectangle", capacity:int):
+    
+    def __init__(self, df:pd.DataFrame, geometry_column:object, bbox:sg.box=None, bits:int=16):
         """
         Args:
-            bbox (index.Rectangle): The extent for which the quadtree will be created
-            capacity (int): the maximum number of geometries, a node in the index can reference.
+            df (pandas.DataFrame): the dataframe for which the index will be created
+            geometry_column (str): the name of the geometry column in @df
+            bbox (shapely.geometry.box, optional): The extent in which the centers of the geometries are ordered.
+                If no extent is passed, the extent of the geometries in @df is used. Geometries exceeding the
+                extent are ordered by the closest Morton code and found by every query.
+            bits (int): the number of bits per axis of the Morton codes, at most 31. DEFAULT=16
+            
+        Raises:
+            ValueError: if @bits is not between 1 and 31
         """
-        self._bbox:"Rectangle" = bbox
-        self._capacity:int = capacity
-        self._geometries:object = []
-        self._placeholders:object = []
-        self._divided:boolean = False
+        if not 1 <= bits <= 31:
+            raise ValueError("bits has to be between 1 and 31")
+        
+        bounds = _geometry_bounds(df[geometry_column].values)
+        rows = np.flatnonzero(~np.isnan(bounds).any(axis=1))
+        extent = Rectangle(*bbox.bounds) if bbox is not None else _extent(bounds)
+        extent = extent if extent is not None else Rectangle(0.0, 0.0, 0.0, 0.0)
+        
+        sizes = np.max(bounds[rows, 2:] - bounds[rows, :2], axis=1)
+        large = sizes > np.quantile(sizes, 1.0 - _LARGE_ITEM_SHARE) if len(rows) else np.zeros(0, dtype=bool)
+        large_rows, rows = rows[large], rows[~large]
+        codes = _morton_codes(bounds[rows], extent, bits)
+        order = np.argsort(codes, kind="stable")
         
+        self.df = df
+        self.geometry_column = geometry_column
+        self.bbox = bbox if bbox is not None else sg.box(*extent.bounds)
+        self.bits = bits
+        self._extent:"Rectangle" = extent
+        self._codes:np.ndarray = codes[order]
+        self._item_bounds:np.ndarray = bounds[rows[order]]
+        self._rows:np.ndarray = rows[order]
+        self._large_bounds:np.ndarray = bounds[large_rows]
+        self._large_rows:np.ndarray = large_rows
+        sizes = self._item_bounds[:, 2:] - self._item_bounds[:, :2]
+        self._half_size:tuple = tuple((sizes.max(axis=0) / 2).tolist()) if len(sizes) else (0.0, 0.0)
+        
+    def insert(self, geometry:object, row_index:object):
+        """
+        Raises:
+            NotImplementedError: the index can not be changed
+        """
+        raise NotImplementedError("a MortonIndex can not be changed, create a new index")
+    
+    def remove(self, row_index:object):
+        """
+        Raises:
+            NotImplementedError: the index can not be changed
+        """
+        raise NotImplementedError("a MortonIndex can not be changed, create a new index")
+    
+    def range_query_candidates(self, geometry:object) -> List[object]:
+        """
+        Args:
+            geometry (shapely.geometry): The query geometry
+            
+        Returns:
+            List[object]: returns List with ids of rows in the MortonIndex.df dataframe,
+                for which the topological predicate with the @geometry argument could be False
+                (see PandasQuadtree.range_query_candidates)
+        """
+        return self._labels_of(self._query_rows(Rectangle(*geometry.bounds)))
+    
+    def range_query(self, geometry:object) -> List[object]:
+        """
+        Args:
+            geometry (shapely.geometry): The query geometry
+            
+        Returns:
+            List[object]: returns List with ids of rows in the MortonIndex.df dataframe,
+                for which the topological predicate with the @geometry argument is False.
+        """
+        rows = self._query_rows(Rectangle(*geometry.bounds))
+        if len(rows):
+            rows = rows[~shapely.disjoint(_prepared(geometry), self.df[self.geometry_column].values[rows])]
+        return self._labels_of(rows)
+    
+    def _labels_of(self, rows:np.ndarray) -> List[object]:
+        """
+        Args:
+            rows (numpy.ndarray): positions of rows in MortonIndex.df
+            
+        Returns:
+            List[object]: the ids of the rows at @rows, an id shared by several rows is returned once
+        """
+        labels = self.df.index.values[rows]
+        if not self.df.index.is_unique:
+            labels = pd.unique(labels)
+        return labels.tolist()
+    
+    def _query_rows(self, rect:"Rectangle") -> np.ndarray:
+        """
+        Args:
+            rect (index.Rectangle): The query rectangle
+            
+        Returns:
+            numpy.ndarray: the positions in MortonIndex.df of the rows, whose extent is not disjoint with @rect
+        """
+        if np.isnan(rect.bounds).any():
+            return np.empty(0, dtype=np.int64)
+        
+        large_rows = self._large_rows[~_disjoint_mask(self._large_bounds, rect)]
+        if not len(self._codes):
+            return large_rows
+        
+        half_width, half_height = self._half_size
+        centers = np.array([[rect.xmin - half_width, rect.ymin - half_height], [rect.xmax + half_width, rect.ymax + half_height]])
+        cells = _grid_cells(centers, self._extent, self.bits)
+        starts, ends = _morton_ranges(cells[0], cells[1], self.bits)
+        slots = _ranges(np.searchsorted(self._codes, starts, "left"), np.searchsorted(self._codes, ends, "right"))
+        return np.concatenate([self._rows[slots[~_disjoint_mask(self._item_bounds[slots], rect)]], large_rows])
+    
+    def memory_usage(self) -> int:
+        """
+        Returns:
+            int: the number of bytes used by the index structure, not counting MortonIndex.df
+        """
+        arrays = (self._codes, self._item_bounds, self._rows, self._large_bounds, self._large_rows)
+        return sys.getsizeof(self) + sum(a.nbytes for a in arrays)
+    
+    
+class _SecondaryQuadtree1(object):
+    """
+    This class provides a quadtree index using the extent of the indexed geometries.
+    The items are stored in the nodes as well as the leaves of the tree.
+    This implies faster build and insert times with slower query times.
+    """
+    __slots__ = ("_bbox", "_capacity", "_rects", "_bounds", "_placeholders", "_divided", "_locations",
+                 "_northwest", "_northeast", "_southeast", "_southwest", "_boxlist")
+    
+    # the way index._bulk_partition distributes the items and the maximum depth of the tree
+    _partition:str = "mixed"
+    _max_depth:int = None
+    
+    def __init__(self, bbox:"Rectangle", capacity:int):
+        """
+        Args:
+            bbox (index.Rectangle): The extent for which the quadtree will be created
+            capacity (int): the maximum number of geometries, a node in the index can reference.
+        """
+        self._bbox:"Rectangle" = bbox
+        self._capacity:int = capacity
+        # the extents of the items as index.Rectangle objects and as an array of shape (k, 4),
+        # either of them is created from the other one on first access (see _SecondaryQuadtree1._geometries)
+        self._rects:object = []
+        self._bounds:np.ndarray = None
+        self._placeholders:object = []
+        self._divided:boolean = False
+        # maps the placeholders to the nodes referencing them, only kept by the root and created by the first remove
+        self._locations:dict = None
+        
+    def insert(self, geom:object, placeholder:object) -> bool:
+        """ This method inserts an item into the tree. If the geometry of the inserted item
+        is not covered by the _SecondaryQuadtree1._bbox, the tree is grown first (see _SecondaryQuadtree1._grow).
+        
+        Args:
+            geom (shapely.geometry or index.Rectangle): The geomtery of the inserted item
+            placeholder (object): The placeholder of the item
+            
+        Returns:
+            bool: Returns True if item was inserted, else returns False. Items without extent are not inserted
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+        if np.isnan(geom.bounds).any():
+            return False
+            
+        if not self._cell().contains(geom):
+            self._grow(geom)
+        
+        return self._insert(geom, placeholder, self._locations)
+    
+    def insert_many(self, bounds:np.ndarray, placeholders:List[object]) -> int:
+        """ This method inserts many items into the tree, one after the other.
+        The tree is grown once to cover the extent of all items first (see _SecondaryQuadtree1._grow).
+        
+        Args:
+            bounds (numpy.ndarray): array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of the items
+            placeholders (List[object]): the placeholders of the items
+            
+        Returns:
+            int: the number of inserted items, items without extent are not inserted
+        """
+        valid = ~np.isnan(bounds).any(axis=1)
+        extent = _extent(bounds[valid])
+        if extent is not None and not self._cell().contains(extent):
+            self._grow(extent)
+        for extent, placeholder in zip(bounds[valid].tolist(), itertools.compress(placeholders, valid.tolist())):
+            self.insert(Rectangle(*extent), placeholder)
+        return int(valid.sum())
+    
+    def flush(self) -> None:
+        """ The tree does not buffer changes """
+        pass
+    
+    @property
+    def _geometries(self) -> List["Rectangle"]:
+        """
+        Returns:
+            List[index.Rectangle]: the extents of the items stored in this node. A bulk loaded node only holds
+                _SecondaryQuadtree1._bounds, the rectangles are created once they are needed.
+        """
+        if self._rects is None:
+            self._rects = [Rectangle(*b) for b in self._bounds.tolist()]
+        return self._rects
+    
+    @_geometries.setter
+    def _geometries(self, geometries:List["Rectangle"]) -> None:
+        self._rects = geometries
+        self._bounds = None
+        
+    def _item_bounds(self) -> np.ndarray:
+        """
+        Returns:
+            numpy.ndarray: array of shape (k, 4) holding the extents of the items stored in this node,
+                kept until the items of the node are changed
+        """
+        if self._bounds is None:
+            self._bounds = np.array([g.bounds for g in self._rects], dtype=np.float64).reshape(-1, 4)
+        return self._bounds
+    
+    def _cell(self) -> "Rectangle":
+        """
+        Returns:
+            index.Rectangle: the part of the extent of the tree, which is divided between the leafs of this node
+        """
+        return self._bbox
+    
+    def _set_cell(self, cell:"Rectangle") -> None:
+        """ This method sets the part of the extent of the tree, which is divided between the leafs of this node """
+        self._bbox = cell
+    
+    def _grow(self, geom:"Rectangle") -> None:
+        """ This method grows the extent of the tree, until it covers @geom. An empty tree takes the extent of @geom,
+        otherwise the content of the root is moved to a new node, which becomes a leaf of the root with doubled extent.
+        """
+        if not self._divided and not self._geometries:
+            self._set_cell(geom)
+            return
+        
+        while not self._cell().contains(geom):
+            bbox, position, rdiv = _grow_step(self._cell(), geom)
+            
+            old = type(self)(self._cell(), self._capacity)
+            old._geometries, old._placeholders, old._divided = self._geometries, self._placeholders, self._divided
+            if self._divided:
+                old._northwest, old._northeast, old._southeast, old._southwest = self._boxlist
+                old._boxlist = self._boxlist
+            if self._locations is not None:
+                for pl in old._placeholders:
+                    nodes = self._locations[pl]
+                    nodes[nodes.index(self)] = old
+            
+            boxlist = [old if i == position else type(self)(r, self._capacity) for i, r in enumerate(rdiv)]
+            self._set_cell(bbox)
+            self._northwest, self._northeast, self._southeast, self._southwest = boxlist
+            self._boxlist = boxlist
+            self._geometries, self._placeholders, self._divided = [], [], True
+        
+    def _insert(self, geom:"Rectangle", placeholder:object, locations:dict, depth:int=0) -> bool:
+        """ This method inserts an item into the subtree of this node (see _SecondaryQuadtree1.insert)
+        and records the nodes referencing the item in @locations, if it is not None.
+        @depth is the depth of this node in the tree.
+        """
+        if self._bbox.disjoint(geom):
+            return False
+        
+        if len(self._geometries) < self._capacity:
+            self._append(geom, placeholder, locations)
+            return True
+            
+        if self._divided or self.subdivide():
+            return any([box._insert(geom, placeholder, locations, depth + 1) for box in self._boxlist])
+        
+        self._append(geom, placeholder, locations)
+        
+    def _append(self, geom:"Rectangle", placeholder:object, locations:dict) -> None:
+        """ This method stores an item in this node and records the node in @locations, if it is not None """
+        self._geometries.append(geom)
+        self._bounds = None
+        self._placeholders.append(placeholder)
+        if locations is not None:
+            locations.setdefault(placeholder, []).append(self)
+        
+    def remove(self, placeholder:object) -> bool:
+        """ This method removes all items with @placeholder from the tree. The nodes referencing the items
+        are looked up in _SecondaryQuadtree1._locations. Divided nodes, whose subtree references no more than
+        _SecondaryQuadtree1._capacity items afterwards, are merged into a single node.
+        
+        Args:
+            placeholder (object): The placeholder of the removed items
+            
+        Returns:
+            bool: Returns True if an item was removed, else returns False
+        """
+        if self._locations is None:
+            self._locations = {}
+            for node in self._nodes():
+                for pl in node._placeholders:
+                    self._locations.setdefault(pl, []).append(node)
+        
+        nodes = self._locations.pop(placeholder, None)
+        if nodes is None:
+            return False
+        
+        nodes = list({id(node): node for node in nodes}.values())
+        for node in nodes:
+            items = [(g, pl) for g, pl in zip(node._geometries, node._placeholders) if pl != placeholder]
+            node._geometries = [g for g, _ in items]
+            node._placeholders = [pl for _, pl in items]
+            
+        for node in nodes:
+            self._condense(node)
+        return True
+    
+    def _nodes(self) -> object:
+        """
+        Yields:
+            index._SecondaryQuadtree1: this node and all its descendants
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node._divided:
+                stack.extend(node._boxlist)
+                
+    def _path(self, node:"_SecondaryQuadtree1") -> List["_SecondaryQuadtree1"]:
+        """
+        Args:
+            node (index._SecondaryQuadtree1): a descendant of this node
+            
+        Returns:
+            List[index._SecondaryQuadtree1]: the nodes from this node down to @node or an empty list,
+                if @node is not part of the subtree.
+        """
+        path = [self]
+        cell = node._cell()
+        while path[-1] is not node:
+            if not path[-1]._divided:
+                return []
+            for box in path[-1]._boxlist:
+                if box._cell().contains(cell):
+                    path.append(box)
+                    break
+        return path
+    
+    def _condense(self, node:"_SecondaryQuadtree1") -> None:
+        """ This method merges the ancestors of @node and @node itself with their subtree, starting with
+        the lowest one, as long as the subtree references no more than _SecondaryQuadtree1._capacity items.
+        """
+        for ancestor in reversed(self._path(node)):
+            if not ancestor._divided:
+                continue
+            
+            descendants, items = ancestor._collect(ancestor._capacity)
+            if items is None:
+                return
+            
+            for d in [ancestor] + descendants:
+                for pl in d._placeholders:
+                    locations = self._locations[pl]
+                    locations.remove(d)
+                    if not locations:
+                        del self._locations[pl]
+                    
+            ancestor._geometries, ancestor._placeholders = [], []
+            ancestor._divided = False
+            del ancestor._northwest, ancestor._northeast, ancestor._southeast, ancestor._southwest, ancestor._boxlist
+            for g, pl in items:
+                ancestor._append(g, pl, self._locations)
+            
+    def _collect(self, limit:int) -> tuple:
+        """
+        Args:
+            limit (int): the maximum number of items to collect
+            
+        Returns:
+            tuple(List[index._SecondaryQuadtree1], List[tuple]): all descendants of this node and the unique items
+                (geometry, placeholder) referenced by the node and its descendants. If more than @limit items are referenced,
+                the items are None.
+        """
+        descendants = []
+        items = {}
+        for node in self._nodes():
+            items.update(((g.bounds, pl), (g, pl)) for g, pl in zip(node._geometries, node._placeholders))
+            if len(items) > limit:
+                return descendants, None
+            if node is not self:
+                descendants.append(node)
+        return descendants, list(items.values())
+        
+    @classmethod
+    def bulk_load(cls, bbox:"Rectangle", capacity:int, bounds:np.ndarray, placeholders:object, n_jobs:int=1) -> "_SecondaryQuadtree1":
+        """ This method builds a quadtree top-down from the extents of all items at once (see index._bulk_partition).
+        Items which are disjoint with @bbox are not inserted.
+        
+        Args:
+            bbox (index.Rectangle): The extent for which the quadtree will be created
+            capacity (int): the maximum number of geometries, a node in the index can reference.
+            bounds (numpy.ndarray): array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of the items
+            placeholders (Sequence[object]): the placeholders of the items
+            n_jobs (int): the number of processes partitioning the items (see index._parallel_partition).
+                The nodes are created by the calling process, they can not be passed between processes cheaply. DEFAULT=1
+            
+        Returns:
+            index._SecondaryQuadtree1: the root of the created quadtree
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        placeholders = np.fromiter(placeholders, dtype=object, count=len(bounds))
+        node_bounds, children, item_offsets, items = _parallel_partition(bbox, capacity, bounds, cls._partition, cls._max_depth, n_jobs)
+        
+        item_bounds = bounds[items]
+        placeholders = placeholders[items].tolist()
+        item_offsets = item_offsets.tolist()
+        node_bounds = node_bounds.tolist()
+        
+        nodes = [cls(bbox, capacity)]
+        for k, first_child in enumerate(children.tolist()):
+            node = nodes[k]
+            if first_child >= 0:
+                node._split([Rectangle(*b) for b in node_bounds[first_child:first_child + 4]])
+                nodes.extend(node._boxlist)
+            start, stop = item_offsets[k], item_offsets[k + 1]
+            node._rects, node._bounds = None, item_bounds[start:stop]
+            node._placeholders = placeholders[start:stop]
+                
+        return nodes[0]
+        
+    def nearest_candidates(self, geom:"Rectangle") -> object:
+        """This method traverses the tree best-first by the distance of the node extents to @geom.
+        
+        Args:
+            geom (index.Rectangle): The query rectangle
+            
+        Yields:
+            tuple(float, object): the distance between the extent of an item and @geom and the placeholder of the item,
+                ordered by the distance. An item can be yielded more than once.
+        """
+        counter = itertools.count()
+        heap = [(0.0, next(counter), self, None)]
+        while heap:
+            distance, _, node, placeholder = heapq.heappop(heap)
+            if node is None:
+                yield distance, placeholder
+                continue
+            
+            for g, pl in zip(node._geometries, node._placeholders):
+                heapq.heappush(heap, (geom.distance(g), next(counter), None, pl))
+            if node._divided:
+                for box in node._boxlist:
+                    heapq.heappush(heap, (geom.distance(box._bbox), next(counter), box, None))
+                    
+    def flatten(self) -> tuple:
+        """
+        Returns:
+            tuple: the tree in the layout of index._CompactQuadtree
+                node_bounds, children and item_offsets (see index._bulk_partition),
+                item_bounds, item_ids and the placeholders referenced by item_ids
+        """
+        nodes = [self]
+        children = []
+        k = 0
+        while k < len(nodes):
+            if nodes[k]._divided:
+                children.append(len(nodes))
+                nodes.extend(nodes[k]._boxlist)
+            else:
+                children.append(-1)
+            k += 1
+            
+        item_offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum([len(node._placeholders) for node in nodes], out=item_offsets[1:])
+        placeholders = [pl for node in nodes for pl in node._placeholders]
+        item_bounds = np.concatenate([np.empty((0, 4))] + [node._item_bounds() for node in nodes])
+        node_bounds = np.array([node._bbox.bounds for node in nodes], dtype=np.float64)
+        return node_bounds, np.array(children, dtype=np.int64), item_offsets, item_bounds, np.arange(len(placeholders)), placeholders
+        
+    def tree_stats(self) -> dict:
+        """
+        Returns:
+            dict: the shape of the tree (see PandasQuadtree.tree_stats)
+        """
+        counts, depths, divided = [], [], []
+        level = [self]
+        while level:
+            counts.extend(len(node._placeholders) for node in level)
+            depths.extend([depths[-1] + 1 if depths else 0] * len(level))
+            divided.extend(node._divided for node in level)
+            level = [box for node in level if node._divided for box in node._boxlist]
+        return _tree_stats(np.array(counts, dtype=np.int64), np.array(depths, dtype=np.int64),
+                           np.array(divided, dtype=bool), self._capacity, 0)
+        
+    def memory_usage(self) -> int:
+        """
+        Returns:
+            int: the number of bytes used by the nodes, lists, rectangles and bounds arrays of the tree, not counting the placeholders themselves
+        """
+        size = 0
+        rectangles = {}
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            size += sys.getsizeof(node) + sys.getsizeof(node._placeholders)
+            rectangles[id(node._bbox)] = node._bbox
+            rectangles[id(node._cell())] = node._cell()
+            if node._rects is not None:
+                size += sys.getsizeof(node._rects)
+                rectangles.update((id(g), g) for g in node._rects)
+            if node._bounds is not None:
+                size += node._bounds.nbytes
+            if node._divided:
+                size += sys.getsizeof(node._boxlist)
+                stack.extend(node._boxlist)
+        if self._locations is not None:
+            size += sys.getsizeof(self._locations) + sum(sys.getsizeof(nodes) for nodes in self._locations.values())
+        return size + sum(sys.getsizeof(r) + sys.getsizeof(r.bounds) for r in rectangles.values())
+            
+    def subdivide(self) -> bool:
+        """This method turns the quadtree object into a node and creates four leafs for this node.
+        These leafes are named:
+            self._northwest
+            self._northeast
+            self._southeast
+            self._southwest
+            
+        Note:
+            If the extent of all geometries references by the _SecondaryQuadtree object, is equal,
+            no subdivision is performed
+            
+        Returns:
+            bool: Returns True if subdivision was performed, else returns False
+        """
+        # check for equal geometries, the extents are equal, if they are all equal to the first one
+        if len(self._geometries) > 1:
+            first = self._geometries[0]
+            if all(g == first for g in self._geometries):
+                return False
+        
+        self._split()
+        return True
+    
+    def _split(self, cells:List["Rectangle"]=None) -> None:
+        """This method creates the four leafs of the quadtree object, without checking the referenced geometries.
+        @cells are the quadrants [northwest, northeast, southeast, southwest] of the node, they are computed if None.
+        """
+        northwest, northeast, southeast, southwest = cells if cells is not None else self._cell().division().boxlist
+        self._northwest = type(self)(northwest, self._capacity)
+        self._northeast = type(self)(northeast, self._capacity)
+        self._southeast = type(self)(southeast, self._capacity)
+        self._southwest = type(self)(southwest, self._capacity)
+        self._boxlist = [self._northwest, self._northeast, self._southeast, self._southwest]
+        # the leafs exist, before the node is marked as divided
+        self._divided = True
+        
+    def range_query(self, geom, stats:dict=None):
+        """This method returns the placeholder of all stored items, for which the extent is not disjoint
+            with the extent of @geom.
+            
+        Args:
+            geom (shapely.geometry or index.Rectangle): The query geometry
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Returns:
+            List[object]: returns List with placeholders of items in the index for which the topological predicate 'disjoint',
+                compared to the extent of @ggeom is False.
+        
+        """
+        return list(self.iter_range_query(geom, stats))
+    
+    def iter_range_query(self, geom, stats:dict=None) -> object:
+        """This method traverses the tree depth-first with an explicit stack and yields the placeholders of the
+        stored items, for which the extent is not disjoint with the extent of @geom, as soon as they are found.
+        
+        Args:
+            geom (shapely.geometry or index.Rectangle): The query geometry
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Yields:
+            object: the placeholders of the found items, every placeholder is yielded once
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+        
+        seen = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if stats is not None:
+                stats["nodes_visited"] += 1
+                stats["bbox_tests"] += len(node._geometries) + (4 if node._divided else 0)
+                
+            for pl, g in zip(node._placeholders, node._geometries):
+                if pl not in seen and not g.disjoint(geom):
+                    seen.add(pl)
+                    yield pl
+                    
+            if node._divided:
+                stack.extend(box for box in reversed(node._boxlist) if not geom.disjoint(box._bbox))
+        
+    def range_query_covered(self, geom:object, covered:object, stats:dict=None) -> tuple:
+        """This method returns the placeholders of all stored items, for which the extent is not disjoint
+        with the extent of @geom, like _SecondaryQuadtree1.range_query. The items, whose extent lies within the extent
+        of a node, for which @covered is True, are returned apart. @covered is called once for the leafs of a node.
+        
+        Args:
+            geom (shapely.geometry or index.Rectangle): The query geometry
+            covered (callable): takes an array of shape (k, 4) holding the extents of nodes within the extent of @geom
+                and returns a boolean array, True for the extents, whose items are accepted
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Returns:
+            tuple(List[object], List[object]): the placeholders of the items within a covered node extent
+                and the placeholders of the remaining items, every placeholder is returned once
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+        
+        accepted, candidates = {}, {}
+        root_cover = self._bbox if geom.contains(self._bbox) and covered(np.array([self._bbox.bounds]))[0] else None
+        stack = [(self, root_cover)]
+        while stack:
+            node, cover = stack.pop()
+            if stats is not None:
+                stats["nodes_visited"] += 1
+                stats["bbox_tests"] += len(node._geometries) + (4 if node._divided else 0)
+                
+            for pl, g in zip(node._placeholders, node._geometries):
+                if cover is not None and cover.contains(g):
+                    accepted[pl] = None
+                elif not g.disjoint(geom):
+                    candidates[pl] = None
+                    
+            if node._divided:
+                boxes = [box for box in reversed(node._boxlist) if not geom.disjoint(box._bbox)]
+                if cover is None:
+                    inside = [box for box in boxes if geom.contains(box._bbox)]
+                    flags = covered(np.array([box._bbox.bounds for box in inside])).tolist() if inside else []
+                    covers = {id(box): box._bbox for box, flag in zip(inside, flags) if flag}
+                    stack.extend((box, covers.get(id(box))) for box in boxes)
+                else:
+                    stack.extend((box, cover) for box in boxes)
+                    
+        return list(accepted), [pl for pl in candidates if pl not in accepted]
+    
+    def range_query_many(self, bounds:np.ndarray) -> tuple:
+        """This method returns the placeholders of all stored items, for which the extent is not disjoint with
+        one of the query extents. The tree is traversed once for all queries.
+        
+        Args:
+            bounds (numpy.ndarray): array of shape (q, 4) holding the query extents [xmin, ymin, xmax, ymax]
+            
+        Returns:
+            tuple(numpy.ndarray, List[object]): offsets of shape (q + 1,) and placeholders,
+                the placeholders found for query i are placeholders[offsets[i]:offsets[i + 1]]
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        query_ids, placeholders = [np.empty(0, dtype=np.int64)], []
+        stack = [(self, np.flatnonzero(~np.isnan(bounds).any(axis=1)))]
+        while stack:
+            node, queries = stack.pop()
+            
+            # the queries are tested against the cached extents of the items and the extents of the leafs at once
+            extents = node._item_bounds()
+            if node._divided:
+                extents = np.concatenate([extents, [box._bbox.bounds for box in node._boxlist]])
+            hits = ~_disjoint_rows(bounds[queries, None], extents[None])
+            n_items = len(node._placeholders)
+            
+            if n_items:
+                query_index, item_index = np.nonzero(hits[:, :n_items])
+                query_ids.append(queries[query_index])
+                placeholders.extend([node._placeholders[i] for i in item_index.tolist()])
+                
+            if node._divided:
+                for box, box_hits in zip(node._boxlist, hits[:, n_items:].T):
+                    box_queries = queries[box_hits]
+                    if len(box_queries):
+                        stack.append((box, box_queries))
+                        
+        codes, uniques = pd.factorize(placeholders)
+        offsets, codes = _unique_pairs(np.concatenate(query_ids), codes, len(bounds), len(uniques))
+        return offsets, uniques[codes].tolist()
+        
+        
+class _SecondaryQuadtree2(_SecondaryQuadtree1):
+    """
+    This class provides a quadtree index using the extent of the indexed geometries.
+    The items are only stored in the leaves of the tree, an item is referenced by every leaf its extent is not
+    disjoint with. This implies faster query times for points and small geometries, large geometries are
+    referenced many times.
+    """
+    __slots__ = ()
+    
+    _partition:str = "leaves"
+    _max_depth:int = 24
+    
+    def _insert(self, geom:"Rectangle", placeholder:object, locations:dict, depth:int=0) -> bool:
+        """ This method inserts an item into every leaf of the subtree of this node its extent is not disjoint with
+        (see _SecondaryQuadtree1._insert). A leaf exceeding the capacity is divided (see _SecondaryQuadtree2._push_down).
+        """
+        if self._bbox.disjoint(geom):
+            return False
+        
+        if self._divided:
+            return any([box._insert(geom, placeholder, locations, depth + 1) for box in self._boxlist])
+        
+        self._append(geom, placeholder, locations)
+        if len(self._geometries) > self._capacity:
+            self._push_down(locations, depth)
+        return True
+    
+    def _push_down(self, locations:dict, depth:int) -> None:
+        """ This method divides the leaf and passes all its items on to the new leafs. No division is performed,
+        if the leaf is at _SecondaryQuadtree2._max_depth, if the extent of all items is equal, if at most
+        _SecondaryQuadtree2._capacity items do not cover the leaf or if every item is not disjoint with more than one
+        new leaf. Dividing would only copy the remaining items into ever smaller leafs.
+        """
+        if self._max_depth is not None and depth >= self._max_depth:
+            return
+        
+        geometries, placeholders = self._geometries, self._placeholders
+        first = geometries[0]
+        if all(g == first for g in geometries):
+            return
+        
+        cell = self._cell()
+        if sum(not g.contains(cell) for g in geometries) <= self._capacity:
+            return
+        
+        rdiv = cell.division()
+        xmid, ymid = rdiv.northwest.xmax, rdiv.northwest.ymin
+        if all(g.xmin <= xmid <= g.xmax or g.ymin <= ymid <= g.ymax for g in geometries):
+            return
+        
+        self._split()
+        self._geometries, self._placeholders = [], []
+        for g, pl in zip(geometries, placeholders):
+            if locations is not None:
+                locations[pl].remove(self)
+            for box in self._boxlist:
+                box._insert(g, pl, locations, depth + 1)
+                
+                
+class _LooseQuadtree(_SecondaryQuadtree1):
+    """
+    This class provides a loose quadtree index using the extent of the indexed geometries. The extent of a node
+    is its quadrant of the parent node, scaled by two around its center. Every item is stored once, in the deepest
+    node which holds the center of the item in its quadrant and covers the extent of the item.
+    This implies a smaller index for large geometries, but overlapping nodes have to be visited by queries.
+    
+    Attributes:
+        _tight (index.Rectangle): the quadrant of the node, which is divided between its leafs
+    """
+    __slots__ = ("_tight",)
+    
+    _partition:str = "loose"
+    _max_depth:int = 24
+    
+    def __init__(self, bbox:"Rectangle", capacity:int):
+        """
+        Args:
+            bbox (index.Rectangle): The quadrant for which the quadtree will be created
+            capacity (int): the maximum number of geometries, a node in the index can reference.
+        """
+        super().__init__(_loose(bbox), capacity)
+        self._tight:"Rectangle" = bbox
+        
+    def _cell(self) -> "Rectangle":
+        """
+        Returns:
+            index.Rectangle: the quadrant of the node, which is divided between its leafs
+        """
+        return self._tight
+    
+    def _set_cell(self, cell:"Rectangle") -> None:
+        """ This method sets the quadrant of the node and its extent """
+        self._tight = cell
+        self._bbox = _loose(cell)
+        
+    def _quadrant(self, geom:"Rectangle") -> "_LooseQuadtree":
+        """
+        Returns:
+            index._LooseQuadtree: the leaf of this node, whose quadrant holds the center of @geom
+        """
+        nw = self._northwest._tight
+        east = (geom.xmin + geom.xmax) / 2 >= nw.xmax
+        north = (geom.ymin + geom.ymax) / 2 >= nw.ymin
+        if north:
+            return self._northeast if east else self._northwest
+        return self._southeast if east else self._southwest
+        
+    def _insert(self, geom:"Rectangle", placeholder:object, locations:dict, depth:int=0) -> bool:
+        """ This method inserts an item into the deepest node of the subtree of this node, which holds the center of
+        @geom in its quadrant and covers @geom (see _SecondaryQuadtree1._insert).
+        A leaf exceeding the capacity is divided (see _LooseQuadtree._push_down).
+        """
+        if self._bbox.disjoint(geom):
+            return False
+        
+        node = self
+        while node._divided:
+            box = node._quadrant(geom)
+            if not box._bbox.contains(geom):
+                break
+            node, depth = box, depth + 1
+        
+        node._append(geom, placeholder, locations)
+        if not node._divided and len(node._geometries) > node._capacity:
+            node._push_down(locations, depth)
+        return True
+    
+    def _push_down(self, locations:dict, depth:int) -> None:
+        """ This method divides the leaf and passes the items fitting into a new leaf on. No division is performed,
+        if the leaf is at _LooseQuadtree._max_depth, if the extent of all items is equal or if no item fits into a new leaf.
+        """
+        if self._max_depth is not None and depth >= self._max_depth:
+            return
+        
+        geometries, placeholders = self._geometries, self._placeholders
+        first = geometries[0]
+        if all(g == first for g in geometries):
+            return
+        
+        self._split()
+        fits = [self._quadrant(g)._bbox.contains(g) for g in geometries]
+        if not any(fits):
+            self._divided = False
+            del self._northwest, self._northeast, self._southeast, self._southwest, self._boxlist
+            return
+        
+        self._geometries = [g for g, fit in zip(geometries, fits) if not fit]
+        self._placeholders = [pl for pl, fit in zip(placeholders, fits) if not fit]
+        for g, pl, fit in zip(geometries, placeholders, fits):
+            if fit:
+                if locations is not None:
+                    locations[pl].remove(self)
+                self._quadrant(g)._insert(g, pl, locations, depth + 1)
+        
+        
+class _CompactQuadtree(object):
+    """
+    This class provides the same quadtree as index._SecondaryQuadtree1, but stores it as a struct of arrays
+    instead of a Python object per node. The nodes are stored in breadth-first order, the four leafs of a node
+    are consecutive. Inserted items are collected in a buffer and removed items are flagged, the arrays are rebuilt
+    once too many items are buffered or flagged.
+    """
+    # the way index._bulk_partition distributes the items
+    _partition:str = "mixed"
+    
+    def __init__(self, bbox:"Rectangle", capacity:int):
+        """
+        Args:
+            bbox (index.Rectangle): The extent for which the quadtree will be created
+            capacity (int): the maximum number of geometries, a node in the index can reference.
+        """
+        self._bbox:"Rectangle" = bbox
+        self._capacity:int = capacity
+        self._node_bounds:np.ndarray = np.array([bbox.bounds], dtype=np.float64)
+        self._children:np.ndarray = np.full(1, -1, dtype=np.int64)
+        self._item_offsets:np.ndarray = np.zeros(2, dtype=np.int64)
+        self._item_bounds:np.ndarray = np.empty((0, 4), dtype=np.float64)
+        self._item_ids:np.ndarray = np.empty(0, dtype=np.int64)
+        self._placeholders:list = []
+        self._pending_bounds:np.ndarray = np.empty((0, 4), dtype=np.float64)
+        self._pending_ids:np.ndarray = np.empty(0, dtype=np.int64)
+        self._n_pending:int = 0
+        self._removed:np.ndarray = np.zeros(0, dtype=bool)
+        self._n_removed:int = 0
+        # maps the placeholders to their positions in _placeholders, created by the first remove
+        self._ids:dict = None
+        # the code of the placeholder of every item, items with equal placeholders have equal codes.
+        # the codes of the built items are the positions of their placeholders in _labels, inserted placeholders
+        # are coded by _new_codes. _shared is True, if items can share a placeholder.
+        self._codes:np.ndarray = np.empty(0, dtype=np.int64)
+        self._labels:pd.Index = pd.Index([], dtype=object)
+        self._new_codes:dict = {}
+        self._shared:bool = False
+        
+    @classmethod
+    def bulk_load(cls, bbox:"Rectangle", capacity:int, bounds:np.ndarray, placeholders:object, n_jobs:int=1) -> "_CompactQuadtree":
+        """ This method builds a quadtree top-down from the extents of all items at once (see index._bulk_partition).
+        Items which are disjoint with @bbox are not inserted.
+        
+        Args:
+            bbox (index.Rectangle): The extent for which the quadtree will be created
+            capacity (int): the maximum number of geometries, a node in the index can reference.
+            bounds (numpy.ndarray): array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of the items
+            placeholders (Sequence[object]): the placeholders of the items
+            n_jobs (int): the number of processes partitioning the items (see index._parallel_partition). DEFAULT=1
+            
+        Returns:
+            index._CompactQuadtree: the created quadtree
+        """
+        qdt = cls(bbox, capacity)
+        qdt._build(np.asarray(bounds, dtype=np.float64).reshape(-1, 4), list(placeholders), n_jobs)
+        return qdt
+    
+    def _build(self, bounds:np.ndarray, placeholders:list, n_jobs:int=1) -> None:
+        """ This method replaces the content of the tree with the items defined by @bounds and @placeholders """
+        self._node_bounds, self._children, self._item_offsets, items = _parallel_partition(self._bbox, self._capacity, bounds,
+                                                                                           self._partition, n_jobs=n_jobs)
+        stored = np.unique(items)
+        self._placeholders = [placeholders[i] for i in stored.tolist()]
+        self._item_ids = np.searchsorted(stored, items)
+        self._item_bounds = bounds[items]
+        self._pending_bounds = np.empty((0, 4), dtype=np.float64)
+        self._pending_ids = np.empty(0, dtype=np.int64)
+        self._n_pending = 0
+        self._removed = np.zeros(len(self._placeholders), dtype=bool)
+        self._n_removed = 0
+        self._ids = None
+        self._set_codes()
+        
+    def _set_codes(self) -> None:
+        """ This method codes the placeholders of the stored items, the codes of equal placeholders are equal """
+        codes, labels = pd.factorize(np.fromiter(self._placeholders, dtype=object, count=len(self._placeholders)),
+                                     use_na_sentinel=False)
+        self._codes, self._labels = codes.astype(np.int64), pd.Index(labels, dtype=object)
+        self._new_codes, self._shared = {}, len(labels) < len(codes)
+        
+    def _code(self, placeholder:object) -> int:
+        """
+        Returns:
+            int: the code of @placeholder (see _CompactQuadtree._codes), a new code if no item has @placeholder
+        """
+        code = self._new_codes.get(placeholder)
+        if code is None:
+            try:
+                code = self._labels.get_loc(placeholder)
+            except KeyError:
+                code = len(self._labels) + len(self._new_codes)
+                self._new_codes[placeholder] = code
+                return code
+        self._shared = True
+        return code
+        
+    def _distinct(self, ids:np.ndarray) -> np.ndarray:
+        """
+        Args:
+            ids (numpy.ndarray): positions in _CompactQuadtree._placeholders
+            
+        Returns:
+            numpy.ndarray: the sorted unique @ids of the items, which are not removed. Of the items sharing
+                a placeholder only the first one is kept, so that every placeholder is returned once.
+        """
+        ids = np.unique(ids)
+        if self._n_removed:
+            ids = ids[~self._removed[ids]]
+        if self._shared:
+            ids = np.sort(ids[np.unique(self._codes[ids], return_index=True)[1]])
+        return ids
+        
+    @classmethod
+    def from_arrays(cls, bbox:"Rectangle", capacity:int, node_bounds:np.ndarray, children:np.ndarray, item_offsets:np.ndarray,
+                    item_bounds:np.ndarray, item_ids:np.ndarray, placeholders:list) -> "_CompactQuadtree":
+        """ This method creates a quadtree from existing arrays (see _CompactQuadtree.flatten).
+        The arrays are not copied and never written to, so they can be read-only memory maps.
+        @placeholders, which no item references, are flagged as removed without being counted,
+        so that _CompactQuadtree.remove does not find them and no merge is triggered.
+        
+        Returns:
+            index._CompactQuadtree: the quadtree
+        """
+        qdt = cls(bbox, capacity)
+        qdt._node_bounds, qdt._children, qdt._item_offsets = node_bounds, children, item_offsets
+        qdt._item_bounds, qdt._item_ids = item_bounds, item_ids
+        qdt._placeholders = placeholders
+        qdt._removed = np.ones(len(placeholders), dtype=bool)
+        qdt._removed[item_ids] = False
+        qdt._set_codes()
+        return qdt
+    
+    def flatten(self) -> tuple:
+        """ Buffered and removed items are merged into the arrays first.
+        
+        Returns:
+            tuple: node_bounds, children and item_offsets (see index._bulk_partition),
+                item_bounds, item_ids and the placeholders referenced by item_ids
+        """
+        if self._n_pending or self._n_removed:
+            self._merge()
+        return self._node_bounds, self._children, self._item_offsets, self._item_bounds, self._item_ids, self._placeholders
+    
+    def insert(self, geom:object, placeholder:object) -> bool:
+        """ This method inserts an item into the tree. If the geometry of the inserted item
+        is not covered by the _CompactQuadtree._bbox, the tree is grown first (see _CompactQuadtree._grow).
+        The item is buffered and merged into the node arrays, once the buffer grows too large.
+        
+        Args:
+            geom (shapely.geometry or index.Rectangle): The geomtery of the inserted item
+            placeholder (object): The placeholder of the item
+            
+        Returns:
+            bool: Returns True if item was inserted, else returns False. Items without extent are not inserted
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+        if np.isnan(geom.bounds).any():
+            return False
+        
+        if not self._bbox.contains(geom):
+            self._grow(geom)
+        
+        item_id = len(self._placeholders)
+        if self._n_pending == len(self._pending_ids):
+            self._pending_bounds = np.concatenate([self._pending_bounds, np.empty((self._n_pending + 16, 4))])
+            self._pending_ids = np.concatenate([self._pending_ids, np.empty(self._n_pending + 16, dtype=np.int64)])
+        self._pending_bounds[self._n_pending] = geom.bounds
+        self._pending_ids[self._n_pending] = item_id
+        self._n_pending += 1
+        self._placeholders.append(placeholder)
+        if item_id >= len(self._removed):
+            self._removed = np.concatenate([self._removed, np.zeros(item_id + 1, dtype=bool)])
+        if item_id >= len(self._codes):
+            self._codes = np.concatenate([self._codes, np.empty(item_id + 1, dtype=np.int64)])
+        self._codes[item_id] = self._code(placeholder)
+        if self._ids is not None:
+            self._ids.setdefault(placeholder, []).append(item_id)
+        
+        self._merge_if_needed()
+        return True
+    
+    def insert_many(self, bounds:np.ndarray, placeholders:List[object]) -> int:
+        """ This method inserts many items into the buffer at once (see _CompactQuadtree.insert).
+        
+        Args:
+            bounds (numpy.ndarray): array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of the items
+            placeholders (List[object]): the placeholders of the items
+            
+        Returns:
+            int: the number of inserted items, items without extent are not inserted
+        """
+        valid = ~np.isnan(bounds).any(axis=1)
+        bounds, placeholders = bounds[valid], list(itertools.compress(placeholders, valid.tolist()))
+        if not len(bounds):
+            return 0
+        
+        extent = _extent(bounds)
+        if not self._bbox.contains(extent):
+            self._grow(extent)
+            
+        first_id, n_pending = len(self._placeholders), self._n_pending + len(bounds)
+        if n_pending > len(self._pending_ids):
+            size = max(n_pending, 2 * len(self._pending_ids))
+            self._pending_bounds = np.concatenate([self._pending_bounds[:self._n_pending], np.empty((size - self._n_pending, 4))])
+            self._pending_ids = np.concatenate([self._pending_ids[:self._n_pending], np.empty(size - self._n_pending, dtype=np.int64)])
+        self._pending_bounds[self._n_pending:n_pending] = bounds
+        self._pending_ids[self._n_pending:n_pending] = np.arange(first_id, first_id + len(bounds))
+        self._n_pending = n_pending
+        self._placeholders.extend(placeholders)
+        if len(self._placeholders) > len(self._removed):
+            self._removed = np.concatenate([self._removed, np.zeros(len(self._placeholders), dtype=bool)])
+        if len(self._placeholders) > len(self._codes):
+            self._codes = np.concatenate([self._codes[:first_id], np.empty(len(self._placeholders), dtype=np.int64)])
+        
+        # the placeholders of built items are looked up at once, new placeholders get the next free codes
+        codes = self._labels.get_indexer(pd.Index(np.fromiter(placeholders, dtype=object, count=len(placeholders)), dtype=object))
+        new_codes, n_codes = self._new_codes, len(self._labels) + len(self._new_codes)
+        missing = np.flatnonzero(codes < 0)
+        codes[missing] = [new_codes.setdefault(placeholders[k], len(self._labels) + len(new_codes)) for k in missing.tolist()]
+        self._codes[first_id:first_id + len(codes)] = codes
+        self._shared |= len(self._labels) + len(new_codes) - n_codes < len(codes)
+        if self._ids is not None:
+            for item_id, placeholder in enumerate(placeholders, first_id):
+                self._ids.setdefault(placeholder, []).append(item_id)
+                
+        self._merge_if_needed()
+        return len(bounds)
+    
+    def flush(self) -> None:
+        """ This method merges the buffered and removed items into the node arrays """
+        if self._n_pending or self._n_removed:
+            self._merge()
+    
+    def _cell(self) -> "Rectangle":
+        """
+        Returns:
+            index.Rectangle: the extent of the tree, which is divided between the leafs of the root
+        """
+        return self._bbox
+    
+    def _grow(self, geom:"Rectangle") -> None:
+        """ This method grows the extent of the tree, until it covers @geom. An empty tree takes the extent of @geom,
+        otherwise a new root with doubled extent is added in front of the node arrays. The item arrays are not changed.
+        """
+        if len(self._placeholders) == 0:
+            self._bbox = geom
+            self._node_bounds = np.array([geom.bounds], dtype=np.float64)
+            return
+        
+        while not self._bbox.contains(geom):
+            bbox, position, rdiv = _grow_step(self._bbox, geom)
+            item_counts = np.diff(self._item_offsets)
+            new_counts = np.zeros(5, dtype=np.int64)
+            new_counts[1 + position] = item_counts[0]
+            new_children = np.full(5, -1, dtype=np.int64)
+            new_children[0] = 1
+            new_children[1 + position] = self._children[0] + 4 if self._children[0] >= 0 else -1
+            
+            self._node_bounds = np.concatenate([np.array([bbox.bounds] + [r.bounds for r in rdiv]), self._node_bounds[1:]])
+            self._children = np.concatenate([new_children, np.where(self._children[1:] >= 0, self._children[1:] + 4, -1)])
+            self._item_offsets = np.concatenate([[0], np.cumsum(np.concatenate([new_counts, item_counts[1:]]))])
+            self._bbox = bbox
+    
+    def remove(self, placeholder:object) -> bool:
+        """ This method removes all items with @placeholder from the tree.
+        The items are flagged as removed and dropped from the arrays, once they are rebuilt.
+        
+        Args:
+            placeholder (object): The placeholder of the removed items
+            
+        Returns:
+            bool: Returns True if an item was removed, else returns False
+        """
+        if self._ids is None:
+            self._ids = {}
+            for item_id, pl in enumerate(self._placeholders):
+                if not self._removed[item_id]:
+                    self._ids.setdefault(pl, []).append(item_id)
+                    
+        item_ids = self._ids.pop(placeholder, None)
+        if item_ids is None:
+            return False
+        
+        self._removed[item_ids] = True
+        self._n_removed += len(item_ids)
+        self._merge_if_needed()
+        return True
+    
+    def _merge_if_needed(self) -> None:
+        """ This method rebuilds the node arrays, if too many items are buffered or flagged as removed """
+        if self._n_pending + self._n_removed > max(64 * self._capacity, len(self._placeholders) // 4):
+            self._merge()
+    
+    def _merge(self) -> None:
+        """ This method rebuilds the node arrays from all stored and buffered items, which are not removed """
+        ids, first = np.unique(self._item_ids, return_index=True)
+        bounds = np.concatenate([self._item_bounds[first], self._pending_bounds[:self._n_pending]])
+        ids = np.concatenate([ids, self._pending_ids[:self._n_pending]])
+        kept = ~self._removed[ids]
+        placeholders = [self._placeholders[i] for i in ids[kept].tolist()]
+        self._build(bounds[kept], placeholders)
+        
+    def _query_ids(self, geom:"Rectangle", stats:dict=None) -> np.ndarray:
+        """
+        Args:
+            geom (index.Rectangle): The query rectangle
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Returns:
+            numpy.ndarray: the sorted unique positions in _CompactQuadtree._placeholders of all items,
+                for which the extent is not disjoint with @geom, one position per placeholder (see _CompactQuadtree._distinct).
+        """
+        hits = []
+        nodes = np.zeros(1, dtype=np.int64)
+        while len(nodes):
+            slots = _ranges(self._item_offsets[nodes], self._item_offsets[nodes + 1])
+            hits.append(self._item_ids[slots[~_disjoint_mask(self._item_bounds[slots], geom)]])
+            first_children = self._children[nodes]
+            if stats is not None:
+                stats["nodes_visited"] += len(nodes)
+                stats["bbox_tests"] += len(slots) + 4 * int((first_children >= 0).sum())
+            nodes = (first_children[first_children >= 0][:, None] + np.arange(4)).ravel()
+            nodes = nodes[~_disjoint_mask(self._node_bounds[nodes], geom)]
+            
+        if self._n_pending:
+            if stats is not None:
+                stats["bbox_tests"] += self._n_pending
+            pending_bounds = self._pending_bounds[:self._n_pending]
+            hits.append(self._pending_ids[:self._n_pending][~_disjoint_mask(pending_bounds, geom)])
+            
+        return self._distinct(np.concatenate(hits))
+        
+    def range_query(self, geom:object, stats:dict=None) -> List[object]:
+        """This method returns the placeholder of all stored items, for which the extent is not disjoint
+            with the extent of @geom.
+            
+        Args:
+            geom (shapely.geometry or index.Rectangle): The query geometry
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Returns:
+            List[object]: returns List with placeholders of items in the index for which the topological predicate 'disjoint',
+                compared to the extent of @geom is False.
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+            
+        placeholders = self._placeholders
+        return [placeholders[i] for i in self._query_ids(geom, stats).tolist()]
+    
+    def range_query_covered(self, geom:object, covered:object, stats:dict=None) -> tuple:
+        """This method returns the placeholders of all stored items, for which the extent is not disjoint
+        with the extent of @geom, like _CompactQuadtree.range_query. The items, whose extent lies within the extent
+        of a node, for which @covered is True, are returned apart. @covered is called once per level of the tree.
+        
+        Args:
+            geom (shapely.geometry or index.Rectangle): The query geometry
+            covered (callable): takes an array of shape (k, 4) holding the extents of nodes within the extent of @geom
+                and returns a boolean array, True for the extents, whose items are accepted
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Returns:
+            tuple(List[object], List[object]): the placeholders of the items within a covered node extent
+                and the placeholders of the remaining items
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+        
+        query_bounds = np.array([geom.bounds])
+        accepted, candidates = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        nodes = np.zeros(1, dtype=np.int64)
+        # the extent of the covered node, a node lies in, NaN for nodes outside of covered nodes
+        covers = np.full((1, 4), np.nan)
+        while len(nodes):
+            node_bounds = self._node_bounds[nodes]
+            tested = np.flatnonzero(np.isnan(covers[:, 0]) & _within_rows(node_bounds, query_bounds))
+            if len(tested):
+                tested = tested[np.asarray(covered(node_bounds[tested]), dtype=bool)]
+                covers[tested] = node_bounds[tested]
+                
+            counts = self._item_offsets[nodes + 1] - self._item_offsets[nodes]
+            slots = _ranges(self._item_offsets[nodes], self._item_offsets[nodes + 1])
+            item_bounds = self._item_bounds[slots]
+            within = _within_rows(item_bounds, np.repeat(covers, counts, axis=0))
+            accepted.append(self._item_ids[slots[within]])
+            candidates.append(self._item_ids[slots[~within & ~_disjoint_mask(item_bounds, geom)]])
+            
+            first_children = self._children[nodes]
+            divided = first_children >= 0
+            if stats is not None:
+                stats["nodes_visited"] += len(nodes)
+                stats["bbox_tests"] += len(slots) + 4 * int(divided.sum())
+            nodes = (first_children[divided][:, None] + np.arange(4)).ravel()
+            covers = np.repeat(covers[divided], 4, axis=0)
+            overlaps = ~_disjoint_mask(self._node_bounds[nodes], geom)
+            nodes, covers = nodes[overlaps], covers[overlaps]
+            
+        if self._n_pending:
+            if stats is not None:
+                stats["bbox_tests"] += self._n_pending
+            pending_bounds = self._pending_bounds[:self._n_pending]
+            candidates.append(self._pending_ids[:self._n_pending][~_disjoint_mask(pending_bounds, geom)])
+            
+        accepted, candidates = self._distinct(np.concatenate(accepted)), self._distinct(np.concatenate(candidates))
+        candidates = candidates[~np.isin(self._codes[candidates], self._codes[accepted])]
+        placeholders = self._placeholders
+        return [placeholders[i] for i in accepted.tolist()], [placeholders[i] for i in candidates.tolist()]
+    
+    def iter_range_query(self, geom:object, stats:dict=None) -> object:
+        """This method traverses the tree depth-first with an explicit stack and yields the placeholders of the
+        stored items, for which the extent is not disjoint with the extent of @geom, as soon as they are found.
+        Buffered items are yielded after the items of the nodes.
+        
+        Args:
+            geom (shapely.geometry or index.Rectangle): The query geometry
+            stats (dict, optional): if not None, the counters "nodes_visited" and "bbox_tests" are increased
+            
+        Yields:
+            object: the placeholders of the found items, every placeholder is yielded once
+        """
+        if not isinstance(geom, Rectangle):
+            geom = Rectangle(*geom.bounds)
+        
+        placeholders, removed, codes = self._placeholders, self._removed, self._codes
+        # the codes of the yielded placeholders
+        seen = set()
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            start, end = self._item_offsets[node], self._item_offsets[node + 1]
+            first_child = self._children[node]
+            if stats is not None:
+                stats["nodes_visited"] += 1
+                stats["bbox_tests"] += int(end - start) + (4 if first_child >= 0 else 0)
+                
+            item_ids = self._item_ids[start:end][~_disjoint_mask(self._item_bounds[start:end], geom)]
+            for item_id, code in zip(item_ids.tolist(), codes[item_ids].tolist()):
+                if code not in seen and not removed[item_id]:
+                    seen.add(code)
+                    yield placeholders[item_id]
+                    
+            if first_child >= 0:
+                children = first_child + np.flatnonzero(~_disjoint_mask(self._node_bounds[first_child:first_child + 4], geom))
+                stack.extend(children[::-1].tolist())
+                
+        if self._n_pending:
+            if stats is not None:
+                stats["bbox_tests"] += self._n_pending
+            pending_ids = self._pending_ids[:self._n_pending][~_disjoint_mask(self._pending_bounds[:self._n_pending], geom)]
+            for item_id, code in zip(pending_ids.tolist(), codes[pending_ids].tolist()):
+                if code not in seen and not removed[item_id]:
+                    seen.add(code)
+                    yield placeholders[item_id]
+    
+    def range_query_many(self, bounds:np.ndarray) -> tuple:
+        """This method returns the placeholders of all stored items, for which the extent is not disjoint with
+        one of the query extents. The tree is traversed level by level for all pairs of queries and nodes at once.
+        
+        Args:
+            bounds (numpy.ndarray): array of shape (q, 4) holding the query extents [xmin, ymin, xmax, ymax]
+            
+        Returns:
+            tuple(numpy.ndarray, List[object]): offsets of shape (q + 1,) and placeholders,
+                the placeholders found for query i are placeholders[offsets[i]:offsets[i + 1]]
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        query_ids, item_ids = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        queries = np.flatnonzero(~np.isnan(bounds).any(axis=1))
+        nodes = np.zeros(len(queries), dtype=np.int64)
+        while len(nodes):
+            starts, ends = self._item_offsets[nodes], self._item_offsets[nodes + 1]
+            slots = _ranges(starts, ends)
+            slot_queries = np.repeat(queries, ends - starts)
+            hits = ~_disjoint_rows(self._item_bounds[slots], bounds[slot_queries])
+            query_ids.append(slot_queries[hits])
+            item_ids.append(self._item_ids[slots[hits]])
+            
+            first_children = self._children[nodes]
+            divided = first_children >= 0
+            queries = np.repeat(queries[divided], 4)
+            nodes = (first_children[divided][:, None] + np.arange(4)).ravel()
+            overlapping = ~_disjoint_rows(self._node_bounds[nodes], bounds[queries])
+            queries, nodes = queries[overlapping], nodes[overlapping]
+            
+        if self._n_pending:
+            pending_bounds, pending_ids = self._pending_bounds[:self._n_pending], self._pending_ids[:self._n_pending]
+            chunksize = max(1, 2**22 // self._n_pending)
+            for start in range(0, len(bounds), chunksize):
+                query_index, item_index = np.nonzero(~_disjoint_rows(bounds[start:start + chunksize, None], pending_bounds[None]))
+                query_ids.append(start + query_index)
+                item_ids.append(pending_ids[item_index])
+            
+        query_ids, item_ids = np.concatenate(query_ids), np.concatenate(item_ids)
+        if self._n_removed:
+            kept = ~self._removed[item_ids]
+            query_ids, item_ids = query_ids[kept], item_ids[kept]
+        if self._shared:
+            # only the first item per query and placeholder is kept
+            n_codes = len(self._labels) + len(self._new_codes)
+            first = np.unique(query_ids * n_codes + self._codes[item_ids], return_index=True)[1]
+            query_ids, item_ids = query_ids[first], item_ids[first]
+        offsets, ids = _unique_pairs(query_ids, item_ids, len(bounds), len(self._placeholders))
+        placeholders = self._placeholders
+        return offsets, [placeholders[i] for i in ids.tolist()]
+    
+    def nearest_candidates(self, geom:"Rectangle") -> object:
+        """This method traverses the tree best-first by the distance of the node extents to @geom.
+        
+        Args:
+            geom (index.Rectangle): The query rectangle
+            
+        Yields:
+            tuple(float, object): the distance between the extent of an item and @geom and the placeholder of the item,
+                ordered by the distance. An item can be yielded more than once.
+        """
+        counter = itertools.count()
+        heap = [(0.0, next(counter), 0, -1)]
+        
+        if self._n_pending:
+            distances = _rect_distances(self._pending_bounds[:self._n_pending], geom)
+            for distance, item_id in zip(distances.tolist(), self._pending_ids[:self._n_pending].tolist()):
+                heapq.heappush(heap, (distance, next(counter), -1, item_id))
+                
+        while heap:
+            distance, _, node, item_id = heapq.heappop(heap)
+            if node < 0:
+                if not self._removed[item_id]:
+                    yield distance, self._placeholders[item_id]
+                continue
+            
+            start, end = self._item_offsets[node], self._item_offsets[node + 1]
+            distances = _rect_distances(self._item_bounds[start:end], geom)
+            for distance, item_id in zip(distances.tolist(), self._item_ids[start:end].tolist()):
+                heapq.heappush(heap, (distance, next(counter), -1, item_id))
+                
+            first_child = self._children[node]
+            if first_child >= 0:
+                children = range(first_child, first_child + 4)
+                distances = _rect_distances(self._node_bounds[first_child:first_child + 4], geom)
+                for distance, child in zip(distances.tolist(), children):
+                    heapq.heappush(heap, (distance, next(counter), child, -1))
+    
+    def tree_stats(self) -> dict:
+        """ Removed items are counted until the arrays are rebuilt.
+        
+        Returns:
+            dict: the shape of the tree (see PandasQuadtree.tree_stats)
+        """
+        depths = np.zeros(len(self._children), dtype=np.int64)
+        level, depth = np.zeros(1, dtype=np.int64), 0
+        while len(level):
+            depths[level] = depth
+            first_children = self._children[level]
+            level, depth = (first_children[first_children >= 0][:, None] + np.arange(4)).ravel(), depth + 1
+        return _tree_stats(np.diff(self._item_offsets), depths, self._children >= 0, self._capacity, self._n_pending)
+        
+    def memory_usage(self) -> int:
+        """
+        Returns:
+            int: the number of bytes used by the arrays and lists of the tree, not counting the placeholders themselves
+        """
+        arrays = (self._node_bounds, self._children, self._item_offsets, self._item_bounds, self._item_ids,
+                  self._pending_bounds, self._pending_ids, self._removed)
+        return sys.getsizeof(self) + sum(a.nbytes for a in arrays) + sys.getsizeof(self._placeholders) \
+            + (sys.getsizeof(self._ids) + sum(sys.getsizeof(i) for i in self._ids.values()) if self._ids is not None else 0)
+        
+        
+class _PointQuadtree(_CompactQuadtree):
+    """
+    This class provides a quadtree index for points, stored in arrays like index._CompactQuadtree.
+    Every point is referenced once by the leaf holding it (see index._bulk_partition), so the x and y coordinates
+    of the points of a leaf are consecutive rows of the item arrays, which are tested by range queries at once.
+    Equal points are kept by a single leaf, which is not divided.
+    """
+    _partition:str = "points"
+    
+    @classmethod
+    def bulk_load(cls, bbox:"Rectangle", capacity:int, bounds:np.ndarray, placeholders:object, n_jobs:int=1) -> "_PointQuadtree":
+        """ This method builds a quadtree top-down from the coordinates of all points at once (see _CompactQuadtree.bulk_load).
+        
+        Returns:
+            index._PointQuadtree: the created quadtree
+            
+        Raises:
+            ValueError: if an item is not a point
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        extents = bounds[~np.isnan(bounds).any(axis=1)]
+        if ((extents[:, 0] != extents[:, 2]) | (extents[:, 1] != extents[:, 3])).any():
+            raise ValueError("the points engine only indexes points")
+        return super().bulk_load(bbox, capacity, bounds, placeholders, n_jobs)
+    
     def insert(self, geom:object, placeholder:object) -> bool:
-        """ This method inserts an item into the tree. The geometry of the inserted item msut not
-        be disjoint with the _SecondaryQuadtree1._bbox.
+        """ This method inserts a point into the tree (see _CompactQuadtree.insert).
         
-        Args:
-            geom (shapely.geometry or index.Rectangle): The geomtery of the inserted item
-            placeholder (object): The placeholder of the item
-            
-        Returns:
-            bool: Returns True if item was inserted, else returns False
+        Raises:
+            ValueError: if @geom is not a point
         """
         if not isinstance(geom, Rectangle):
             geom = Rectangle(*geom.bounds)
-        
-        if self._bbox.disjoint(geom):
+        if np.isnan(geom.bounds).any():
             return False
+        if geom.width or geom.height:
+            raise ValueError("the points engine only indexes points")
+        return super().insert(geom, placeholder)
+    
+    def insert_many(self, bounds:np.ndarray, placeholders:List[object]) -> int:
+        """ This method inserts many points into the buffer at once (see _CompactQuadtree.insert_many).
         
-        if len(self._geometries) < self._capacity:
-            self._geometries.append(geom)
-            self._placeholders.append(placeholder)
-            return True
-            
-        if self._divided or self.subdivide():
-            return any([box.insert(geom, placeholder) for box in self._boxlist])
+        Raises:
+            ValueError: if an item is not a point
+        """
+        extents = bounds[~np.isnan(bounds).any(axis=1)]
+        if ((extents[:, 0] != extents[:, 2]) | (extents[:, 1] != extents[:, 3])).any():
+            raise ValueError("the points engine only indexes points")
+        return super().insert_many(bounds, placeholders)
+    
+    def range_query_exact(self, geometry:object) -> List[object]:
+        """ This method returns the placeholders of all stored points, for which the topological predicate 'disjoint'
+        with @geometry is False. The coordinates of the points are tested against the extent of @geometry leaf by leaf.
+        Unless @geometry is a rectangle, the remaining points are tested with shapely.intersects_xy at once.
         
-        self._geometries.append(geom)
-        self._placeholders.append(placeholder)
-            
-    def subdivide(self) -> bool:
-        """This method turns the quadtree object into a node and creates four leafs for this node.
-        These leafes are named:
-            self._northwest
-            self._northeast
-            self._southeast
-            self._southwest
-            
-        Note:
-            If the extent of all geometries references by the _SecondaryQuadtree object, is equal,
-            no subdivision is performed
+        Args:
+            geometry (shapely.geometry): The query geometry
             
         Returns:
-            bool: Returns True if subdivision was performed, else returns False
+            List[object]: the placeholders of the points
         """
-        rdiv:RectangleDivision = self._bbox.division()
-        
-        # check for equal geometries
-        if len(self._geometries) > 1:
-            
-            for i in range(len(self._geometries)):
-                
-                break_check = False
-                for x in range(i+1, len(self._geometries)):
-                    if not (self._geometries[i] == self._geometries[x]):
-                        break_check=True
-                        break
-                if break_check:
-                    break
-                    
-            else:
-                return False
+        rect = Rectangle(*geometry.bounds)
+        slots = [np.empty(0, dtype=np.int64)]
+        nodes = np.zeros(1, dtype=np.int64)
+        while len(nodes):
+            node_slots = _ranges(self._item_offsets[nodes], self._item_offsets[nodes + 1])
+            slots.append(node_slots[_within_mask(self._item_bounds[node_slots, 0], self._item_bounds[node_slots, 1], rect)])
+            first_children = self._children[nodes]
+            nodes = (first_children[first_children >= 0][:, None] + np.arange(4)).ravel()
+            nodes = nodes[~_disjoint_mask(self._node_bounds[nodes], rect)]
+        slots = np.concatenate(slots)
         
-        self._divided = True
-        self._northwest = _SecondaryQuadtree1(rdiv.northwest, self._capacity)
-        self._northeast = _SecondaryQuadtree1(rdiv.northeast, self._capacity)
-        self._southeast = _SecondaryQuadtree1(rdiv.southeast, self._capacity)
-        self._southwest = _SecondaryQuadtree1(rdiv.southwest, self._capacity)
-        self._boxlist = [self._northwest, self._northeast, self._southeast, self._southwest]
-        return True
+        pending_x, pending_y = self._pending_bounds[:self._n_pending, 0], self._pending_bounds[:self._n_pending, 1]
+        pending = np.flatnonzero(_within_mask(pending_x, pending_y, rect))
+        ids = np.concatenate([self._item_ids[slots], self._pending_ids[pending]])
+        x = np.concatenate([self._item_bounds[slots, 0], pending_x[pending]])
+        y = np.concatenate([self._item_bounds[slots, 1], pending_y[pending]])
         
-    def range_query(self, geom):
-        """This method returns the placeholder of all stored items, for which the extent is not disjoint
-            with the extent of @geom.
+        if self._n_removed:
+            kept = ~self._removed[ids]
+            ids, x, y = ids[kept], x[kept], y[kept]
+        if len(ids) and not _is_rectangle(geometry):
+            ids = ids[shapely.intersects_xy(_prepared(geometry), x, y)]
+        if self._shared:
+            ids = self._distinct(ids)
             
+        placeholders = self._placeholders
+        return [placeholders[i] for i in ids.tolist()]
+    
+    
+class _QueryCache(object):
+    """
+    This class provides a bounded cache for the results of range queries, the least recently used result is
+    evicted first. Every result is stored with the extent of its query geometry, so that only results,
+    which could be changed by an inserted item, have to be dropped.
+    
+    Attributes:
+        maxsize (int): the maximum number of cached results
+        hits (int): the number of lookups, which found a result
+        misses (int): the number of lookups, which found no result
+        invalidations (int): the number of results dropped by inserts and removes
+    """
+    def __init__(self, maxsize:int):
+        """
         Args:
-            geom (shapely.geometry or index.Rectangle): The query geometry
-            
-        Returns:
-            List[object]: returns List with placeholders of items in the index for which the topological predicate 'disjoint',
-                compared to the extent of @ggeom is False.
+            maxsize (int): the maximum number of cached results
+        """
+        self.maxsize:int = maxsize
+        self.hits:int = 0
+        self.misses:int = 0
+        self.invalidations:int = 0
+        # maps the keys to tuples (query extent, result), ordered from the least to the most recently used
+        self._entries:OrderedDict = OrderedDict()
+        # lookups change the order of the entries, so concurrent readers have to be serialized
+        self._mutex = threading.Lock()
         
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_mutex"]
+        return state
+    
+    def __setstate__(self, state:dict) -> None:
+        self.__dict__.update(state)
+        self._mutex = threading.Lock()
+        
+    def get(self, key:object) -> List[object]:
         """
-        if not isinstance(geom, Rectangle):
-            geom = Rectangle(*geom.bounds)
+        Returns:
+            List[object]: the result cached for @key, None if there is no result
+        """
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key:object, bbox:"Rectangle", result:List[object]) -> None:
+        """ This method caches @result for @key, the least recently used result is evicted if the cache is full """
+        with self._mutex:
+            self._entries[key] = (bbox, result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            
+    def invalidate(self, bbox:"Rectangle") -> None:
+        """ This method drops all results, whose query extent is not disjoint with @bbox """
+        with self._mutex:
+            self._drop([key for key, (query_bbox, _) in self._entries.items() if not query_bbox.disjoint(bbox)])
         
-        candidates = [pl for pl, g in zip(self._placeholders, self._geometries) if not g.disjoint(geom)]
+    def invalidate_row(self, row_index:object) -> None:
+        """ This method drops all results holding @row_index """
+        with self._mutex:
+            self._drop([key for key, (_, result) in self._entries.items() if row_index in result])
         
-        if self._divided:
-            pl_list = [box.range_query(geom) for box in self._boxlist if not geom.disjoint(box._bbox)]
-            pl_list.append(candidates)
-            pl_list_flattend = [val for sublist in pl_list for val in sublist]
-            pl_list_flattend_unique = list(set(pl_list_flattend))
-            return pl_list_flattend_unique
+    def _drop(self, keys:List[object]) -> None:
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
         
-        else:
-            return candidates
+    def clear(self) -> None:
+        """ This method drops all results and resets the counters """
+        with self._mutex:
+            self._entries.clear()
+            self.hits, self.misses, self.invalidations = 0, 0, 0
+        
+    def info(self) -> dict:
+        """
+        Returns:
+            dict: "hits", "misses", "invalidations", the number of cached results "size" and "maxsize"
+        """
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                "size": len(self._entries), "maxsize": self.maxsize}
         
         
 class Rectangle(object):
@@ -241,6 +2540,7 @@ class Rectangle(object):
         height (float): the height of the rectangle
         bounds (tuple[float]): The bounds of the rectangle (xmin, ymin, xmax, ymax)
     """
+    __slots__ = ("xmin", "ymin", "xmax", "ymax", "width", "height", "bounds")
     
     def __init__(self, xmin, ymin, xmax, ymax):
         """
@@ -294,11 +2594,57 @@ class Rectangle(object):
         """
         return self.xmin > other.xmax or self.ymax < other.ymin or self.xmax < other.xmin or self.ymin > other.ymax
     
+    def contains(self, other:"Rectangle") -> bool:
+        """
+        Args:
+            other (index.Rectangle): other rectangle for which it will be tested if @self contains it
+            
+        Returns:
+            bool: Returns True if, self.xmin <= other.xmin and self.ymin <= other.ymin and self.xmax >= other.xmax and self.ymax >= other.ymax
+                else returns False
+        """
+        return self.xmin <= other.xmin and self.ymin <= other.ymin and self.xmax >= other.xmax and self.ymax >= other.ymax
+    
+    def distance(self, other:"Rectangle") -> float:
+        """
+        Args:
+            other (index.Rectangle): other rectangle to which the distance will be calculated
+            
+        Returns:
+            float: the euclidean distance between the closest points of @self and @other, 0.0 if they are not disjoint
+        """
+        dx = max(other.xmin - self.xmax, self.xmin - other.xmax, 0.0)
+        dy = max(other.ymin - self.ymax, self.ymin - other.ymax, 0.0)
+        return (dx * dx + dy * dy) ** 0.5
+    
     def touches(self, other:"Rectangle") -> bool:
-        pass
+        """
+        Args:
+            other (index.Rectangle): other rectangle for which it will be tested if @self touches it
+            
+        Returns:
+            bool: Returns True if the rectangles share a part of their boundary, but not of their interior, else returns False
+        """
+        return not self.disjoint(other) and not self._interiors_intersect(other)
     
     def overlaps(self, other:"Rectangle") -> bool:
-        pass
+        """
+        Args:
+            other (index.Rectangle): other rectangle for which it will be tested if @self overlaps it
+            
+        Returns:
+            bool: Returns True if the interiors of the rectangles intersect and none of them contains the other,
+                else returns False
+        """
+        return self._interiors_intersect(other) and not self.contains(other) and not other.contains(self)
+    
+    def _interiors_intersect(self, other:"Rectangle") -> bool:
+        """
+        Returns:
+            bool: Returns True if self.xmin < other.xmax and self.xmax > other.xmin and self.ymin < other.ymax and self.ymax > other.ymin
+                else returns False
+        """
+        return self.xmin < other.xmax and self.xmax > other.xmin and self.ymin < other.ymax and self.ymax > other.ymin
     
     def division(self) -> "RectangleDivision":
         """
@@ -323,6 +2669,7 @@ class RectangleDivision(object):
         southwest (index.Rectangle): the bottom-left part of the rectangle
         boxlist (List[index.Rectangle]): List holding the parts of the rectangle [northwest, northeast, southeast, southwest]
     """
+    __slots__ = ("northwest", "northeast", "southeast", "southwest", "boxlist")
     
     def __init__(self, northwest:"Rectangle", northeast:"Rectangle", southeast:"Rectangle", southwest:"Rectangle"):
         """
@@ -350,6 +2697,603 @@ class RectangleDivision(object):
         return self.boxlist[key]
         
         
+def _geometry_bounds(geometries:object) -> np.ndarray:
+    """
+    Args:
+        geometries (Sequence[shapely.geometry]): the geometries
+        
+    Returns:
+        numpy.ndarray: array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of @geometries.
+            The extent of empty or missing geometries is NaN.
+    """
+    return shapely.bounds(np.asarray(geometries, dtype=object)).astype(np.float64).reshape(-1, 4)
+
+
+# quadtree implementations selectable by the engine argument of PandasQuadtree
+_ENGINES = {"quadtree": _SecondaryQuadtree1, "compact": _CompactQuadtree, "leaves": _SecondaryQuadtree2, "loose": _LooseQuadtree,
+            "points": _PointQuadtree}
+
+
+# the number of candidates refined at once by PandasQuadtree.iter_range_query, doubled after every batch
+_MIN_REFINE_BATCH = 16
+_MAX_REFINE_BATCH = 1024
+
+
+# the number of cells, up to which index._morton_ranges divides the cells partially covered by a query
+_MAX_MORTON_RANGES = 32
+# the share of the largest geometries, which are not ordered by MortonIndex
+_LARGE_ITEM_SHARE = 0.01
+
+
+# the predicate p(b, a) which is True, if predicate(a, b) is True
+_CONVERSE_PREDICATES = {"intersects": "intersects", "contains": "within", "within": "contains", "touches": "touches",
+                        "overlaps": "overlaps", "crosses": "crosses", "covers": "covered_by", "covered_by": "covers"}
+
+# the predicate p(geometry, box) of shapely, for which the items within the box fulfill the query predicate,
+# so that the items of nodes, whose extent fulfills p with the query geometry, are accepted by PandasQuadtree.range_query
+_SUBTREE_PREDICATES = {"intersects": "covers", "covered_by": "covers", "within": "contains_properly"}
+
+# state of a worker process of PandasQuadtree.sjoin
+_sjoin_state = None
+
+
+def _init_sjoin_worker(qdt:"PandasQuadtree", geometries:np.ndarray, predicate:str) -> None:
+    """ Stores the arguments of PandasQuadtree.sjoin in the worker process """
+    global _sjoin_state
+    _sjoin_state = (qdt, geometries, predicate)
+    
+
+def _sjoin_worker(start:int, stop:int) -> tuple:
+    """ Joins the probe geometries [start:stop] in the worker process (see PandasQuadtree._sjoin_chunk) """
+    qdt, geometries, predicate = _sjoin_state
+    return qdt._sjoin_chunk(geometries[start:stop], predicate)
+
+
+def _prepared(geometries:object) -> object:
+    """
+    Args:
+        geometries (shapely.geometry or numpy.ndarray): a geometry or an array of geometries
+        
+    Returns:
+        shapely.geometry or numpy.ndarray: @geometries prepared for repeated predicates (see shapely.prepare).
+            Geometries, which are not prepared yet, are copied first, so that the geometries of the caller are not changed.
+    """
+    fresh = ~shapely.is_prepared(geometries)
+    if not np.any(fresh):
+        return geometries
+    if isinstance(geometries, np.ndarray):
+        geometries = geometries.copy()
+        geometries[fresh] = shapely.from_wkb(shapely.to_wkb(geometries[fresh]))
+    else:
+        geometries = shapely.from_wkb(shapely.to_wkb(geometries))
+    shapely.prepare(geometries)
+    return geometries
+
+
+def _any_of(hits:np.ndarray, owners:np.ndarray, n:int) -> np.ndarray:
+    """
+    Args:
+        hits (numpy.ndarray): boolean array holding a value for every geometry returned by PandasQuadtree._geometries_of
+        owners (numpy.ndarray): the positions of the ids of the geometries, None if they are ordered like the ids
+        n (int): the number of ids
+        
+    Returns:
+        numpy.ndarray: boolean array of shape (n,), True for the ids, for which a row is a hit
+    """
+    if owners is None:
+        return hits
+    return np.bincount(owners, hits, minlength=n) > 0
+
+
+def _extent(bounds:np.ndarray) -> "Rectangle":
+    """
+    Args:
+        bounds (numpy.ndarray): array of shape (n, 4) holding extents [xmin, ymin, xmax, ymax]
+        
+    Returns:
+        index.Rectangle: the extent covering all extents in @bounds, None if no extent is defined
+    """
+    bounds = bounds[~np.isnan(bounds).any(axis=1)]
+    if not len(bounds):
+        return None
+    return Rectangle(*bounds[:, :2].min(axis=0), *bounds[:, 2:].max(axis=0))
+
+
+def _grow_step(bbox:"Rectangle", geom:"Rectangle") -> tuple:
+    """ This function doubles the extent of @bbox towards @geom
+    
+    Args:
+        bbox (index.Rectangle): the extent of a quadtree
+        geom (index.Rectangle): the extent of an item, which is not covered by @bbox
+        
+    Returns:
+        tuple(index.Rectangle, int, index.RectangleDivision): the grown extent, the position of @bbox in its division
+            and the division of the grown extent, which holds the exact bounds of @bbox at the returned position
+    """
+    size = max(bbox.width, bbox.height, geom.xmax - bbox.xmax, bbox.xmin - geom.xmin, geom.ymax - bbox.ymax, bbox.ymin - geom.ymin)
+    width, height = bbox.width or size, bbox.height or size
+    west, south = geom.xmin < bbox.xmin, geom.ymin < bbox.ymin
+    x = (bbox.xmin - width, bbox.xmin, bbox.xmax) if west else (bbox.xmin, bbox.xmax, bbox.xmax + width)
+    y = (bbox.ymin - height, bbox.ymin, bbox.ymax) if south else (bbox.ymin, bbox.ymax, bbox.ymax + height)
+    
+    rdiv = RectangleDivision(Rectangle(x[0], y[1], x[1], y[2]), Rectangle(x[1], y[1], x[2], y[2]),
+                             Rectangle(x[1], y[0], x[2], y[1]), Rectangle(x[0], y[0], x[1], y[1]))
+    position = {(False, True): 0, (True, True): 1, (True, False): 2, (False, False): 3}[(west, south)]
+    return Rectangle(x[0], y[0], x[2], y[2]), position, rdiv
+
+
+# layout of the files written by PandasQuadtree.save
+_FILE_MAGIC = b"ES613QDT"
+_FILE_VERSION = 1
+_FILE_ALIGNMENT = 64
+
+
+def _index_hash(index:pd.Index) -> str:
+    """
+    Args:
+        index (pandas.Index): the index of a dataframe
+        
+    Returns:
+        str: a hash of the labels of @index and their order
+    """
+    return hashlib.sha1(pd.util.hash_pandas_object(index, index=False).values.tobytes()).hexdigest()
+
+
+def _label_array(labels:list) -> np.ndarray:
+    """
+    Args:
+        labels (List[object]): row labels of a dataframe
+        
+    Returns:
+        numpy.ndarray: the labels as an array, tuples are kept as objects
+    """
+    return pd.Index(labels, tupleize_cols=False).values
+
+
+def _bulk_partition(bbox:"Rectangle", capacity:int, bounds:np.ndarray, mode:str="mixed", max_depth:int=None) -> tuple:
+    """ This function distributes items top-down over the nodes of a quadtree, the way the insert method of the
+    quadtree would. The items are ordered by the Morton code of their centers, so that spatially close items
+    are stored close to each other. A node holding more than @capacity items is divided, unless the extent
+    of all its items is equal or dividing would not move any item. The items of a divided node are distributed by @mode:
+        "mixed" (index._SecondaryQuadtree1): items whose extent spans more than one quadrant are kept first, up to
+            @capacity items are kept, the remaining items are passed on to every quadrant their extent is not disjoint with.
+        "leaves" (index._SecondaryQuadtree2): all items are passed on to every quadrant their extent is not disjoint with,
+            unless at most @capacity items do not cover the node or every item overlaps more than one quadrant.
+        "loose" (index._LooseQuadtree): every item is passed on to the quadrant holding its center,
+            if the loose extent of the quadrant covers it, else the item is kept.
+        "points" (index._PointQuadtree): every item is passed on to the quadrant holding its lower left corner,
+            items on the center lines are passed on to the northern or eastern quadrant.
+    Items which are disjoint with @bbox or have no extent are left out.
+    All nodes of a level are divided at once, the references of items by the nodes of a level are held as pairs
+    of arrays (node, item), ordered by node.
+    
+    Args:
+        bbox (index.Rectangle): the extent of the root node
+        capacity (int): the maximum number of items, a node can reference
+        bounds (numpy.ndarray): array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of the items
+        mode (str): the way items are distributed. DEFAULT="mixed"
+        max_depth (int, optional): nodes at this depth are not divided
+        
+    Returns:
+        tuple(numpy.ndarray): The nodes in breadth-first order, so that the four leafs of a node are consecutive
+            node_bounds: array of shape (m, 4) holding the extents of the nodes
+            children: array of shape (m,) holding the position of the northwest leaf of a node or -1
+            item_offsets: array of shape (m + 1,), the items of node k are items[item_offsets[k]:item_offsets[k + 1]]
+            items: the positions of the items in @bounds
+    """
+    items = np.flatnonzero(~_disjoint_mask(bounds, bbox) & ~np.isnan(bounds).any(axis=1))
+    items = items[np.argsort(_morton_codes(bounds[items], bbox), kind="stable")]
+    
+    level_bounds = np.array([bbox.bounds], dtype=np.float64)
+    pair_nodes, pair_items = np.zeros(len(items), dtype=np.int64), items
+    all_bounds, all_children, all_counts, all_items = [], [], [], []
+    n_nodes, depth = 0, 0
+    while len(level_bounds):
+        n_level = len(level_bounds)
+        counts = np.bincount(pair_nodes, minlength=n_level)
+        divided = counts > capacity if max_depth is None or depth < max_depth else np.zeros(n_level, dtype=bool)
+        kept = np.ones(len(pair_items), dtype=bool)
+        
+        candidates = np.flatnonzero(divided[pair_nodes])
+        if len(candidates):
+            nodes, item_bounds = pair_nodes[candidates], bounds[pair_items[candidates]]
+            starts = np.cumsum(counts) - counts
+            # the quadrants [northwest, northeast, southeast, southwest] of the nodes, as index.Rectangle.division computes them
+            xmin, ymin, xmax, ymax = level_bounds.T
+            xmid, ymid = xmin + (xmax - xmin) / 2, ymin + (ymax - ymin) / 2
+            quadrants = np.stack([np.stack([xmin, ymid, xmid, ymax], axis=1), np.stack([xmid, ymid, xmax, ymax], axis=1),
+                                  np.stack([xmid, ymin, xmax, ymid], axis=1), np.stack([xmin, ymin, xmid, ymid], axis=1)], axis=1)
+            xmid, ymid = xmid[nodes], ymid[nodes]
+            
+            if mode == "loose":
+                east = (item_bounds[:, 0] + item_bounds[:, 2]) / 2 >= xmid
+                north = (item_bounds[:, 1] + item_bounds[:, 3]) / 2 >= ymid
+                quadrant = np.where(north, np.where(east, 1, 0), np.where(east, 2, 3))
+                loose_bounds = _loose_bounds(quadrants[nodes, quadrant])
+                fits = (item_bounds[:, :2] >= loose_bounds[:, :2]).all(axis=1) & (item_bounds[:, 2:] <= loose_bounds[:, 2:]).all(axis=1)
+                masks = np.stack([fits & (quadrant == q) for q in range(4)])
+                passed = fits
+            elif mode == "points":
+                east, north = item_bounds[:, 0] >= xmid, item_bounds[:, 1] >= ymid
+                masks = np.stack([~east & north, east & north, east & ~north, ~east & ~north])
+                passed = np.ones(len(candidates), dtype=bool)
+            else:
+                # all items are not disjoint with the node, so only the center lines have to be tested
+                west, east = item_bounds[:, 0] <= xmid, item_bounds[:, 2] >= xmid
+                south, north = item_bounds[:, 1] <= ymid, item_bounds[:, 3] >= ymid
+                masks = np.stack([west & north, east & north, east & south, west & south])
+                if mode == "leaves":
+                    # items covering the node are copied into all quadrants, so they do not count towards the capacity,
+                    # a node is not divided, if every item overlaps more than one quadrant
+                    node_bounds = level_bounds[nodes]
+                    covering = (item_bounds[:, :2] <= node_bounds[:, :2]).all(axis=1) & (item_bounds[:, 2:] >= node_bounds[:, 2:]).all(axis=1)
+                    separable = np.bincount(nodes, ~covering, minlength=n_level) > capacity
+                    separable &= np.bincount(nodes, masks.sum(axis=0) == 1, minlength=n_level) > 0
+                    passed = separable[nodes]
+                else:
+                    # the items spanning more than one quadrant come first, the first @capacity items of a node are kept
+                    spans = masks.sum(axis=0) >= 2
+                    spans_before = np.cumsum(spans) - spans
+                    spans_before -= spans_before[np.searchsorted(candidates, starts[nodes])]
+                    position = candidates - starts[nodes]
+                    rank = np.where(spans, spans_before, np.bincount(nodes, spans, minlength=n_level)[nodes] + position - spans_before)
+                    passed = rank >= capacity
+                    
+            # a node is not divided, if the extent of all its items is equal, if no item would be moved
+            # or if it is too small to be divided by floating point numbers
+            first_bounds = bounds[pair_items[starts[nodes]]]
+            divided &= np.bincount(nodes, (item_bounds != first_bounds).any(axis=1), minlength=n_level) > 0
+            divided &= np.bincount(nodes, (masks & passed).any(axis=0), minlength=n_level) > 0
+            divided &= ~(quadrants == level_bounds[:, None]).all(axis=2).any(axis=1)
+            
+            moved = divided[nodes] & passed
+            kept[candidates[moved]] = False
+            
+            # the leafs receive the items in the order of the node, items of a "mixed" node spanning more than one quadrant first
+            first_child = 4 * (np.cumsum(divided) - divided)
+            quadrant_ids, positions = np.nonzero(masks & moved)
+            child_nodes = first_child[nodes[positions]] + quadrant_ids
+            sequence = rank[positions] if mode == "mixed" else positions
+            child_order = np.lexsort((sequence, child_nodes)) if mode == "mixed" else np.argsort(child_nodes, kind="stable")
+            next_nodes, next_items = child_nodes[child_order], pair_items[candidates[positions[child_order]]]
+            children = np.where(divided, n_nodes + n_level + first_child, -1)
+            next_bounds = quadrants[divided].reshape(-1, 4)
+        else:
+            next_nodes, next_items = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            children = np.full(n_level, -1, dtype=np.int64)
+            next_bounds = np.empty((0, 4), dtype=np.float64)
+            
+        all_bounds.append(level_bounds)
+        all_children.append(children)
+        all_counts.append(np.bincount(pair_nodes[kept], minlength=n_level))
+        all_items.append(pair_items[kept])
+        n_nodes += n_level
+        depth += 1
+        level_bounds, pair_nodes, pair_items = next_bounds, next_nodes, next_items
+        
+    item_offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.concatenate(all_counts), out=item_offsets[1:])
+    return (np.concatenate(all_bounds), np.concatenate(all_children).astype(np.int64), item_offsets,
+            np.concatenate(all_items).astype(np.int64))
+
+
+def _tree_stats(counts:np.ndarray, depths:np.ndarray, divided:np.ndarray, capacity:int, n_pending:int) -> dict:
+    """
+    Args:
+        counts (numpy.ndarray): the number of items referenced by each node
+        depths (numpy.ndarray): the depth of each node
+        divided (numpy.ndarray): boolean array, True where the node is divided
+        capacity (int): the capacity of the tree
+        n_pending (int): the number of buffered items
+    
+    Returns:
+        dict: the shape of the tree (see PandasQuadtree.tree_stats)
+    """
+    return {
+        "depth": int(depths.max()),
+        "n_nodes": len(counts),
+        "n_leaves": int((~divided).sum()),
+        "n_references": int(counts.sum()),
+        "n_pending": n_pending,
+        "fill": np.bincount(counts).tolist(),
+        "nodes_per_level": np.bincount(depths).tolist(),
+        "items_per_level": np.bincount(depths, weights=counts).astype(np.int64).tolist(),
+        "overfull_nodes": int((counts > capacity).sum()),
+    }
+
+
+def _parallel_partition(bbox:"Rectangle", capacity:int, bounds:np.ndarray, mode:str="mixed", max_depth:int=None,
+                        n_jobs:int=1) -> tuple:
+    """ This function distributes items over the nodes of a quadtree like index._bulk_partition, using @n_jobs processes.
+    The upper levels are partitioned first, until there are at least four quadrants per process. The subtrees of
+    quadrants holding more than @capacity items are partitioned in a process pool and stitched under the upper levels.
+    Items straddling the quadrants are kept by the upper levels, just like index._bulk_partition does.
+    Each subtree orders its items by the Morton codes within its quadrant, so the items kept by nodes
+    can differ from a sequential partition, but the tree references the same items for every query extent.
+    
+    Args:
+        bbox (index.Rectangle): the extent of the root node
+        capacity (int): the maximum number of items, a node can reference
+        bounds (numpy.ndarray): array of shape (n, 4) holding the extents [xmin, ymin, xmax, ymax] of the items
+        mode (str): the way items are distributed (see index._bulk_partition). DEFAULT="mixed"
+        max_depth (int, optional): nodes at this depth are not divided
+        n_jobs (int): the number of processes. DEFAULT=1
+        
+    Returns:
+        tuple(numpy.ndarray): node_bounds, children, item_offsets and items (see index._bulk_partition)
+    """
+    if n_jobs <= 1 or len(bounds) <= 4 * n_jobs * capacity:
+        return _bulk_partition(bbox, capacity, bounds, mode, max_depth)
+    
+    levels = 1
+    while 4**levels < 4 * n_jobs:
+        levels += 1
+    if max_depth is not None:
+        levels = min(levels, max_depth)
+    node_bounds, children, item_offsets, items = _bulk_partition(bbox, capacity, bounds, mode, levels)
+    
+    depths = np.zeros(len(children), dtype=np.int64)
+    for k, first_child in enumerate(children.tolist()):
+        if first_child >= 0:
+            depths[first_child:first_child + 4] = depths[k] + 1
+    counts = np.diff(item_offsets)
+    frontier = np.flatnonzero((depths == levels) & (counts > capacity))
+    if not len(frontier):
+        return node_bounds, children, item_offsets, items
+    
+    tasks = [(tuple(node_bounds[k]), items[item_offsets[k]:item_offsets[k + 1]]) for k in frontier.tolist()]
+    sub_depth = max_depth - levels if max_depth is not None else None
+    with ProcessPoolExecutor(min(n_jobs, len(tasks))) as executor:
+        subtrees = list(executor.map(_partition_worker, [bounds[task_items] for _, task_items in tasks], [rect for rect, _ in tasks],
+                                     itertools.repeat(capacity), itertools.repeat(mode), itertools.repeat(sub_depth)))
+        
+    # the nodes of the subtrees are appended to the upper levels, the root of a subtree replaces its frontier node.
+    # every node references a range of the item pool, the nodes are brought into breadth-first order at last.
+    all_bounds, all_children = [node_bounds], [children.copy()]
+    item_pool, starts, ends = [items], [item_offsets[:-1].copy()], [item_offsets[1:].copy()]
+    n_nodes, n_items = len(children), len(items)
+    for k, (_, task_items), (sub_bounds, sub_children, sub_offsets, sub_items) in zip(frontier.tolist(), tasks, subtrees):
+        sub_children = np.where(sub_children >= 0, sub_children + n_nodes - 1, -1)
+        all_children[0][k] = sub_children[0]
+        starts[0][k], ends[0][k] = n_items + sub_offsets[0], n_items + sub_offsets[1]
+        all_bounds.append(sub_bounds[1:])
+        all_children.append(sub_children[1:])
+        starts.append(n_items + sub_offsets[1:-1])
+        ends.append(n_items + sub_offsets[2:])
+        item_pool.append(task_items[sub_items])
+        n_nodes += len(sub_children) - 1
+        n_items += len(sub_items)
+        
+    node_bounds, children = np.concatenate(all_bounds), np.concatenate(all_children)
+    item_pool, starts, ends = np.concatenate(item_pool), np.concatenate(starts), np.concatenate(ends)
+    
+    order = [np.zeros(1, dtype=np.int64)]
+    while len(order[-1]):
+        first_children = children[order[-1]]
+        order.append((first_children[first_children >= 0][:, None] + np.arange(4)).ravel())
+    order = np.concatenate(order)
+    positions = np.empty(len(children), dtype=np.int64)
+    positions[order] = np.arange(len(order))
+    
+    children = children[order]
+    children = np.where(children >= 0, positions[np.maximum(children, 0)], -1)
+    item_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(ends[order] - starts[order], out=item_offsets[1:])
+    return node_bounds[order], children, item_offsets, item_pool[_ranges(starts[order], ends[order])]
+
+
+def _partition_worker(bounds:np.ndarray, bbox:tuple, capacity:int, mode:str, max_depth:int) -> tuple:
+    """ Partitions the items of a quadrant in the worker process (see index._parallel_partition) """
+    return _bulk_partition(Rectangle(*bbox), capacity, bounds, mode, max_depth)
+
+
+def _loose(rect:"Rectangle", looseness:float=2.0) -> "Rectangle":
+    """
+    Returns:
+        index.Rectangle: @rect scaled by @looseness around its center, the extent a node of a loose quadtree covers
+    """
+    dx, dy = (rect.xmax - rect.xmin) * (looseness - 1) / 2, (rect.ymax - rect.ymin) * (looseness - 1) / 2
+    return Rectangle(rect.xmin - dx, rect.ymin - dy, rect.xmax + dx, rect.ymax + dy)
+
+
+def _loose_bounds(bounds:np.ndarray, looseness:float=2.0) -> np.ndarray:
+    """
+    Returns:
+        numpy.ndarray: the extents [xmin, ymin, xmax, ymax] of shape (n, 4) scaled by @looseness around their centers (see index._loose)
+    """
+    dx, dy = (bounds[:, 2] - bounds[:, 0]) * (looseness - 1) / 2, (bounds[:, 3] - bounds[:, 1]) * (looseness - 1) / 2
+    return np.stack([bounds[:, 0] - dx, bounds[:, 1] - dy, bounds[:, 2] + dx, bounds[:, 3] + dy], axis=1)
+
+
+def _ranges(starts:np.ndarray, ends:np.ndarray) -> np.ndarray:
+    """
+    Args:
+        starts (numpy.ndarray): integer array holding the start positions of ranges
+        ends (numpy.ndarray): integer array holding the (exclusive) end positions of ranges
+        
+    Returns:
+        numpy.ndarray: the concatenation of numpy.arange(start, end) for all ranges
+    """
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(len(offsets), dtype=np.int64) + offsets
+
+
+def _disjoint_rows(bounds:np.ndarray, other:np.ndarray) -> np.ndarray:
+    """
+    Args:
+        bounds (numpy.ndarray): array of shape (..., 4) holding extents [xmin, ymin, xmax, ymax]
+        other (numpy.ndarray): array holding extents [xmin, ymin, xmax, ymax], broadcastable to @bounds
+        
+    Returns:
+        numpy.ndarray: boolean array, True where the extents of @bounds and @other are disjoint (see Rectangle.disjoint)
+    """
+    return (bounds[..., 0] > other[..., 2]) | (bounds[..., 3] < other[..., 1]) | \
+        (bounds[..., 2] < other[..., 0]) | (bounds[..., 1] > other[..., 3])
+
+
+def _unique_pairs(rows:np.ndarray, values:np.ndarray, n_rows:int, n_values:int) -> tuple:
+    """
+    Args:
+        rows (numpy.ndarray): integer array holding row numbers in range(@n_rows)
+        values (numpy.ndarray): integer array holding values in range(@n_values), one for each entry of @rows
+        n_rows (int): the number of rows
+        n_values (int): the number of distinct values
+        
+    Returns:
+        tuple(numpy.ndarray): offsets of shape (@n_rows + 1,) and values in compressed sparse row layout,
+            the sorted unique values of row i are values[offsets[i]:offsets[i + 1]]
+    """
+    n_values = max(n_values, 1)
+    keys = np.unique(rows.astype(np.int64) * n_values + values)
+    rows, values = np.divmod(keys, n_values)
+    return np.searchsorted(rows, np.arange(n_rows + 1)), values
+
+
+def _rect_distances(bounds:np.ndarray, rect:"Rectangle") -> np.ndarray:
+    """
+    Args:
+        bounds (numpy.ndarray): array of shape (n, 4) holding extents [xmin, ymin, xmax, ymax]
+        rect (index.Rectangle): the rectangle to which the distances will be calculated
+        
+    Returns:
+        numpy.ndarray: the distances between the extents and @rect (see Rectangle.distance)
+    """
+    dx = np.maximum(np.maximum(rect.xmin - bounds[:, 2], bounds[:, 0] - rect.xmax), 0.0)
+    dy = np.maximum(np.maximum(rect.ymin - bounds[:, 3], bounds[:, 1] - rect.ymax), 0.0)
+    return np.hypot(dx, dy)
+
+
+def _disjoint_mask(bounds:np.ndarray, rect:"Rectangle") -> np.ndarray:
+    """
+    Args:
+        bounds (numpy.ndarray): array of shape (n, 4) holding extents [xmin, ymin, xmax, ymax]
+        rect (index.Rectangle): the rectangle to test against
+        
+    Returns:
+        numpy.ndarray: boolean array, True where the extent is disjoint with @rect (see Rectangle.disjoint)
+    """
+    return (bounds[:, 0] > rect.xmax) | (bounds[:, 3] < rect.ymin) | (bounds[:, 2] < rect.xmin) | (bounds[:, 1] > rect.ymax)
+
+
+def _within_mask(x:np.ndarray, y:np.ndarray, rect:"Rectangle") -> np.ndarray:
+    """
+    Returns:
+        numpy.ndarray: boolean array, True where the point (@x, @y) lies within or on the boundary of @rect
+    """
+    return (x >= rect.xmin) & (x <= rect.xmax) & (y >= rect.ymin) & (y <= rect.ymax)
+
+
+def _within_rows(bounds:np.ndarray, other:np.ndarray) -> np.ndarray:
+    """
+    Args:
+        bounds (numpy.ndarray): array of shape (n, 4) holding extents [xmin, ymin, xmax, ymax]
+        other (numpy.ndarray): array of shape (n, 4) or (1, 4) holding the extents compared row by row with @bounds
+        
+    Returns:
+        numpy.ndarray: boolean array, True where the extent of @bounds lies within the extent of @other.
+            Comparisons with NaN extents are False.
+    """
+    return (bounds[:, 0] >= other[:, 0]) & (bounds[:, 1] >= other[:, 1]) & (bounds[:, 2] <= other[:, 2]) & (bounds[:, 3] <= other[:, 3])
+
+
+def _is_rectangle(geometry:object) -> bool:
+    """
+    Returns:
+        bool: True if @geometry is a polygon equal to its extent, so that testing the extent is exact
+    """
+    return geometry.geom_type == "Polygon" and bool(shapely.equals(geometry, shapely.box(*geometry.bounds)))
+
+
+def _spread_bits(values:np.ndarray) -> np.ndarray:
+    """Spreads the lower 32 bits of @values, so that a zero bit is placed between each of them"""
+    values = values.astype(np.uint64) & np.uint64(0x00000000FFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def _morton_codes(bounds:np.ndarray, extent:"Rectangle", bits:int=16) -> np.ndarray:
+    """
+    Args:
+        bounds (numpy.ndarray): array of shape (n, 4) holding extents [xmin, ymin, xmax, ymax]
+        extent (index.Rectangle): the extent in which the centers of @bounds are quantized
+        bits (int): number of bits per axis, at most 32. DEFAULT=16
+        
+    Returns:
+        numpy.ndarray: uint64 array holding the Morton (Z-order) codes of the centers of @bounds
+    """
+    cells = _grid_cells((bounds[:, :2] + bounds[:, 2:]) / 2, extent, bits)
+    return _spread_bits(cells[:, 0]) | (_spread_bits(cells[:, 1]) << np.uint64(1))
+
+
+def _grid_cells(xy:np.ndarray, extent:"Rectangle", bits:int=16) -> np.ndarray:
+    """
+    Args:
+        xy (numpy.ndarray): array of shape (n, 2) holding coordinates
+        extent (index.Rectangle): the extent covered by the grid, coordinates outside are moved to the closest cell
+        bits (int): number of bits per axis, the grid has 2**@bits cells per axis. DEFAULT=16
+        
+    Returns:
+        numpy.ndarray: uint64 array of shape (n, 2) holding the column and row of the cells of @xy.
+            The cells are monotonic in the coordinates.
+    """
+    cells = 2**bits - 1
+    x = (xy[:, 0] - extent.xmin) / (extent.width or 1.0)
+    y = (xy[:, 1] - extent.ymin) / (extent.height or 1.0)
+    x = np.clip(np.nan_to_num(x) * cells, 0, cells).astype(np.uint64)
+    y = np.clip(np.nan_to_num(y) * cells, 0, cells).astype(np.uint64)
+    return np.stack([x, y], axis=1)
+
+
+def _morton_ranges(low:np.ndarray, high:np.ndarray, bits:int=16, max_ranges:int=_MAX_MORTON_RANGES) -> tuple:
+    """ This function decomposes a rectangle of grid cells into ranges of Morton codes (see index._morton_codes).
+    The grid is divided like a quadtree, cells covered by the rectangle become one range. Cells partially
+    covered by the rectangle are divided, until dividing would create more than @max_ranges cells, the remaining
+    partially covered cells become ranges as well, so the ranges can hold codes of cells outside the rectangle.
+    
+    Args:
+        low (numpy.ndarray): the column and row of the lower left cell of the rectangle
+        high (numpy.ndarray): the column and row of the upper right cell of the rectangle
+        bits (int): number of bits per axis. DEFAULT=16
+        max_ranges (int): the number of cells, up to which partially covered cells are divided. DEFAULT=32
+        
+    Returns:
+        tuple(numpy.ndarray): the first and last codes of the sorted, disjoint and not adjacent ranges
+    """
+    (x0, y0), (x1, y1) = np.asarray(low, dtype=np.int64).tolist(), np.asarray(high, dtype=np.int64).tolist()
+    range_x, range_y, range_shifts = [], [], []
+    # the division starts at the level, at which the rectangle overlaps at most two by two cells
+    shift = min(bits, max(x1 - x0, y1 - y0).bit_length())
+    cx, cy = np.meshgrid(np.arange(x0 >> shift, (x1 >> shift) + 1), np.arange(y0 >> shift, (y1 >> shift) + 1))
+    cx, cy = cx.ravel(), cy.ravel()
+    while len(cx):
+        xmin, ymin = cx << shift, cy << shift
+        covered = (xmin >= x0) & (xmin + (1 << shift) <= x1 + 1) & (ymin >= y0) & (ymin + (1 << shift) <= y1 + 1)
+        if shift == 0 or 4 * (len(covered) - int(covered.sum())) > max_ranges:
+            covered[:] = True
+        range_x.append(cx[covered])
+        range_y.append(cy[covered])
+        range_shifts.append(np.full(int(covered.sum()), 2 * shift, dtype=np.uint64))
+        
+        # the quadrants of the partially covered cells, which are not disjoint with the rectangle
+        shift -= 1
+        cx = ((cx[~covered] << 1)[:, None] + np.array([0, 1, 0, 1])).ravel()
+        cy = ((cy[~covered] << 1)[:, None] + np.array([0, 0, 1, 1])).ravel()
+        overlaps = ((cx << shift) <= x1) & (((cx + 1) << shift) > x0) & ((cy << shift) <= y1) & (((cy + 1) << shift) > y0)
+        cx, cy = cx[overlaps], cy[overlaps]
+        
+    range_shifts = np.concatenate(range_shifts)
+    starts = (_spread_bits(np.concatenate(range_x)) | (_spread_bits(np.concatenate(range_y)) << np.uint64(1))) << range_shifts
+    ends = starts + ((np.uint64(1) << range_shifts) - np.uint64(1))
+    order = np.argsort(starts)
+    starts, ends = starts[order], ends[order]
+    # adjacent ranges are merged
+    breaks = np.flatnonzero(starts[1:] != ends[:-1] + np.uint64(1)) + 1
+    return starts[np.concatenate([[0], breaks])], ends[np.concatenate([breaks - 1, [len(ends) - 1]])]
+
+
 #class QuadtreeHelper:
         
         
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains functionality for loading geometries from files in chunks
+
+Functions:
+    iter_geojson
+    iter_wkb
+    read
+    load
+
+Dependencies:
+    numpy
+    pandas
+    shapely
+    pyarrow (optional, for Parquet files)
+
+Todo:
+
+"""
+import os
+import re
+import json
+from typing import List
+
+import numpy as np
+import pandas as pd
+import shapely
+import shapely.geometry as sg
+
+from es613 import index
+
+# the number of characters read from a GeoJSON file at once
+_BLOCK_SIZE = 2**20
+
+# the start of the features array of a GeoJSON FeatureCollection
+_FEATURES_PATTERN = re.compile(r'"features"\s*:\s*\[')
+
+# the separators between two features, the record separator (RS) is used by GeoJSON text sequences
+_SEPARATOR_PATTERN = re.compile(r'[\s,\x1e]*')
+
+# files with one feature per line or record instead of a FeatureCollection
+_SEQUENCE_SUFFIXES = (".geojsonl", ".geojsons", ".geojsonseq", ".jsonl", ".ndjson")
+
+# files with a column of WKB geometries, else the file is read as GeoJSON
+_WKB_SUFFIXES = (".csv", ".parquet")
+
+
+def iter_geojson(path:str, chunksize:int=10000, geometry_column:object="geometry") -> object:
+    """ This function parses the features of a GeoJSON FeatureCollection or a GeoJSON text sequence one by one,
+    only one chunk of features and a block of the file are held in memory at once.
+    Files ending with .geojsonl, .geojsons, .geojsonseq, .jsonl or .ndjson are read as sequences.
+    
+    Args:
+        path (str): the path of the file
+        chunksize (int): the number of features per chunk. DEFAULT=10000
+        geometry_column (object): the column holding the geometries. DEFAULT="geometry"
+    
+    Yields:
+        pandas.DataFrame: up to @chunksize rows, a column per property and @geometry_column holding
+            the shapely geometries, None for features without geometry
+    
+    Raises:
+        ValueError: if the file is no FeatureCollection or holds an invalid or incomplete feature
+    """
+    features = []
+    for feature in _iter_features(os.fspath(path), os.fspath(path).lower().endswith(_SEQUENCE_SUFFIXES)):
+        features.append(feature)
+        if len(features) == chunksize:
+            yield _feature_frame(features, geometry_column)
+            features = []
+    if features:
+        yield _feature_frame(features, geometry_column)
+
+
+def iter_wkb(path:str, chunksize:int=10000, geometry_column:object="geometry") -> object:
+    """ This function reads a CSV or Parquet file in chunks and decodes the WKB geometries of @geometry_column.
+    
+    Args:
+        path (str): the path of the file, files ending with .parquet are read as Parquet, else as CSV
+        chunksize (int): the number of rows per chunk. DEFAULT=10000
+        geometry_column (object): the column holding the geometries as WKB, bytes or hex strings. DEFAULT="geometry"
+    
+    Yields:
+        pandas.DataFrame: up to @chunksize rows, @geometry_column holds the shapely geometries, None for missing values
+    
+    Raises:
+        ImportError: if a Parquet file is read and pyarrow is not installed
+    """
+    path = os.fspath(path)
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize)
+    
+    for chunk in chunks:
+        wkb = chunk[geometry_column].to_numpy(dtype=object)
+        wkb[pd.isna(wkb)] = None
+        chunk[geometry_column] = shapely.from_wkb(wkb)
+        yield chunk
+
+
+def read(path:str, chunksize:int=10000, geometry_column:object="geometry") -> pd.DataFrame:
+    """ This function reads a file with loader.iter_wkb (.csv, .parquet) or loader.iter_geojson (else)
+    and concatenates the chunks once.
+    
+    Args:
+        path (str): the path of the file
+        chunksize (int): the number of rows per chunk. DEFAULT=10000
+        geometry_column (object): the column holding the geometries. DEFAULT="geometry"
+    
+    Returns:
+        pandas.DataFrame: the rows of the file, indexed from 0
+    """
+    return _concat(list(_reader(path)(path, chunksize, geometry_column)), geometry_column)
+
+
+def load(path:str, chunksize:int=10000, geometry_column:object="geometry", capacity:int=8, engine:str="compact") -> "index.PandasQuadtree":
+    """ This function reads a file like loader.read and inserts the geometries of every chunk into the index,
+    before the next chunk is read (see PandasQuadtree.insert_many). The extent of the index is grown with the geometries.
+    
+    Args:
+        path (str): the path of the file
+        chunksize (int): the number of rows per chunk. DEFAULT=10000
+        geometry_column (object): the column holding the geometries. DEFAULT="geometry"
+        capacity (int): the maximum number of geometries, a node in the index can reference. DEFAULT=8
+        engine (str): the quadtree implementation used by the index (see PandasQuadtree). The "compact" and "points"
+            engines buffer the inserted geometries and rebuild their arrays once the buffer is large. DEFAULT="compact"
+    
+    Returns:
+        index.PandasQuadtree: the index, PandasQuadtree.df holds the rows of the file indexed from 0
+    """
+    qdt = index.PandasQuadtree(pd.DataFrame({geometry_column: []}), geometry_column, capacity=capacity, engine=engine)
+    chunks, n_rows = [], 0
+    for chunk in _reader(path)(path, chunksize, geometry_column):
+        chunk.index = pd.RangeIndex(n_rows, n_rows + len(chunk))
+        qdt.insert_many(chunk[geometry_column].values, chunk.index)
+        chunks.append(chunk)
+        n_rows += len(chunk)
+    
+    qdt.flush()
+    qdt.df = _concat(chunks, geometry_column)
+    return qdt
+
+
+def _reader(path:str) -> object:
+    """
+    Returns:
+        callable: loader.iter_wkb for CSV and Parquet files, else loader.iter_geojson
+    """
+    return iter_wkb if os.fspath(path).lower().endswith(_WKB_SUFFIXES) else iter_geojson
+
+
+def _concat(chunks:List[pd.DataFrame], geometry_column:object) -> pd.DataFrame:
+    """
+    Returns:
+        pandas.DataFrame: the @chunks concatenated and indexed from 0, a dataframe holding only @geometry_column if there are none
+    """
+    if not chunks:
+        return pd.DataFrame({geometry_column: np.empty(0, dtype=object)})
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _feature_frame(features:List[dict], geometry_column:object) -> pd.DataFrame:
+    """
+    Returns:
+        pandas.DataFrame: a column per property of @features and @geometry_column holding their geometries
+    """
+    df = pd.DataFrame([feature.get("properties") or {} for feature in features], index=pd.RangeIndex(len(features)))
+    df[geometry_column] = np.array([sg.shape(feature["geometry"]) if feature.get("geometry") else None for feature in features],
+                                   dtype=object)
+    return df
+
+
+def _iter_features(path:str, sequence:bool) -> object:
+    """ This function decodes the features of a GeoJSON file one by one. The file is read in blocks,
+    a block is appended to the buffer, as long as the next feature is not complete.
+    
+    Args:
+        path (str): the path of the file
+        sequence (bool): if True, the file holds features separated by whitespace or record separators,
+            else the features of the first "features" array are decoded
+    
+    Yields:
+        dict: the features
+    
+    Raises:
+        ValueError: if the file is no FeatureCollection or holds an invalid or incomplete feature
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer, eof = f.read(_BLOCK_SIZE), False
+        position = 0
+        if not sequence:
+            match = _FEATURES_PATTERN.search(buffer)
+            while match is None and not eof:
+                block = f.read(_BLOCK_SIZE)
+                buffer, eof = buffer + block, not block
+                match = _FEATURES_PATTERN.search(buffer)
+            if match is None:
+                raise ValueError("{} is no GeoJSON FeatureCollection".format(path))
+            position = match.end()
+        
+        while True:
+            position = _SEPARATOR_PATTERN.match(buffer, position).end()
+            if position < len(buffer) and not sequence and buffer[position] == "]":
+                return
+            if position < len(buffer):
+                try:
+                    feature, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError("{} holds an invalid or incomplete feature".format(path))
+                else:
+                    yield feature
+                    continue
+            elif eof:
+                if sequence:
+                    return
+                raise ValueError("{} ends within the features".format(path))
+            
+            # the buffer is completed with the next block
+            block = f.read(_BLOCK_SIZE)
+            buffer, position, eof = buffer[position:] + block, 0, not block
@@ -5,12 +5,24 @@ This module contains functionality for quality control and assessment
 ToDo:
 """
 import os
+import glob
+import shutil
+import tempfile
 
+import numpy as np
 import pandas as pd
 
 def compare_df(df1:pd.DataFrame, df2:pd.DataFrame, output_folder) -> None:
     """
-    Procedure that creates ... 
+    Procedure that creates a report of the differences between @df1 and @df2 in the file df_compare.txt in @output_folder.
+    The columns and rows are compared by position, the report holds one line for every compared row,
+    listing the differing values of the row. Values which are missing in both dataframes are equal.
+    
+    Note:
+        The values are compared column by column (see quality._differences),
+        only the differing values are formatted and the report is written at once.
+        The values are formatted like the values of a row of their dataframe, e.g. integers of a dataframe
+        holding floats as well are formatted as floats.
     """
     #===========================================================================
     # if ignore_sorting:
@@ -23,7 +35,7 @@ def compare_df(df1:pd.DataFrame, df2:pd.DataFrame, output_folder) -> None:
     with open(output_file, "w") as out:
         
         out.write("Differences between compared dataframes:\n\n")
-    
+        
         df1_cols:list[object] = list(df1.columns)
         df2_cols:list[object] = list(df2.columns)
         
@@ -50,15 +62,195 @@ def compare_df(df1:pd.DataFrame, df2:pd.DataFrame, output_folder) -> None:
         
         out.write("Value Differences:\n\n")
         
-        for i in range(len(df1)):
-            df1_row = df1.iloc[i]
-            df2_row = df2.iloc[i]
-            
-            for df1_col, df2_col in zip(df1_cols, df2_cols):
-                if df1_row[df1_col] != df2_row[df2_col]:
-                    out.write("    ")
-                    out.write("{}/{}: {}|{}".format(df1_col, df2_col, df1_row[df1_col], df2_row[df2_col]))
+        n_rows = min(len(df1), len(df2))
+        # the dtype of a row of the dataframes, which holds the values of all columns
+        df1_dtype, df2_dtype = df1.iloc[:0].to_numpy().dtype, df2.iloc[:0].to_numpy().dtype
+        rows, texts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=object)]
+        for i, (df1_col, df2_col) in enumerate(zip(df1_cols, df2_cols)):
+            df1_series, df2_series = df1.iloc[:n_rows, i], df2.iloc[:n_rows, i]
+            positions = _differences(df1_series, df2_series)
+            rows.append(positions)
+            texts.append(np.array(["    {}/{}: {}|{}".format(df1_col, df2_col, v1, v2) for v1, v2 in
+                                   zip(df1_series.iloc[positions].astype(df1_dtype).tolist(),
+                                       df2_series.iloc[positions].astype(df2_dtype).tolist())], dtype=object))
+        
+        # the differences are ordered by row, the differences of a row keep the order of the columns
+        rows, texts = np.concatenate(rows), np.concatenate(texts)
+        order = np.argsort(rows, kind="stable")
+        rows, texts = rows[order], texts[order]
+        diff_rows, starts = np.unique(rows, return_index=True)
+        
+        lines = []
+        next_row = 0
+        for row, start, end in zip(diff_rows.tolist(), starts.tolist(), starts[1:].tolist() + [len(rows)]):
+            lines.append("\n" * (row - next_row))
+            lines.append("".join(texts[start:end]))
+            lines.append("\n")
+            next_row = row + 1
+        lines.append("\n" * (n_rows - next_row))
+        out.write("".join(lines))
+
+
+def _differences(series1:pd.Series, series2:pd.Series) -> np.ndarray:
+    """
+    Args:
+        series1 (pandas.Series): the values of a column of the first dataframe
+        series2 (pandas.Series): the values of a column of the second dataframe, compared by position with @series1
+    
+    Returns:
+        numpy.ndarray: the positions, at which the values of @series1 and @series2 differ.
+            Values missing in both series are equal, a value missing in only one series differs.
+    """
+    missing1, missing2 = series1.isna().to_numpy(), series2.isna().to_numpy()
+    differs = missing1 != missing2
+    compared = ~(missing1 | missing2)
+    
+    values1, values2 = series1.to_numpy()[compared], series2.to_numpy()[compared]
+    try:
+        unequal = np.asarray(values1 != values2, dtype=bool)
+        if unequal.shape != values1.shape:
+            raise TypeError()
+    except (TypeError, ValueError):
+        # the values can not be compared elementwise by numpy, e.g. values of different types
+        unequal = np.array([bool(v1 != v2) for v1, v2 in zip(values1, values2)], dtype=bool)
+    differs[compared] = unequal
+    return np.flatnonzero(differs)
+
+
+def compare_files(path1:str, path2:str, key_column:object, output_folder, n_partitions:int=64, chunksize:int=100000) -> dict:
+    """
+    Procedure that creates a report of the rows added, removed and changed between the CSV or Parquet files @path1 and @path2
+    in the file files_compare.txt in @output_folder. The rows are aligned by the values of @key_column.
+    The files are read in chunks, whose rows are spread over @n_partitions temporary files by the hash of their key,
+    so that only one partition of both files has to be held in memory at once. Keys are compared by their string representation,
+    the keys of CSV files are read as strings, so that e.g. "007" and "7" are different keys.
+    
+    Args:
+        path1 (str): the path of the first file, files ending with .parquet are read as Parquet, else as CSV
+        path2 (str): the path of the second file
+        key_column (object): the column holding the unique key of a row in both files
+        output_folder (str): the folder of the report
+        n_partitions (int): the number of partitions, more partitions need less memory. DEFAULT=64
+        chunksize (int): the number of rows read at once. DEFAULT=100000
+        
+    Returns:
+        dict: the number of "removed", "added" and "changed" rows
+        
+    Raises:
+        ValueError: if a key is not unique within a file
+        ImportError: if a Parquet file is read and pyarrow is not installed
+    """
+    temp_folder = tempfile.mkdtemp(dir=output_folder)
+    try:
+        columns1 = _partition_file(path1, key_column, os.path.join(temp_folder, "df1"), n_partitions, chunksize)
+        columns2 = _partition_file(path2, key_column, os.path.join(temp_folder, "df2"), n_partitions, chunksize)
+        columns = [c for c in columns1 if c in columns2 and c != key_column]
+        
+        counts = {"removed": 0, "added": 0, "changed": 0}
+        sections = {name: open(os.path.join(temp_folder, name + ".txt"), "w") for name in counts}
+        try:
+            for partition in range(n_partitions):
+                df1 = _read_partition(os.path.join(temp_folder, "df1", str(partition)), columns1, key_column)
+                df2 = _read_partition(os.path.join(temp_folder, "df2", str(partition)), columns2, key_column)
+                
+                removed, added = df1.index.difference(df2.index), df2.index.difference(df1.index)
+                sections["removed"].write("".join("    {}\n".format(key) for key in removed.tolist()))
+                sections["added"].write("".join("    {}\n".format(key) for key in added.tolist()))
+                counts["removed"] += len(removed)
+                counts["added"] += len(added)
+                
+                common = df1.index.intersection(df2.index).sort_values()
+                df1, df2 = df1.loc[common, columns], df2.loc[common, columns]
+                rows, texts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=object)]
+                for i, column in enumerate(columns):
+                    positions = _differences(df1.iloc[:, i], df2.iloc[:, i])
+                    rows.append(positions)
+                    texts.append(np.array(["    {}: {}|{}".format(column, v1, v2) for v1, v2 in
+                                           zip(df1.iloc[positions, i].tolist(), df2.iloc[positions, i].tolist())], dtype=object))
                     
-            out.write("\n")
+                rows, texts = np.concatenate(rows), np.concatenate(texts)
+                order = np.argsort(rows, kind="stable")
+                rows, texts = rows[order], texts[order]
+                diff_rows, starts = np.unique(rows, return_index=True)
+                keys = common[diff_rows].tolist()
+                sections["changed"].write("".join("    {}:{}\n".format(key, "".join(texts[start:end])) for key, start, end in
+                                                  zip(keys, starts.tolist(), starts[1:].tolist() + [len(rows)])))
+                counts["changed"] += len(diff_rows)
+        finally:
+            for section in sections.values():
+                section.close()
+                
+        with open(os.path.join(output_folder, "files_compare.txt"), "w") as out:
+            out.write("Differences between compared files:\n\n")
+            out.write("Differences in columns:\n")
+            only1, only2 = [c for c in columns1 if c not in columns2], [c for c in columns2 if c not in columns1]
+            out.write("Columns only in file1: {}\nColumns only in file2: {}\n\n".format(only1, only2) if only1 or only2 else "None\n\n")
+            
+            for name, title in (("removed", "Rows only in file1"), ("added", "Rows only in file2"), ("changed", "Value Differences")):
+                out.write("{} ({}):\n".format(title, counts[name]))
+                with open(os.path.join(temp_folder, name + ".txt")) as section:
+                    shutil.copyfileobj(section, out)
+                out.write("\n")
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        
+    return counts
+
+
+def _read_chunks(path:str, key_column:object, chunksize:int) -> object:
+    """
+    Yields:
+        pandas.DataFrame: the rows of the CSV or Parquet file @path, @chunksize rows at once.
+            The @key_column of a CSV file is read as strings, instead of inferring its dtype per chunk.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype={key_column: str})
+        
+        
+def _partition_file(path:str, key_column:object, folder:str, n_partitions:int, chunksize:int) -> list:
+    """ Procedure that spreads the rows of the file @path over @n_partitions folders in @folder by the hash of @key_column.
+    Every chunk is written as one pickle file per partition.
+    
+    Returns:
+        list: the columns of the file
+    """
+    columns = None
+    for chunk_number, chunk in enumerate(_read_chunks(path, key_column, chunksize)):
+        if columns is None:
+            columns = list(chunk.columns)
+            for partition in range(n_partitions):
+                os.makedirs(os.path.join(folder, str(partition)))
                 
-    
\ No newline at end of file
+        partitions = pd.util.hash_pandas_object(chunk[key_column].astype(str), index=False).to_numpy() % np.uint64(n_partitions)
+        for partition, part in chunk.groupby(partitions.astype(np.int64), sort=False):
+            part.to_pickle(os.path.join(folder, str(partition), "{}.pkl".format(chunk_number)))
+            
+    if columns is None:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            columns = pq.ParquetFile(path).schema_arrow.names
+        else:
+            columns = list(pd.read_csv(path, nrows=0, dtype={key_column: str}).columns)
+        for partition in range(n_partitions):
+            os.makedirs(os.path.join(folder, str(partition)))
+    return columns
+
+
+def _read_partition(folder:str, columns:list, key_column:object) -> pd.DataFrame:
+    """
+    Returns:
+        pandas.DataFrame: the rows of a partition written by quality._partition_file, indexed by @key_column
+        
+    Raises:
+        ValueError: if a key is not unique
+    """
+    parts = [pd.read_pickle(path) for path in sorted(glob.glob(os.path.join(folder, "*.pkl")))]
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    df = df.set_index(df[key_column].astype(str).to_numpy())
+    if df.index.has_duplicates:
+        raise ValueError("the keys {} are not unique".format(df.index[df.index.duplicated()].unique().tolist()))
+    return df
@@ -12,12 +12,18 @@ Todo:
 import unittest
 import random
 import json
+import pickle
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pandas as pd
+import shapely
 import shapely.geometry as sg
 
 from es613 import index
+from es613 import loader
 
 class Test_PandasQuadtree(unittest.TestCase):
     
@@ -47,22 +53,13 @@ class Test_PandasQuadtree(unittest.TestCase):
         cls.qdt1 = index.PandasQuadtree(cls.df1, "geometry", capacity=10, bbox=cls.bbox1)
         
         # defining PandasQuadtree2
-        cls.gemeinden_df = pd.DataFrame(columns=["OBJID", "BEZ_GEM", "geometry"])
+        cls.gemeinden_df = loader.read(cls.gemeinden_selection_features)[["OBJID", "BEZ_GEM", "geometry"]]
         with open(cls.gemeinden_selection_features) as features_json:
-            gemeinden_dict = json.load(features_json)
-            cls.gemeinden_bbox = gemeinden_dict["bbox"]
-            for row in gemeinden_dict["features"]:
-                df_row = {"OBJID":row["properties"]["OBJID"], "BEZ_GEM":row["properties"]["BEZ_GEM"], "geometry":sg.shape(row["geometry"])}
-                cls.gemeinden_df = cls.gemeinden_df.append(df_row, ignore_index=True)
+            cls.gemeinden_bbox = json.load(features_json)["bbox"]
         cls.qdt2 = index.PandasQuadtree(cls.gemeinden_df, "geometry", bbox=sg.box(*cls.gemeinden_bbox), capacity=10)
                 
         # defining test query polygons for PandasQuadtree2
-        cls.query_polygon_df = pd.DataFrame(columns=["id", "overlap_id", "geometry"])
-        with open(cls.gemeinden_query) as query_json:
-            query_dict = json.load(query_json)
-            for row in query_dict["features"]:
-                df_row = {"id":row["properties"]["id"], "overlap_id":row["properties"]["overlap_id"], "geometry":sg.shape(row["geometry"])}
-                cls.query_polygon_df = cls.query_polygon_df.append(df_row, ignore_index=True)
+        cls.query_polygon_df = loader.read(cls.gemeinden_query)[["id", "overlap_id", "geometry"]]
                 
      
     def setUp(self):
@@ -81,6 +78,522 @@ class Test_PandasQuadtree(unittest.TestCase):
             overlap_ids.sort()
             query_ids.sort()
             self.assertEqual(overlap_ids, query_ids)
+            
+    def test_range_query_refinement(self):
+        
+        for _ in range(20):
+            query_geom = sg.Point(random.uniform(0.0, 10.0), random.uniform(0.0, 10.0)).buffer(random.uniform(0.5, 4.0))
+            expected_ids = [i for i, geom in self.df1["geometry"].items() if not geom.disjoint(query_geom)]
+            self.assertEqual(sorted(expected_ids), sorted(self.qdt1.range_query(query_geom)))
+            
+        self.assertEqual(self.qdt1.range_query(sg.box(20.0, 20.0, 30.0, 30.0)), [])
+            
+    def test_duplicate_index(self):
+        
+        # a label is returned once, if the geometry of one of its rows matches, the query geometry is not prepared
+        df = pd.DataFrame({"geometry": [sg.Point(1.0, 1.0), sg.Point(8.0, 8.0), sg.Point(5.0, 5.0), sg.Point(9.0, 1.0)]},
+                          index=[0, 1, 1, 2])
+        query_geom = sg.box(4.0, 4.0, 6.0, 6.0)
+        for engine in ("quadtree", "compact"):
+            qdt = index.PandasQuadtree(df, "geometry", capacity=1, engine=engine)
+            self.assertEqual(qdt.range_query(query_geom), [1])
+            self.assertEqual(qdt.range_query(query_geom, predicate="within"), [1])
+            self.assertEqual(list(qdt.iter_range_query(query_geom)), [1])
+            offsets, ids = qdt.range_query_many([query_geom, sg.Point(9.0, 1.0)])
+            self.assertEqual((offsets.tolist(), ids.tolist()), ([0, 1, 2], [1, 2]))
+            self.assertEqual(qdt.nearest(sg.Point(7.5, 7.5)), [1])
+            with tempfile.TemporaryDirectory() as folder:
+                qdt.save(Path(folder) / "index.qdt")
+                self.assertEqual(index.PandasQuadtree.load(Path(folder) / "index.qdt", df).range_query(query_geom), [1])
+        
+        # both rows labelled 1 match, the label is returned once by every engine, also after inserts
+        both_geom = sg.Polygon([(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0), (0.0, 9.5)])
+        for engine in ("quadtree", "compact", "leaves", "loose", "points"):
+            qdt = index.PandasQuadtree(df, "geometry", capacity=1, engine=engine)
+            for _ in range(2):
+                self.assertEqual(sorted(qdt.range_query(both_geom)), [0, 1, 2])
+                self.assertEqual(sorted(qdt.range_query_candidates(both_geom)), [0, 1, 2])
+                self.assertEqual(qdt.count(both_geom), 3)
+                self.assertEqual(sorted(qdt.iter_range_query(both_geom)), [0, 1, 2])
+                offsets, ids = qdt.range_query_many([both_geom, sg.box(4.0, 4.0, 9.0, 9.0)])
+                self.assertEqual((offsets.tolist(), sorted(ids[:3].tolist()), ids[3:].tolist()), ([0, 3, 4], [0, 1, 2], [1]))
+                qdt.insert(sg.Point(2.0, 2.0), 2)
+                qdt.insert_many([sg.Point(3.0, 3.0), sg.Point(4.0, 4.0)], [1, 0])
+        
+        self.assertFalse(shapely.is_prepared(query_geom))
+    
+    def test_range_query_many(self):
+        
+        query_geometries = self.query_polygon_df["geometry"].values
+        for engine in ("quadtree", "compact"):
+            qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=10, engine=engine)
+            offsets, ids = qdt.range_query_many(query_geometries)
+            candidate_offsets, candidate_ids = qdt.range_query_candidates_many(query_geometries)
+            self.assertEqual(len(offsets), len(query_geometries) + 1)
+            
+            for i, geom in enumerate(query_geometries):
+                self.assertEqual(sorted(qdt.range_query(geom)), sorted(ids[offsets[i]:offsets[i + 1]]))
+                self.assertEqual(sorted(qdt.range_query_candidates(geom)), sorted(candidate_ids[candidate_offsets[i]:candidate_offsets[i + 1]]))
+                
+        offsets, ids = self.qdt1.range_query_many([])
+        self.assertEqual(list(offsets), [0])
+        self.assertEqual(len(ids), 0)
+            
+    def test_sjoin(self):
+        
+        expected = set()
+        for i, query_row in self.query_polygon_df.iterrows():
+            for j, row in self.gemeinden_df.iterrows():
+                if row["geometry"].intersects(query_row["geometry"]):
+                    expected.add((j, i))
+        
+        for n_jobs in (1, 2):
+            ids, other_ids = self.qdt2.sjoin(self.query_polygon_df, "geometry", n_jobs=n_jobs)
+            self.assertEqual(expected, set(zip(ids, other_ids)))
+            
+        ids, other_ids = self.qdt2.sjoin(self.query_polygon_df, "geometry", predicate="within")
+        for i, j in zip(ids, other_ids):
+            self.assertTrue(self.gemeinden_df.loc[i]["geometry"].within(self.query_polygon_df.loc[j]["geometry"]))
+            
+        with self.assertRaises(ValueError):
+            self.qdt2.sjoin(self.query_polygon_df, "geometry", predicate="disjoint")
+            
+    def test_nearest(self):
+        
+        compact_qdt = index.PandasQuadtree(self.df1, "geometry", bbox=self.bbox1, capacity=10, engine="compact")
+        for _ in range(20):
+            query_geom = sg.Point(random.uniform(0.0, 10.0), random.uniform(0.0, 10.0))
+            distances = self.df1["geometry"].apply(query_geom.distance).sort_values()
+            for qdt in (self.qdt1, compact_qdt):
+                self.assertEqual(list(distances.index[:5]), qdt.nearest(query_geom, 5))
+                self.assertEqual(list(distances.index[distances <= 1.5]), qdt.nearest(query_geom, 100, max_distance=1.5))
+        
+        query_geom = self.query_polygon_df.loc[0]["geometry"]
+        distances = self.gemeinden_df["geometry"].apply(query_geom.distance)
+        nearest_ids = self.qdt2.nearest(query_geom, 12)
+        self.assertEqual(sorted(distances)[:12], [distances[i] for i in nearest_ids])
+            
+    def test_remove_update(self):
+        
+        for engine in ("quadtree", "compact", "leaves", "loose"):
+            df = self.df1.copy()
+            qdt = index.PandasQuadtree(df, "geometry", bbox=self.bbox1, capacity=4, engine=engine)
+            
+            for _ in range(300):
+                i = random.choice(df.index)
+                geom = sg.Point(random.uniform(0.0, 10.0), random.uniform(0.0, 10.0))
+                df.at[i, "geometry"] = geom
+                self.assertTrue(qdt.update(i, geom))
+                
+            removed_ids = list(df.index[:50])
+            for i in removed_ids:
+                self.assertTrue(qdt.remove(i))
+                self.assertFalse(qdt.remove(i))
+            
+            for _ in range(20):
+                query_geom = sg.Point(random.uniform(0.0, 10.0), random.uniform(0.0, 10.0)).buffer(2.0)
+                expected_ids = [i for i, geom in df["geometry"].items() if i not in removed_ids and not geom.disjoint(query_geom)]
+                self.assertEqual(sorted(expected_ids), sorted(qdt.range_query(query_geom)))
+                
+            for i in df.index[50:]:
+                qdt.remove(i)
+            self.assertEqual(qdt.range_query_candidates(self.bbox1), [])
+            
+        # subtrees are merged into their root once they reference no more than capacity items
+        qdt = index.PandasQuadtree(self.df1, "geometry", bbox=self.bbox1, capacity=4)
+        for i in self.df1.index[:97]:
+            qdt.remove(i)
+        self.assertFalse(qdt._qdt._divided)
+        self.assertEqual(sorted(qdt._qdt._placeholders), sorted(self.df1.index[97:]))
+        
+    def test_extent_growth(self):
+        
+        # the extent is calculated if no bbox is passed
+        qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", capacity=10)
+        for i, row in self.query_polygon_df.iterrows():
+            self.assertEqual(sorted(self.qdt2.range_query(row["geometry"])), sorted(qdt.range_query(row["geometry"])))
+            
+        for engine in ("quadtree", "compact"):
+            df = self.df1.iloc[:0].copy()
+            qdt = index.PandasQuadtree(df, "geometry", capacity=4, engine=engine)
+            
+            for i in range(200):
+                geom = sg.Point(random.uniform(-100.0, 100.0), random.uniform(-100.0, 100.0)).buffer(random.uniform(0.0, 5.0))
+                df.loc[i] = ["id{}".format(i), geom]
+                qdt.insert(geom, i)
+                self.assertTrue(qdt._qdt._bbox.contains(index.Rectangle(*geom.bounds)))
+                
+            for _ in range(20):
+                query_geom = sg.Point(random.uniform(-100.0, 100.0), random.uniform(-100.0, 100.0)).buffer(20.0)
+                expected_ids = [i for i, geom in df["geometry"].items() if not geom.disjoint(query_geom)]
+                self.assertEqual(sorted(expected_ids), sorted(qdt.range_query(query_geom)))
+                
+            for i in range(100):
+                qdt.remove(i)
+            self.assertEqual(sorted(qdt.range_query_candidates(sg.box(-200.0, -200.0, 200.0, 200.0))), list(range(100, 200)))
+            
+        # geometries exceeding the passed bbox are indexed
+        qdt = index.PandasQuadtree(self.df1, "geometry", bbox=sg.box(2.0, 2.0, 3.0, 3.0), capacity=10)
+        self.assertEqual(sorted(qdt.range_query(self.bbox1)), sorted(self.df1.index))
+        
+    def test_empty_geometry(self):
+        
+        for engine in ("quadtree", "compact", "leaves", "loose", "points"):
+            qdt = index.PandasQuadtree(self.df1.iloc[:0], "geometry", bbox=sg.box(0.0, 0.0, 1.0, 1.0), capacity=4, engine=engine)
+            qdt.insert(sg.Point(), "empty")
+            qdt.insert_many([sg.Point(), None], ["empty", "missing"])
+            self.assertEqual(qdt.bbox.bounds, (0.0, 0.0, 1.0, 1.0))
+            
+            # the extent of the index follows the tree, once an insert grows it
+            qdt.insert(sg.Point(5.0, 5.0), "point")
+            self.assertTrue(qdt.bbox.covers(sg.Point(5.0, 5.0)))
+            self.assertEqual(qdt.bbox.bounds, qdt._qdt._cell().bounds)
+            self.assertEqual(qdt.range_query_candidates(sg.box(-10.0, -10.0, 10.0, 10.0)), ["point"])
+        
+    def test_save_load(self):
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "gemeinden.qdt"
+            for engine in ("quadtree", "compact"):
+                qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=10, engine=engine)
+                qdt.save(path)
+                for mmap in (True, False):
+                    loaded_qdt = index.PandasQuadtree.load(path, self.gemeinden_df, mmap=mmap)
+                    self.assertEqual(loaded_qdt.capacity, 10)
+                    for i, row in self.query_polygon_df.iterrows():
+                        self.assertEqual(sorted(qdt.range_query(row["geometry"])), sorted(loaded_qdt.range_query(row["geometry"])))
+                    
+            # the loaded index can be changed
+            loaded_qdt.remove(0)
+            loaded_qdt.insert(self.gemeinden_df.loc[0]["geometry"], 0)
+            self.assertIn(0, loaded_qdt.range_query(self.gemeinden_df.loc[0]["geometry"]))
+                
+            with self.assertRaises(ValueError):
+                index.PandasQuadtree.load(path, self.gemeinden_df.iloc[1:])
+            with self.assertRaises(ValueError):
+                index.PandasQuadtree.load(path, self.gemeinden_df.iloc[::-1])
+                
+            # a row with an empty geometry is not indexed, also not after loading the index
+            df = pd.DataFrame({"geometry": [sg.Point(1.0, 1.0), sg.Polygon(), sg.Point(5.0, 5.0)]})
+            for engine in ("compact", "points"):
+                qdt = index.PandasQuadtree(df, "geometry", bbox=sg.box(0.0, 0.0, 10.0, 10.0), engine=engine)
+                qdt.save(path)
+                loaded_qdt = index.PandasQuadtree.load(path, df)
+                self.assertFalse(qdt.remove(1))
+                self.assertFalse(loaded_qdt.remove(1))
+                self.assertTrue(loaded_qdt.remove(2))
+                self.assertEqual(loaded_qdt.range_query(sg.box(0.0, 0.0, 10.0, 10.0)), [0])
+                
+    def test_bulk_load(self):
+        
+        # the bulk loaded tree must return the same candidates as a tree built by incremental inserts
+        for qdt, df in ((self.qdt1, self.df1), (self.qdt2, self.gemeinden_df)):
+            incremental_qdt = index._SecondaryQuadtree1(qdt._qdt._bbox, qdt.capacity)
+            for i, row in df.iterrows():
+                incremental_qdt.insert(row["geometry"], i)
+                
+            xmin, ymin, xmax, ymax = qdt._qdt._bbox.bounds
+            for _ in range(50):
+                x1, x2 = sorted([random.uniform(xmin, xmax), random.uniform(xmin, xmax)])
+                y1, y2 = sorted([random.uniform(ymin, ymax), random.uniform(ymin, ymax)])
+                query_box = sg.box(x1, y1, x2, y2)
+                self.assertEqual(sorted(incremental_qdt.range_query(query_box)), sorted(qdt.range_query_candidates(query_box)))
+                
+    def test_compact_engine(self):
+        
+        compact_qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=10, engine="compact")
+        self.assertLess(compact_qdt.memory_usage(), self.qdt2.memory_usage())
+        
+        for i, row in self.query_polygon_df.iterrows():
+            self.assertEqual(sorted(self.qdt2.range_query(row["geometry"])), sorted(compact_qdt.range_query(row["geometry"])))
+            
+        # inserted items are buffered and merged into the arrays
+        compact_qdt = index.PandasQuadtree(self.df1.iloc[:0], "geometry", bbox=self.bbox1, capacity=10, engine="compact")
+        for i, row in self.df1.iterrows():
+            compact_qdt.insert(row["geometry"], i)
+        compact_qdt._qdt._merge()
+        for _ in range(50):
+            x, y = random.uniform(0.0, 9.0), random.uniform(0.0, 9.0)
+            query_box = sg.box(x, y, x + 1.0, y + 1.0)
+            self.assertEqual(sorted(self.qdt1.range_query_candidates(query_box)), sorted(compact_qdt.range_query_candidates(query_box)))
+            
+        with self.assertRaises(ValueError):
+            index.PandasQuadtree(self.df1, "geometry", bbox=self.bbox1, engine="unknown")
+            
+    def test_leaves_loose_engines(self):
+        
+        for engine in ("leaves", "loose"):
+            qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=10, engine=engine)
+            for i, row in self.query_polygon_df.iterrows():
+                self.assertEqual(sorted(self.qdt2.range_query(row["geometry"])), sorted(qdt.range_query(row["geometry"])))
+                
+            query_geom = self.query_polygon_df.loc[0]["geometry"]
+            distances = self.gemeinden_df["geometry"].apply(query_geom.distance)
+            self.assertEqual(sorted(distances)[:12], [distances[i] for i in qdt.nearest(query_geom, 12)])
+            
+            # inserted items are distributed like bulk loaded ones
+            qdt = index.PandasQuadtree(self.df1.iloc[:0], "geometry", bbox=self.bbox1, capacity=4, engine=engine)
+            for i, row in self.df1.iterrows():
+                qdt.insert(row["geometry"], i)
+            for _ in range(50):
+                x, y = random.uniform(0.0, 9.0), random.uniform(0.0, 9.0)
+                query_box = sg.box(x, y, x + 1.0, y + 1.0)
+                self.assertEqual(sorted(self.qdt1.range_query_candidates(query_box)), sorted(qdt.range_query_candidates(query_box)))
+                
+        # items are referenced by leafs only
+        qdt = index.PandasQuadtree(self.df1, "geometry", bbox=self.bbox1, capacity=4, engine="leaves")
+        self.assertTrue(all(not node._placeholders for node in qdt._qdt._nodes() if node._divided))
+        
+        # boxes sharing an edge and boxes covering the tree are not copied into ever smaller leafs
+        df = pd.DataFrame({"geometry": [sg.box(0.0, 0.0, 3.0 + i / 1000, 10.0) for i in range(10)] + [sg.box(0.0, 0.0, 10.0, 10.0)] * 10})
+        for build in ("bulk", "insert"):
+            qdt = index.PandasQuadtree(df if build == "bulk" else df.iloc[:0], "geometry", bbox=self.bbox1, capacity=4, engine="leaves")
+            if build == "insert":
+                for i, row in df.iterrows():
+                    qdt.insert(row["geometry"], i)
+            self.assertLessEqual(qdt.tree_stats()["depth"], 1)
+            self.assertEqual(sorted(qdt.range_query_candidates(sg.box(9.0, 9.0, 9.5, 9.5))), list(range(10, 20)))
+        
+        # items are referenced once by a node covering them
+        qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=4, engine="loose")
+        nodes = list(qdt._qdt._nodes())
+        self.assertEqual(sorted(pl for node in nodes for pl in node._placeholders), sorted(self.gemeinden_df.index))
+        self.assertTrue(all(node._bbox.contains(g) for node in nodes for g in node._geometries))
+    
+    def test_instrumentation(self):
+        
+        tree_stats = []
+        for engine in ("quadtree", "compact"):
+            qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=10, engine=engine)
+            recorded = []
+            qdt.query_hook = recorded.append
+            for i, row in self.query_polygon_df.iterrows():
+                hits = qdt.range_query(row["geometry"])
+                candidates = qdt.range_query_candidates(row["geometry"])
+                stats, candidate_stats = recorded[-2:]
+                self.assertEqual(stats["query"], "range_query")
+                self.assertEqual((stats["candidates"], stats["hits"]), (len(candidates), len(hits)))
+                self.assertEqual(stats["false_positives"], len(candidates) - len(hits))
+                self.assertEqual(stats["nodes_visited"], candidate_stats["nodes_visited"])
+                self.assertGreaterEqual(stats["bbox_tests"], stats["candidates"])
+                self.assertIsNone(candidate_stats["hits"])
+            
+            stats = qdt.tree_stats()
+            self.assertEqual(sum(stats["fill"]), stats["n_nodes"])
+            self.assertEqual(sum(stats["items_per_level"]), stats["n_references"])
+            self.assertEqual(len(stats["nodes_per_level"]), stats["depth"] + 1)
+            tree_stats.append(stats)
+        
+        # both engines are bulk loaded into the same tree
+        self.assertEqual(tree_stats[0], tree_stats[1])
+        
+    def test_cache(self):
+        
+        df = self.df1.copy()
+        qdt = index.PandasQuadtree(df, "geometry", bbox=self.bbox1, capacity=4, cache_size=3)
+        query_boxes = [sg.box(x, 0.0, x + 2.0, 2.0) for x in (0.0, 3.0, 6.0, 8.0)]
+        
+        expected = [sorted(self.qdt1.range_query(q)) for q in query_boxes]
+        for _ in range(2):
+            self.assertEqual(expected[:3], [sorted(qdt.range_query(q)) for q in query_boxes[:3]])
+        self.assertEqual(qdt.cache_info(), {"hits": 3, "misses": 3, "invalidations": 0, "size": 3, "maxsize": 3})
+        
+        # the least recently used result is evicted
+        qdt.range_query(query_boxes[3])
+        qdt.range_query(query_boxes[0])
+        self.assertEqual(qdt.cache_info()["misses"], 5)
+        
+        # only results overlapping the inserted item are dropped
+        df.loc["new"] = ["new", sg.Point(1.0, 1.0)]
+        qdt.insert(df.loc["new", "geometry"], "new")
+        self.assertEqual(qdt.cache_info()["invalidations"], 1)
+        self.assertIn("new", qdt.range_query(query_boxes[0]))
+        
+        qdt.remove("new")
+        self.assertNotIn("new", qdt.range_query(query_boxes[0]))
+        self.assertEqual(qdt.cache_info()["invalidations"], 2)
+        
+        # returned lists can be changed without changing the cache
+        qdt.range_query_candidates(query_boxes[1]).append("changed")
+        self.assertNotIn("changed", qdt.range_query_candidates(query_boxes[1]))
+        
+        qdt.cache_clear()
+        self.assertEqual(qdt.cache_info()["size"], 0)
+        self.assertIsNone(self.qdt1.cache_info())
+        
+    def test_concurrent(self):
+        
+        df = pd.DataFrame({"geometry": [sg.Point(random.uniform(0.0, 10.0), random.uniform(0.0, 10.0)) for _ in range(2000)]})
+        qdt = index.PandasQuadtree(df.iloc[:1000], "geometry", bbox=self.bbox1, capacity=4, cache_size=16, concurrent=True)
+        qdt.df = df
+        query_geom = sg.box(2.0, 2.0, 6.0, 6.0)
+        
+        def write():
+            for i in range(1000, 2000):
+                qdt.insert(df.at[i, "geometry"], i)
+        
+        def read():
+            results = [qdt.range_query(query_geom) for _ in range(200)]
+            return all(set(a) <= set(b) for a, b in zip(results, results[1:]))
+        
+        with ThreadPoolExecutor(4) as pool:
+            writer = pool.submit(write)
+            readers = [pool.submit(read) for _ in range(3)]
+            writer.result()
+            self.assertTrue(all(reader.result() for reader in readers))
+        
+        expected = [i for i, geom in df["geometry"].items() if not geom.disjoint(query_geom)]
+        self.assertEqual(sorted(expected), sorted(qdt.range_query(query_geom)))
+        
+        async def query():
+            return await asyncio.gather(qdt.range_query_async(query_geom), qdt.nearest_async(sg.Point(5.0, 5.0), 3))
+        
+        hits, nearest = asyncio.run(query())
+        self.assertEqual(sorted(expected), sorted(hits))
+        self.assertEqual(nearest, qdt.nearest(sg.Point(5.0, 5.0), 3))
+        
+        # the lock and the cache are recreated, when the index is passed to other processes
+        copied = pickle.loads(pickle.dumps(qdt))
+        self.assertEqual(sorted(expected), sorted(copied.range_query(query_geom)))
+        
+    def test_parallel_build(self):
+        
+        for engine in ("quadtree", "compact", "leaves", "loose"):
+            for df, bbox in ((self.df1, self.bbox1), (self.gemeinden_df, sg.box(*self.gemeinden_bbox))):
+                qdt = index.PandasQuadtree(df, "geometry", bbox=bbox, capacity=4, engine=engine)
+                parallel_qdt = index.PandasQuadtree(df, "geometry", bbox=bbox, capacity=4, engine=engine, n_jobs=2)
+                
+                xmin, ymin, xmax, ymax = bbox.bounds
+                for _ in range(50):
+                    x1, x2 = sorted([random.uniform(xmin, xmax), random.uniform(xmin, xmax)])
+                    y1, y2 = sorted([random.uniform(ymin, ymax), random.uniform(ymin, ymax)])
+                    query_box = sg.box(x1, y1, x2, y2)
+                    self.assertEqual(sorted(qdt.range_query_candidates(query_box)), sorted(parallel_qdt.range_query_candidates(query_box)))
+                    
+    def test_lazy_queries(self):
+        
+        for engine in ("quadtree", "compact", "leaves", "loose"):
+            qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=4, engine=engine)
+            for i, row in self.query_polygon_df.iterrows():
+                expected = sorted(self.qdt2.range_query(row["geometry"]))
+                hits = list(qdt.iter_range_query(row["geometry"]))
+                self.assertEqual(expected, sorted(hits))
+                self.assertEqual(hits[:3], list(qdt.iter_range_query(row["geometry"], limit=3)))
+                self.assertEqual(len(expected), qdt.count(row["geometry"]))
+                self.assertEqual(bool(expected), qdt.any(row["geometry"]))
+                
+            self.assertEqual(list(qdt.iter_range_query(self.query_polygon_df.at[0, "geometry"], limit=0)), [])
+            self.assertEqual(qdt.count(sg.box(0.0, 0.0, 1.0, 1.0)), 0)
+            self.assertFalse(qdt.any(sg.box(0.0, 0.0, 1.0, 1.0)))
+            
+        # a concurrent index is locked for reading until the iteration is finished
+        qdt = index.PandasQuadtree(self.df1, "geometry", bbox=self.bbox1, capacity=4, concurrent=True)
+        hits = qdt.iter_range_query(self.bbox1)
+        next(hits)
+        with self.assertRaises(RuntimeError):
+            qdt.remove("id0")
+        hits.close()
+        self.assertEqual(qdt.count(self.bbox1), 100)
+        self.assertTrue(qdt.remove("id0"))
+        self.assertEqual(qdt.count(self.bbox1), 99)
+        
+    def test_points_engine(self):
+        
+        # many points share their coordinates
+        points = [sg.Point(random.uniform(0.0, 10.0), random.uniform(0.0, 10.0)) for _ in range(300)] + [sg.Point(5.0, 5.0)] * 500
+        df = pd.DataFrame({"geometry": points})
+        qdt = index.PandasQuadtree(df, "geometry", capacity=4, engine="points")
+        reference_qdt = index.PandasQuadtree(df, "geometry", capacity=4)
+        stats = qdt.tree_stats()
+        self.assertEqual(stats["n_references"], len(df))
+        self.assertEqual(stats["overfull_nodes"], 1)
+        
+        query_geoms = [sg.box(4.0, 4.0, 6.0, 6.0), sg.box(5.0, 5.0, 8.0, 9.0), sg.Point(5.0, 5.0).buffer(1.5), sg.box(20.0, 20.0, 30.0, 30.0),
+                       sg.Polygon([(0.0, 0.0), (10.0, 0.0), (0.0, 10.0)])]
+        for query_geom in query_geoms:
+            expected = sorted(reference_qdt.range_query(query_geom))
+            self.assertEqual(expected, sorted(qdt.range_query(query_geom)))
+            self.assertEqual(expected, sorted(qdt.iter_range_query(query_geom)))
+            self.assertEqual(len(expected), qdt.count(query_geom))
+            self.assertEqual(bool(expected), qdt.any(query_geom))
+        
+        # inserted and removed points are found until the arrays are rebuilt and after
+        df.loc[len(df)] = [sg.Point(5.5, 5.5)]
+        qdt.df = df
+        qdt.insert(df.at[len(df) - 1, "geometry"], len(df) - 1)
+        qdt.remove(0)
+        hits = qdt.range_query(sg.box(0.0, 0.0, 10.0, 10.0))
+        self.assertEqual(sorted(hits), list(range(1, len(df))))
+        qdt._qdt._merge()
+        self.assertEqual(sorted(hits), sorted(qdt.range_query(sg.box(0.0, 0.0, 10.0, 10.0))))
+        
+        with self.assertRaises(ValueError):
+            qdt.insert(sg.box(0.0, 0.0, 1.0, 1.0), "box")
+        with self.assertRaises(ValueError):
+            index.PandasQuadtree(self.gemeinden_df, "geometry", engine="points")
+            
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder) / "points.qdt"
+            qdt.save(path)
+            loaded_qdt = index.PandasQuadtree.load(path, df)
+            self.assertEqual(loaded_qdt.engine, "points")
+            for query_geom in query_geoms:
+                self.assertEqual(sorted(qdt.range_query(query_geom)), sorted(loaded_qdt.range_query(query_geom)))
+                
+    def test_morton_index(self):
+        
+        for df, bbox, qdt in ((self.df1, self.bbox1, self.qdt1), (self.gemeinden_df, sg.box(*self.gemeinden_bbox), self.qdt2)):
+            for bits in (2, 16):
+                morton_index = index.MortonIndex(df, "geometry", bits=bits)
+                xmin, ymin, xmax, ymax = bbox.bounds
+                for _ in range(50):
+                    x1, x2 = sorted([random.uniform(xmin, xmax), random.uniform(xmin, xmax)])
+                    y1, y2 = sorted([random.uniform(ymin, ymax), random.uniform(ymin, ymax)])
+                    query_box = sg.box(x1, y1, x2, y2)
+                    self.assertEqual(sorted(qdt.range_query_candidates(query_box)), sorted(morton_index.range_query_candidates(query_box)))
+                    self.assertEqual(sorted(qdt.range_query(query_box)), sorted(morton_index.range_query(query_box)))
+                    
+        for i, row in self.query_polygon_df.iterrows():
+            self.assertEqual(sorted(self.qdt2.range_query(row["geometry"])), sorted(morton_index.range_query(row["geometry"])))
+            
+        self.assertEqual(morton_index.range_query(sg.box(0.0, 0.0, 1.0, 1.0)), [])
+        self.assertEqual(index.MortonIndex(self.df1.iloc[:0], "geometry").range_query(self.bbox1), [])
+        with self.assertRaises(NotImplementedError):
+            morton_index.insert(sg.Point(0.0, 0.0), "new")
+        with self.assertRaises(ValueError):
+            index.MortonIndex(self.df1, "geometry", bits=32)
+            
+        # both rows labelled 1 match, the label is returned once
+        df = pd.DataFrame({"geometry": [sg.Point(1.0, 1.0), sg.Point(5.0, 5.0), sg.Point(9.0, 9.0), sg.Point(20.0, 20.0)]},
+                          index=[0, 1, 1, 2])
+        morton_index = index.MortonIndex(df, "geometry", bbox=sg.box(0.0, 0.0, 20.0, 20.0))
+        self.assertEqual(sorted(morton_index.range_query_candidates(sg.box(0.0, 0.0, 10.0, 10.0))), [0, 1])
+        self.assertEqual(sorted(morton_index.range_query(sg.box(0.0, 0.0, 10.0, 10.0))), [0, 1])
+        self.assertEqual(morton_index.range_query(sg.box(4.0, 4.0, 21.0, 21.0)), [1, 2])
+            
+    def test_predicates(self):
+        
+        geometries = self.gemeinden_df["geometry"]
+        xmin, ymin, xmax, ymax = self.gemeinden_bbox
+        # a large query polygon covers many nodes
+        large_polygon = sg.box(xmin, ymin, xmax, ymax).buffer(-(xmax - xmin) / 8).buffer((xmax - xmin) / 16)
+        query_geoms = list(self.query_polygon_df["geometry"]) + [large_polygon, geometries[0], geometries[0].boundary]
+        
+        for engine in ("quadtree", "compact", "leaves", "loose"):
+            qdt = index.PandasQuadtree(self.gemeinden_df, "geometry", bbox=sg.box(*self.gemeinden_bbox), capacity=4, engine=engine)
+            recorded = []
+            qdt.query_hook = recorded.append
+            for query_geom in query_geoms:
+                for predicate in ("intersects", "contains", "within", "touches", "covered_by"):
+                    expected = [i for i, geom in geometries.items() if getattr(geom, predicate)(query_geom)]
+                    self.assertEqual(sorted(expected), sorted(qdt.range_query(query_geom, predicate)))
+                    
+            qdt.range_query(large_polygon)
+            self.assertGreater(recorded[-1]["accepted"], 0)
+            self.assertEqual(recorded[-1]["hits"], recorded[-1]["candidates"] - recorded[-1]["false_positives"])
+            
+        with self.assertRaises(ValueError):
+            self.qdt2.range_query(large_polygon, "equals")
         
         
 class Test_Rectangle(unittest.TestCase):
@@ -109,6 +622,28 @@ class Test_Rectangle(unittest.TestCase):
         # rectangles overlap
         self.assertFalse(self.r4.disjoint(self.r5))
         
+    def test_contains(self):
+        self.assertTrue(index.Rectangle(0.0, 0.0, 10.0, 10.0).contains(self.r1))
+        self.assertTrue(self.r1.contains(self.r1))
+        self.assertFalse(self.r1.contains(self.r2))
+        
+    def test_touches(self):
+        self.assertTrue(self.r1.touches(self.r2))
+        self.assertTrue(self.r1.touches(self.r3))
+        self.assertFalse(self.r4.touches(self.r5))
+        self.assertFalse(self.r1.touches(index.Rectangle(10.0, 10.0, 11.0, 11.0)))
+        
+    def test_overlaps(self):
+        self.assertTrue(self.r4.overlaps(self.r5))
+        self.assertFalse(self.r1.overlaps(self.r2))
+        self.assertFalse(index.Rectangle(0.0, 0.0, 10.0, 10.0).overlaps(self.r1))
+        
+    def test_distance(self):
+        self.assertEqual(self.r1.distance(self.r2), 0.0)
+        self.assertEqual(self.r4.distance(self.r5), 0.0)
+        self.assertAlmostEqual(self.r2.distance(self.r4), 8.0 ** 0.5)
+        self.assertEqual(self.r3.distance(index.Rectangle(10.0, 7.0, 11.0, 8.0)), 5.0)
+        
         
 class Test_RectangleDivision(unittest.TestCase):
      
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains the unittests for the es613.loader module
+
+Todo:
+
+"""
+import os
+import json
+import unittest
+import tempfile
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import shapely
+import shapely.geometry as sg
+
+from es613 import loader
+
+class Test_loader(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        
+        cls.test_data_directory = Path(__file__).absolute().parent.parent.parent / "test_data"
+        cls.gemeinden_selection_features = cls.test_data_directory / "gemeinden_bayern_selection.geojson"
+        with open(cls.gemeinden_selection_features) as features_json:
+            cls.features = json.load(features_json)["features"]
+    
+    def test_iter_geojson(self):
+        
+        chunks = list(loader.iter_geojson(self.gemeinden_selection_features, chunksize=100))
+        self.assertEqual([len(chunk) for chunk in chunks[:-1]], [100] * (len(chunks) - 1))
+        df = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(list(df.columns), ["OBJID", "BEZ_GEM", "geometry"])
+        self.assertEqual(df["OBJID"].tolist(), [f["properties"]["OBJID"] for f in self.features])
+        self.assertTrue(all(g.equals(sg.shape(f["geometry"])) for g, f in zip(df["geometry"], self.features)))
+    
+    def test_small_blocks(self):
+        
+        # features are completed from the next blocks, the features of a sequence are separated by lines or records
+        block_size = loader._BLOCK_SIZE
+        loader._BLOCK_SIZE = 97
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                sequence_path = os.path.join(folder, "features.geojsonl")
+                with open(sequence_path, "w") as f:
+                    f.write("\n".join(json.dumps(feature) for feature in self.features[:50]))
+                    f.write("\x1e" + json.dumps({"type": "Feature", "properties": {"OBJID": "none"}, "geometry": None}) + "\n")
+                
+                for path in (self.gemeinden_selection_features, sequence_path):
+                    df = loader.read(path, chunksize=7)
+                    self.assertEqual(df["OBJID"].tolist()[:50], [f["properties"]["OBJID"] for f in self.features[:50]])
+                
+                self.assertEqual(len(df), 51)
+                self.assertIsNone(df["geometry"].iloc[-1])
+                
+                broken_path = os.path.join(folder, "broken.geojson")
+                with open(broken_path, "w") as f:
+                    f.write(json.dumps({"type": "FeatureCollection", "features": self.features[:3]})[:-100])
+                with self.assertRaises(ValueError):
+                    loader.read(broken_path)
+        finally:
+            loader._BLOCK_SIZE = block_size
+    
+    def test_load(self):
+        
+        for engine in ("quadtree", "compact"):
+            qdt = loader.load(self.gemeinden_selection_features, chunksize=64, capacity=4, engine=engine)
+            self.assertEqual(len(qdt.df), len(self.features))
+            self.assertEqual(qdt.tree_stats()["n_pending"], 0)
+            
+            query_geom = sg.box(10.5, 47.5, 11.0, 48.0)
+            expected = [i for i, f in enumerate(self.features) if sg.shape(f["geometry"]).intersects(query_geom)]
+            self.assertEqual(sorted(expected), sorted(qdt.range_query(query_geom)))
+            self.assertTrue(qdt.bbox.contains(sg.box(*shapely.total_bounds(qdt.df["geometry"].values))))
+    
+    def test_wkb(self):
+        
+        df = pd.DataFrame({"id": range(300), "geometry": shapely.to_wkb(shapely.points(range(300), range(300)), hex=True)})
+        df.loc[5, "geometry"] = None
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "points.csv")
+            df.to_csv(path, index=False)
+            
+            qdt = loader.load(path, chunksize=32, engine="points")
+            self.assertEqual(qdt.df["id"].tolist(), list(range(300)))
+            self.assertIsNone(qdt.df.at[5, "geometry"])
+            self.assertEqual(sorted(qdt.range_query(sg.box(0.0, 0.0, 9.5, 9.5))), [0, 1, 2, 3, 4, 6, 7, 8, 9])
+    
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet(self):
+        
+        df = pd.DataFrame({"id": range(100), "geometry": shapely.to_wkb(shapely.points(range(100), range(100)))})
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "points.parquet")
+            df.to_parquet(path)
+            self.assertEqual(len(loader.read(path, chunksize=16)), 100)
+
+
+unittest.main()
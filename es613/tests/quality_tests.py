@@ -4,9 +4,13 @@ This module contains the unittests for the sptemp.analysis-module
 Todo:
 
 """
+import os
 import unittest
+import tempfile
+import importlib.util
 from unittest.mock import MagicMock
 
+import numpy as np
 import pandas as pd
 
 from es613 import quality
@@ -20,9 +24,82 @@ class Test_compare_df(unittest.TestCase):
         self.df3 = pd.DataFrame({"col_a" : [1,2,3], "col_b" : [MagicMock(), MagicMock(), MagicMock()]})
         
     def test_compare_df(self):
-        output_folder = r"C:\Users\daens\Documents\Prog\Python\es613\test_data"
-        #self.df2.sort_values("col_a", inplace=True)
-        quality.compare_df(self.df1, self.df2, output_folder)
-        quality.compare_df(self.df1, self.df3, output_folder)
+        with tempfile.TemporaryDirectory() as output_folder:
+            #self.df2.sort_values("col_a", inplace=True)
+            quality.compare_df(self.df1, self.df2, output_folder)
+            with open(os.path.join(output_folder, "df_compare.txt")) as report:
+                lines = report.read().split("\n")
+            self.assertEqual(lines[-4:], ["    col_a/col_a: 1|2    col_b/col_b: a|b", "    col_a/col_a: 2|3    col_b/col_b: b|c",
+                                          "    col_a/col_a: 3|1    col_b/col_b: c|a", ""])
+            
+            quality.compare_df(self.df1, self.df3, output_folder)
+            
+            # values missing in both dataframes are equal
+            df4 = pd.DataFrame({"col_a" : [1.0, np.nan, np.nan], "col_b" : ["a", None, "c"]})
+            df5 = pd.DataFrame({"col_a" : [1.0, np.nan, 3.0], "col_b" : ["a", None, "d"]})
+            quality.compare_df(df4, df5, output_folder)
+            with open(os.path.join(output_folder, "df_compare.txt")) as report:
+                lines = report.read().split("\n")
+            self.assertEqual(lines[-4:], ["", "", "    col_a/col_a: nan|3.0    col_b/col_b: c|d", ""])
+            
+            # the values are formatted like the values of a row, as the report compared row by row did
+            df6 = pd.DataFrame({"col_a" : [1.0, 2.5, 3.0], "col_b" : [1.0, 2.0, 3.0], "col_c" : [1, 2, 3]})
+            df7 = pd.DataFrame({"col_a" : [1.0, 2.0, 3.0], "col_b" : [1.5, 2.0, 3.0], "col_c" : [1, 2, 4]})
+            quality.compare_df(df6, df7, output_folder)
+            with open(os.path.join(output_folder, "df_compare.txt")) as report:
+                lines = report.read().split("\n")
+            expected = []
+            for i in range(len(df6)):
+                df6_row, df7_row = df6.iloc[i], df7.iloc[i]
+                expected.append("".join("    {}/{}: {}|{}".format(col, col, df6_row[col], df7_row[col]) for col in df6.columns
+                                        if df6_row[col] != df7_row[col]))
+            self.assertEqual(lines[-4:], expected + [""])
+            self.assertEqual(lines[-2], "    col_c/col_c: 3.0|4.0")
+            
+    def test_compare_files(self):
+        df1 = pd.DataFrame({"key": range(1000), "col_a": np.arange(1000) * 0.5, "col_b": ["a"] * 1000})
+        df2 = df1.iloc[10:].sample(frac=1.0, random_state=0).copy()
+        df2.loc[df2["key"] == 500, "col_b"] = "b"
+        df2.loc[df2["key"] == 600, ["col_a", "col_b"]] = [np.nan, "c"]
+        df2 = pd.concat([df2, pd.DataFrame({"key": [1000, 1001], "col_a": [0.0, 0.0], "col_b": ["a", "a"]})])
+        
+        with tempfile.TemporaryDirectory() as output_folder:
+            path1, path2 = os.path.join(output_folder, "df1.csv"), os.path.join(output_folder, "df2.csv")
+            df1.to_csv(path1, index=False)
+            df2.to_csv(path2, index=False)
+            
+            counts = quality.compare_files(path1, path2, "key", output_folder, n_partitions=4, chunksize=128)
+            self.assertEqual(counts, {"removed": 10, "added": 2, "changed": 2})
+            with open(os.path.join(output_folder, "files_compare.txt")) as report:
+                text = report.read()
+            self.assertIn("    500:    col_b: a|b\n", text)
+            self.assertIn("    600:    col_a: 300.0|nan    col_b: a|c\n", text)
+            self.assertEqual(sorted(os.listdir(output_folder)), ["df1.csv", "df2.csv", "files_compare.txt"])
+            
+            pd.concat([df1, df1.iloc[:1]]).to_csv(path2, index=False)
+            with self.assertRaises(ValueError):
+                quality.compare_files(path1, path2, "key", output_folder, n_partitions=4, chunksize=128)
+                
+            # keys of CSV files are compared as written
+            pd.DataFrame({"key": ["007", "8"], "col_a": [1, 2]}).to_csv(path1, index=False)
+            pd.DataFrame({"key": ["7", "8"], "col_a": [1, 2]}).to_csv(path2, index=False)
+            counts = quality.compare_files(path1, path2, "key", output_folder, n_partitions=4, chunksize=1)
+            self.assertEqual(counts, {"removed": 1, "added": 1, "changed": 0})
+            
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_compare_parquet_files(self):
+        df1 = pd.DataFrame({"key": range(100), "col_a": np.arange(100) * 0.5})
+        df2 = df1.iloc[5:].copy()
+        df2.loc[df2["key"] == 50, "col_a"] = -1.0
+        
+        with tempfile.TemporaryDirectory() as output_folder:
+            path1, path2 = os.path.join(output_folder, "df1.parquet"), os.path.join(output_folder, "df2.parquet")
+            df1.to_parquet(path1, index=False)
+            df2.to_parquet(path2, index=False)
+            
+            counts = quality.compare_files(path1, path2, "key", output_folder, n_partitions=4, chunksize=16)
+            self.assertEqual(counts, {"removed": 5, "added": 0, "changed": 1})
+            with open(os.path.join(output_folder, "files_compare.txt")) as report:
+                self.assertIn("    50:    col_a: 25.0|-1.0\n", report.read())
         
 unittest.main()
\ No newline at end of file